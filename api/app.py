@@ -5,9 +5,16 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from api.routes.search import router as search_router
+from config.settings import settings
+from services.concurrency import stage_executor
+from services.metrics import STAGE_BUCKETS, registry, request_timings, server_timing_header
+from services.profiler import SamplingProfiler
+from services.service_registry import service_registry
 
 app = FastAPI(
     title="AI Financial Data Assistant API",
@@ -27,6 +34,54 @@ app.add_middleware(
 # Include routers
 app.include_router(search_router, prefix="/api", tags=["search"])
 
+def route_template(request: Request) -> str:
+    """Raw path with path parameters put back as {name}, e.g. /api/transactions/{user_id}"""
+    if request.scope.get("route") is None:
+        return "unmatched"
+    path = request.url.path
+    for name, value in request.path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Request latency histogram, Server-Timing header and per-request profiling
+    
+    Stage timings recorded while the request runs (see services.metrics.timed)
+    are collected in a request-scoped dict. With PROFILING_ENABLED, a request
+    sent with ?profile=1 or an X-Profile: 1 header is sampled, and the path of
+    the collapsed-stack file is returned in an X-Profile header.
+    """
+    profile = settings.PROFILING_ENABLED and (
+        request.query_params.get("profile") in ("1", "true") or request.headers.get("X-Profile") == "1"
+    )
+    profiler = SamplingProfiler() if profile else None
+    if profiler is not None:
+        profiler.start()
+    
+    timings = {}
+    token = request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+        elapsed = time.perf_counter() - started
+        if profiler is not None:
+            profiler.stop()
+    
+    # Label by route template, not raw path, to keep the label set bounded
+    registry.histogram(
+        "http_request_duration_seconds", "Time to produce the response headers", STAGE_BUCKETS,
+        method=request.method, path=route_template(request), status=str(response.status_code)
+    ).observe(elapsed)
+    
+    if settings.SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    if profiler is not None:
+        response.headers["X-Profile"] = profiler.save(f"{request.method}-{request.url.path}")
+    return response
+
 @app.get("/")
 async def root():
     return {
@@ -34,15 +89,42 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "search": "/api/search",
+            "search_batch": "/api/search/batch",
             "transactions": "/api/transactions",
-            "insights": "/api/insights"
+            "insights": "/api/insights",
+            "aggregates": "/api/aggregates",
+            "stats": "/api/stats",
+            "metrics": "/metrics",
+            "health": "/health",
+            "ready": "/ready"
         }
     }
 
+@app.on_event("startup")
+async def start_warmup():
+    if settings.WARMUP_ENABLED:
+        service_registry.start_warmup()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    stage_executor.shutdown()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage, request and batching histograms in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving requests"""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once the model is loaded and warmed up, 503 until then or if warm-up failed"""
+    readiness = service_registry.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,14 +1,21 @@
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
-from services.vector_search_service import VectorSearchService
-from services.summarizer_service import SummarizerService
+import asyncio
+import json
+import time
+from services.analytics_store import get_analytics_store
+from services.answer_engine import answer_engine
+from services.rollup_store import get_rollup_store, month_bounds
+from services.concurrency import stage_executor
+from services.service_registry import service_registry
+from services.vector_search_service import BatchQuery
+from config.settings import settings
 
 router = APIRouter()
 
-# Initialize services
-vector_service = VectorSearchService()
-summarizer_service = SummarizerService()
+# Services are built on first use (or by the startup warm-up), not at import
 
 class SearchRequest(BaseModel):
     query: str
@@ -21,13 +28,78 @@ class SearchResponse(BaseModel):
     transactions: List[Dict]
     count: int
     summary: Optional[str] = None
+    answer_path: Optional[str] = None  # "local" or "llm" when a summary was requested
+    intent: Optional[str] = None
+    answer: Optional[Dict] = None
+
+class SearchFilters(BaseModel):
+    category: Optional[str] = None
+    type: Optional[str] = None
+    amount_min: Optional[float] = None
+    amount_max: Optional[float] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+
+class BatchSearchQuery(BaseModel):
+    query: str
+    user_id: Optional[str] = None
+    top_k: int = Field(10, ge=1)
+    filters: Optional[SearchFilters] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchSearchQuery]
+    summarize: Optional[bool] = False
+
+class BatchSearchResult(BaseModel):
+    query: str
+    user_id: Optional[str] = None
+    transactions: List[Dict]
+    count: int
+    summary: Optional[str] = None
+    answer_path: Optional[str] = None
+    intent: Optional[str] = None
+    answer: Optional[Dict] = None
+    error: Optional[str] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchResult]
+    count: int
+
+async def _local_answer(query: str, user_id: Optional[str], top_k: Optional[int],
+                        filters: Optional[Dict] = None):
+    """Exact local answer for aggregate, count and top-N questions, or None to use the LLM"""
+    if not settings.LOCAL_ANSWERS_ENABLED:
+        return None
+    return await stage_executor.run(
+        "analytics", answer_engine.answer, query, user_id, top_k or settings.TOP_K_RESULTS, filters
+    )
 
 @router.post("/search", response_model=SearchResponse)
 async def search_transactions(request: SearchRequest):
-    """Search transactions using semantic similarity"""
+    """Search transactions using semantic similarity
+    
+    With summarize, totals, counts and top-N questions are answered exactly
+    from all matching transactions without calling the LLM; `answer_path`
+    says whether the summary came from "local" computation or the "llm".
+    """
     try:
+        if request.summarize:
+            local = await _local_answer(request.query, request.user_id, request.top_k)
+            if local is not None:
+                return SearchResponse(
+                    query=request.query,
+                    transactions=local.transactions,
+                    count=len(local.transactions),
+                    summary=local.text,
+                    answer_path="local",
+                    intent=local.intent,
+                    answer=local.values
+                )
+        
+        vector_service = await service_registry.avector_service()
+        
         # Perform vector search
-        transactions = vector_service.search(
+        transactions = await vector_service.asearch(
             query=request.query,
             n_results=request.top_k,
             user_id=request.user_id
@@ -35,34 +107,221 @@ async def search_transactions(request: SearchRequest):
         
         summary = None
         if request.summarize and transactions:
-            summary = summarizer_service.summarize_transactions(
+            summarizer_service = await service_registry.asummarizer_service()
+            summary = await summarizer_service.asummarize_transactions(
                 query=request.query,
-                transactions=transactions
+                transactions=transactions,
+                data_generation=vector_service.data_generation(request.user_id)
             )
         
         return SearchResponse(
             query=request.query,
             transactions=transactions,
             count=len(transactions),
-            summary=summary
+            summary=summary,
+            answer_path="llm" if summary is not None else None
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_transactions_batch(request: BatchSearchRequest):
+    """Run many searches in one request, returning results in request order
+    
+    Queries are embedded in one model call and queries with the same user and
+    filters share one vector-store query. Explicit filters override those
+    parsed from the query text. With summarize, aggregate, count and top-N
+    questions are answered locally and skip the search; the other summaries
+    are generated at most SEARCH_BATCH_SUMMARY_CONCURRENCY at a time. A
+    failed summary is reported in that result's error field without failing
+    the batch.
+    """
+    try:
+        if len(request.queries) > settings.SEARCH_BATCH_MAX_QUERIES:
+            raise ValueError(f"At most {settings.SEARCH_BATCH_MAX_QUERIES} queries per batch")
+        
+        items = []
+        for q in request.queries:
+            filters = None
+            if q.filters is not None:
+                filters = {k: v for k, v in q.filters.model_dump().items() if v is not None}
+                if "type" in filters:
+                    filters["txn_type"] = filters.pop("type")
+            items.append(BatchQuery(q.query, q.user_id, q.top_k, filters or None))
+        
+        results: List[Optional[BatchSearchResult]] = [None] * len(items)
+        if request.summarize and settings.LOCAL_ANSWERS_ENABLED:
+            answers = await stage_executor.run("analytics", lambda: [
+                answer_engine.answer(item.query, item.user_id, item.n_results or settings.TOP_K_RESULTS,
+                                     item.filters)
+                for item in items
+            ])
+            for i, (item, local) in enumerate(zip(items, answers)):
+                if local is not None:
+                    results[i] = BatchSearchResult(
+                        query=item.query, user_id=item.user_id, transactions=local.transactions,
+                        count=len(local.transactions), summary=local.text, answer_path="local",
+                        intent=local.intent, answer=local.values
+                    )
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        vector_service = await service_registry.avector_service()
+        found = await vector_service.asearch_batch([items[i] for i in pending]) if pending else []
+        for i, transactions in zip(pending, found):
+            results[i] = BatchSearchResult(query=items[i].query, user_id=items[i].user_id,
+                                           transactions=transactions, count=len(transactions))
+        
+        to_summarize = [results[i] for i in pending if results[i].transactions]
+        if request.summarize and to_summarize:
+            summarizer_service = await service_registry.asummarizer_service()
+            limit = asyncio.Semaphore(settings.SEARCH_BATCH_SUMMARY_CONCURRENCY)
+            
+            async def summarize(result: BatchSearchResult):
+                async with limit:
+                    try:
+                        result.summary = await summarizer_service.asummarize_transactions(
+                            query=result.query,
+                            transactions=result.transactions,
+                            data_generation=vector_service.data_generation(result.user_id)
+                        )
+                        result.answer_path = "llm"
+                    except Exception as e:
+                        result.error = str(e)
+            
+            await asyncio.gather(*[summarize(result) for result in to_summarize])
+        
+        return BatchSearchResponse(results=results, count=len(results))
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/search/stream")
+async def search_transactions_stream(request: SearchRequest):
+    """Search transactions and stream the summary over Server-Sent Events
+    
+    Events: `transactions` (sent as soon as the search finishes), one `token`
+    per summary chunk, then `done` with the full summary, `answer_path` and
+    server-side timings (time to first byte, time to first token, total) in
+    milliseconds. Locally answered questions send the whole summary as one
+    `token`. If the LLM fails, an `error` event ends the stream instead of
+    `done`; tokens already sent are not part of any summary.
+    """
+    started = time.perf_counter()
+    
+    async def events():
+        if request.summarize:
+            try:
+                local = await _local_answer(request.query, request.user_id, request.top_k)
+            except Exception as e:
+                yield _sse_event("error", {"detail": str(e)})
+                return
+            if local is not None:
+                yield _sse_event("transactions", {
+                    "query": request.query,
+                    "transactions": local.transactions,
+                    "count": len(local.transactions)
+                })
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                yield _sse_event("token", {"text": local.text})
+                yield _sse_event("done", {
+                    "summary": local.text,
+                    "answer_path": "local",
+                    "intent": local.intent,
+                    "answer": local.values,
+                    "timings": {"ttfb_ms": elapsed_ms, "ttft_ms": elapsed_ms, "total_ms": elapsed_ms}
+                })
+                return
+        
+        try:
+            vector_service = await service_registry.avector_service()
+            transactions = await vector_service.asearch(
+                query=request.query,
+                n_results=request.top_k,
+                user_id=request.user_id
+            )
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+            return
+        
+        yield _sse_event("transactions", {
+            "query": request.query,
+            "transactions": transactions,
+            "count": len(transactions)
+        })
+        ttfb_ms = (time.perf_counter() - started) * 1000
+        
+        summary_parts = []
+        ttft_ms = None
+        if request.summarize and transactions:
+            try:
+                summarizer_service = await service_registry.asummarizer_service()
+            except Exception as e:
+                yield _sse_event("error", {"detail": str(e)})
+                return
+            try:
+                async for token in summarizer_service.astream_summary(
+                    request.query, transactions,
+                    data_generation=vector_service.data_generation(request.user_id)
+                ):
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    summary_parts.append(token)
+                    yield _sse_event("token", {"text": token})
+            except Exception as e:
+                yield _sse_event("error", {"detail": f"Error generating summary: {str(e)}"})
+                return
+        
+        yield _sse_event("done", {
+            "summary": "".join(summary_parts) if summary_parts else None,
+            "answer_path": "llm" if summary_parts else None,
+            "timings": {
+                "ttfb_ms": round(ttfb_ms, 1),
+                "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+                "total_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/transactions")
 async def get_transactions(
     user_id: Optional[str] = Query(None, description="Filter by user ID"),
-    limit: Optional[int] = Query(100, description="Maximum number of transactions")
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of transactions"),
+    offset: int = Query(0, ge=0, description="Number of transactions to skip"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; overrides offset"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sort by date: asc or desc")
 ):
-    """Get all transactions"""
+    """Get one page of transactions sorted by date"""
     try:
-        transactions = vector_service.get_all_transactions(user_id=user_id)
+        page = await stage_executor.run(
+            "analytics",
+            lambda: get_analytics_store().page(
+                user_id=user_id, limit=limit, offset=offset,
+                cursor=cursor, descending=order == "desc"
+            )
+        )
         return {
-            "transactions": transactions[:limit],
-            "count": len(transactions)
+            "transactions": page["transactions"],
+            "count": page["total"],
+            "offset": page["offset"],
+            "limit": limit,
+            "order": order,
+            "next_cursor": page["next_cursor"]
         }
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -70,13 +329,73 @@ async def get_transactions(
 async def get_insights(user_id: Optional[str] = Query(None)):
     """Get spending insights"""
     try:
-        transactions = vector_service.get_all_transactions(user_id=user_id)
-        insights = summarizer_service.get_spending_insights(transactions)
+        stats = await stage_executor.run(
+            "analytics", lambda: get_analytics_store().spending_stats(user_id=user_id)
+        )
+        summarizer_service = await service_registry.asummarizer_service()
+        insights = await summarizer_service.aget_spending_insights(
+            stats=stats, data_generation=service_registry.data_generation(user_id)
+        )
         
         return {
             "insights": insights,
-            "transaction_count": len(transactions)
+            "transaction_count": stats["transaction_count"]
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/aggregates")
+async def get_aggregates(
+    group_by: List[str] = Query([], description="Columns to group by: user, month, category, type"),
+    user_id: Optional[str] = Query(None, description="Filter by user ID"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    type: Optional[str] = Query(None, description="Filter by transaction type (Debit/Credit)"),
+    date_from: Optional[str] = Query(None, description="Start date (YYYY-MM or YYYY-MM-DD), inclusive"),
+    date_to: Optional[str] = Query(None, description="End date (YYYY-MM or YYYY-MM-DD), inclusive")
+):
+    """Sum, count, min, max and mean of amounts, optionally grouped"""
+    # Accept both ?group_by=a&group_by=b and ?group_by=a,b
+    columns = [c.strip() for value in group_by for c in value.split(",") if c.strip()]
+    try:
+        months = month_bounds(date_from, date_to)
+        if months is not None:
+            # Whole-month ranges are answered from the materialized rollups
+            source = "rollups"
+            rows = await stage_executor.run(
+                "analytics",
+                lambda: get_rollup_store().query(
+                    columns, user_id=user_id, category=category, txn_type=type,
+                    month_from=months[0], month_to=months[1]
+                )
+            )
+        else:
+            source = "columnar"
+            rows = await stage_executor.run(
+                "analytics",
+                lambda: get_analytics_store().aggregate(
+                    columns, user_id=user_id, category=category, txn_type=type,
+                    date_from=date_from, date_to=date_to
+                )
+            )
+        return {
+            "group_by": columns,
+            "aggregates": rows,
+            "count": len(rows),
+            "source": source
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats")
+async def get_stats():
+    """Cache hit rates and query batching histograms"""
+    vector_service = await service_registry.avector_service()
+    stats = vector_service.cache_stats()
+    summarizer_service = service_registry.loaded_summarizer
+    if summarizer_service is not None and summarizer_service.cache is not None:
+        stats["llm_responses"] = summarizer_service.cache.stats()
+    return stats
\ No newline at end of file
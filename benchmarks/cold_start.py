@@ -0,0 +1,144 @@
+"""Cold-start budget for the API: import time and time to first query.
+
+    python -m benchmarks.cold_start --runs 3 --import-budget 1.5 --first-query-budget 20
+
+Import time is measured in a fresh interpreter per run (``import api.app``).
+Each server run starts uvicorn in a subprocess and records, from spawn:
+
+- ``live_s``: first 200 from ``/health``
+- ``ready_s``: first 200 from ``/ready`` (model loaded and warmed up)
+- ``first_query_s``: first ``POST /api/search`` answered, sent right after ready
+- ``first_query_ms`` / ``second_query_ms``: latency of the first and a repeat query
+
+``--no-warmup`` starts the API with ``WARMUP_ENABLED=false`` to show what the
+first request pays without warm-up. The script exits with status 1 when a
+median exceeds its budget, so it can gate a deploy.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import api.app; "
+    "print(time.perf_counter() - started)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: Dict[str, str]) -> float:
+    """Seconds to import the API in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(client: httpx.Client, path: str, started: float, timeout: float,
+             process: subprocess.Popen) -> Optional[float]:
+    """Poll path until it returns 200; seconds since started, or None on timeout or exit"""
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def measure_server(env: Dict[str, str], query: str, user_id: str, timeout: float) -> Dict[str, Optional[float]]:
+    """Start uvicorn and time liveness, readiness and the first two queries"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.app:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    result = {"live_s": None, "ready_s": None, "first_query_s": None,
+              "first_query_ms": None, "second_query_ms": None}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            result["live_s"] = wait_for(client, "/health", started, timeout, process)
+            if result["live_s"] is None:
+                return result
+            result["ready_s"] = wait_for(client, "/ready", started, timeout, process)
+
+            body = {"query": query, "user_id": user_id, "top_k": 5}
+            for key in ("first_query_ms", "second_query_ms"):
+                sent = time.perf_counter()
+                response = client.post("/api/search", json=body)
+                response.raise_for_status()
+                result[key] = (time.perf_counter() - sent) * 1000
+                if key == "first_query_ms":
+                    result["first_query_s"] = time.perf_counter() - started
+    finally:
+        process.terminate()
+        process.wait()
+    return result
+
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--query", default="Show food expenses above 500")
+    parser.add_argument("--user-id", default="user_1")
+    parser.add_argument("--no-warmup", action="store_true", help="start the API with WARMUP_ENABLED=false")
+    parser.add_argument("--import-budget", type=float, default=1.5, help="seconds for import api.app")
+    parser.add_argument("--first-query-budget", type=float, default=20.0,
+                        help="seconds from process spawn to the first answered query")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    if args.no_warmup:
+        env["WARMUP_ENABLED"] = "false"
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    print(f"import api.app: median {median(imports):.3f}s over {args.runs} runs")
+
+    servers = []
+    for run in range(args.runs):
+        result = measure_server(env, args.query, args.user_id, args.timeout)
+        servers.append(result)
+        print(f"run {run + 1}: " + ", ".join(
+            f"{key}={value:.3f}" if value is not None else f"{key}=n/a" for key, value in result.items()
+        ))
+
+    summary = {key: median([s[key] for s in servers]) for key in servers[0]}
+    summary["import_s"] = median(imports)
+    budgets = {"import_s": args.import_budget, "first_query_s": args.first_query_budget}
+    over = [key for key, budget in budgets.items() if summary[key] is None or summary[key] > budget]
+
+    for key, budget in budgets.items():
+        value = summary[key]
+        mark = "⚠️" if key in over else "✅"
+        shown = f"{value:.3f}s" if value is not None else "n/a"
+        print(f"{mark} {key}: {shown} (budget {budget:.1f}s)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"warmup": not args.no_warmup, "budgets": budgets, "summary": summary,
+                       "imports": imports, "runs": servers}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    sys.exit(1 if over else 0)
@@ -0,0 +1,135 @@
+"""Load time and memory of transactions.json versus its columnar sidecar.
+
+    python -m benchmarks.data_formats --rows 1000000 --output formats.json
+    python -m benchmarks.data_formats --input data/transactions.json
+
+With ``--rows``, a fixed-seed dataset is generated and written as an
+indented JSON array, the same layout as ``data/transactions.json``. Every
+mode runs in a fresh subprocess, so peak RSS is not shared between them:
+
+* ``json_load``: ``json.load`` of the whole array (what readers used to do)
+* ``stream_records`` / ``sidecar_records``: ``load_transactions`` without and
+  with the sidecar (the ingest path, which needs transaction dicts)
+* ``stream_store`` / ``sidecar_store``: ``AnalyticsStore.load_file`` without
+  and with the sidecar (API aggregates, Streamlit tabs)
+* ``sidecar_projection``: total debit amount from only the memory-mapped
+  ``type`` and ``amount`` columns
+* ``write_sidecar``: parsing the JSON once and writing the sidecar
+
+``rss_delta_mb`` is peak RSS minus RSS after imports.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+from benchmarks.suite import peak_rss_mb
+
+MODES = ["write_sidecar", "json_load", "stream_records", "sidecar_records",
+         "stream_store", "sidecar_store", "sidecar_projection"]
+
+
+def run_mode(mode: str, path: str) -> Dict:
+    """One measurement, in this (fresh) process"""
+    from services.analytics_store import AnalyticsStore
+    from services.columnar_sidecar import open_sidecar, write_sidecar
+    from services.transaction_io import load_transactions
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "write_sidecar":
+        rows = write_sidecar(path).rows
+    elif mode == "json_load":
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = len(json.load(f))
+    elif mode in ("stream_records", "sidecar_records"):
+        rows = len(load_transactions(path))
+    elif mode in ("stream_store", "sidecar_store"):
+        store = AnalyticsStore()
+        store.load_file(path)
+        rows = len(store)
+    elif mode == "sidecar_projection":
+        sidecar = open_sidecar(path, create=False)
+        debit = sidecar.vocab["type"].index("Debit")
+        total = float(sidecar.column("amount")[sidecar.column("type") == debit].sum())
+        rows = sidecar.rows
+    else:
+        raise ValueError(f"Unknown mode '{mode}'")
+    seconds = time.perf_counter() - started
+
+    result = {"mode": mode, "rows": rows, "seconds": round(seconds, 3), "peak_rss_mb": peak_rss_mb()}
+    result["rss_delta_mb"] = round(result["peak_rss_mb"] - baseline, 1)
+    if mode == "sidecar_projection":
+        result["total_debit"] = total
+    return result
+
+
+def write_json_array(jsonl_path: str, json_path: str):
+    """Rewrite a JSONL file as an indented JSON array, streaming"""
+    with open(jsonl_path, 'r', encoding='utf-8') as src, open(json_path, 'w', encoding='utf-8') as out:
+        out.write("[")
+        for i, line in enumerate(src):
+            body = json.dumps(json.loads(line), indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            out.write(("," if i else "") + "\n  " + body)
+        out.write("\n]")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON vs columnar sidecar load benchmark")
+    parser.add_argument("--input", help="existing JSON or JSONL transactions file")
+    parser.add_argument("--rows", type=int, default=100000, help="rows to generate when --input is not given")
+    parser.add_argument("--per-user", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.child, args.input)))
+        sys.exit(0)
+
+    workdir = None
+    path = args.input
+    if path is None:
+        workdir = tempfile.mkdtemp(prefix="benchmark_formats_")
+        jsonl_path = os.path.join(workdir, "transactions.jsonl")
+        # Generate in a subprocess: children inherit this process's peak RSS across exec
+        subprocess.run(
+            [sys.executable, "-m", "services.data_generator", "--bulk", "--users", str(max(1, args.rows // args.per_user)),
+             "--per-user", str(args.per_user), "--seed", str(args.seed), "--output", jsonl_path],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        path = os.path.join(workdir, "transactions.json")
+        write_json_array(jsonl_path, path)
+        os.remove(jsonl_path)
+
+    results = []
+    try:
+        for mode in MODES:
+            env = dict(os.environ, DATA_SIDECAR_ENABLED="false" if mode.startswith(("json", "stream")) else "true")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.data_formats", "--child", mode, "--input", path],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            print(f"  {mode:<20} {result['seconds']:>8.3f}s  peak RSS {result['peak_rss_mb']:>8,.1f} MB  "
+                  f"(+{result['rss_delta_mb']:,.1f} MB)")
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    by_mode = {result["mode"]: result for result in results}
+    print(f"\n✅ {by_mode['json_load']['rows']:,} rows: store load "
+          f"{by_mode['stream_store']['seconds'] / max(by_mode['sidecar_store']['seconds'], 1e-6):.1f}x faster "
+          f"and records {by_mode['stream_records']['seconds'] / max(by_mode['sidecar_records']['seconds'], 1e-6):.1f}x "
+          f"faster from the sidecar")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"input": args.input, "rows": by_mode["json_load"]["rows"], "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
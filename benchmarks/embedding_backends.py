@@ -0,0 +1,103 @@
+"""Parity and speed of the embedding backends against the PyTorch reference.
+
+    python -m benchmarks.embedding_backends --backends onnx onnx:avx2 --rows 2000
+
+Each candidate is written as ``backend[:quantization]``. For every candidate
+the script reports the cosine similarity of its vectors to the PyTorch ones
+(min and mean over all texts), single-query latency percentiles and batch
+throughput. It exits non-zero if any candidate's mean cosine similarity falls
+below ``--min-cosine``.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+import numpy as np
+from benchmarks.embedding_throughput import build_texts
+from benchmarks.load_test import QUERIES, percentile
+from services.embedding_service import EmbeddingService
+
+
+def cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def measure(service: EmbeddingService, texts: List[str], queries: List[str]) -> Dict:
+    for query in queries[:5]:
+        service.generate_embedding(query)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        service.generate_embedding(query)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    vectors = service.model.encode(texts, convert_to_numpy=True)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "vectors": vectors,
+        "query_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "query_p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "batch_rows_per_sec": round(len(texts) / elapsed, 1)
+    }
+
+
+def run_benchmark(candidates: List[str], rows: int, repeat: int, seed: int) -> Dict:
+    reference = EmbeddingService(use_cache=False, backend="torch")
+    texts = build_texts(reference, rows, seed)
+    queries = QUERIES * repeat
+
+    baseline = measure(reference, texts, queries)
+    results = [{
+        "backend": "torch",
+        "query_p50_ms": baseline["query_p50_ms"],
+        "query_p95_ms": baseline["query_p95_ms"],
+        "batch_rows_per_sec": baseline["batch_rows_per_sec"],
+        "min_cosine": 1.0,
+        "mean_cosine": 1.0
+    }]
+
+    for candidate in candidates:
+        backend, _, quantization = candidate.partition(":")
+        service = EmbeddingService(use_cache=False, backend=backend, quantization=quantization)
+        stats = measure(service, texts, queries)
+        similarity = cosine_rows(baseline["vectors"], stats.pop("vectors"))
+        results.append({
+            "backend": service.model_id.split("@")[-1],
+            **stats,
+            "min_cosine": round(float(similarity.min()), 5),
+            "mean_cosine": round(float(similarity.mean()), 5)
+        })
+
+    return {"rows": rows, "queries": len(queries), "model": reference.model_name, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding backend parity and latency")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx:avx2"])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=25, help="times each sample query is timed")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.backends, args.rows, args.repeat, args.seed)
+
+    print(f"✅ {report['rows']:,} rows, {report['queries']} queries with {report['model']}")
+    failed = False
+    for result in report["results"]:
+        ok = result["mean_cosine"] >= args.min_cosine
+        failed |= not ok
+        print(f"  {result['backend']:<18} p50 {result['query_p50_ms']:>7}ms  p95 {result['query_p95_ms']:>7}ms  "
+              f"{result['batch_rows_per_sec']:>9,.1f} rows/s  cosine min {result['min_cosine']} "
+              f"mean {result['mean_cosine']} {'' if ok else '⚠️ below threshold'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(1 if failed else 0)
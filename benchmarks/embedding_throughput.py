@@ -0,0 +1,80 @@
+"""Compare single-process and multi-process embedding throughput.
+
+    python -m benchmarks.embedding_throughput --rows 20000 --workers 2 4 0
+
+Texts are built from synthetic transactions exactly as ingest builds them.
+The single-process path is one ``model.encode`` call (the default ingest
+path); each pool size is warmed up before timing so model loading in the
+workers is not counted. ``0`` workers means one per CPU core.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+import numpy as np
+from services.data_generator import generate_columns
+from services.embedding_service import EmbeddingService
+
+
+def build_texts(service: EmbeddingService, rows: int, seed: int) -> List[str]:
+    per_user = 500
+    columns = generate_columns(np.random.default_rng(seed), 0, (rows - 1) // per_user + 1, per_user, "2024-12-31")
+    names = list(columns)
+    transactions = [dict(zip(names, values)) for values in zip(*(columns[n].tolist() for n in names))]
+    return [service.create_transaction_text(txn) for txn in transactions[:rows]]
+
+
+def run_benchmark(rows: int, workers: List[int], seed: int) -> Dict:
+    service = EmbeddingService(use_cache=False)
+    texts = build_texts(service, rows, seed)
+    cores = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    reference = service.model.encode(texts, convert_to_numpy=True)
+    single = time.perf_counter() - start
+    results = [{"workers": 1, "seconds": round(single, 2), "rows_per_sec": round(rows / single, 1), "speedup": 1.0}]
+
+    for count in workers:
+        started_workers = service.start_pool(count)
+        try:
+            service._encode(texts[:service.pool_chunk_size * started_workers])  # load the model in every worker
+            start = time.perf_counter()
+            embeddings = service._encode(texts)
+            elapsed = time.perf_counter() - start
+        finally:
+            service.stop_pool()
+
+        # Same model and inputs, so vectors should match the single-process run
+        cosine = float(np.min(np.sum(reference * embeddings, axis=1) / (
+            np.linalg.norm(reference, axis=1) * np.linalg.norm(embeddings, axis=1)
+        )))
+        results.append({
+            "workers": started_workers,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(rows / elapsed, 1),
+            "speedup": round(single / elapsed, 2),
+            "min_cosine_vs_single": round(cosine, 6)
+        })
+
+    return {"rows": rows, "cpu_count": cores, "model": service.model_name, "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding throughput: single process vs worker pool")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 0])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.rows, args.workers, args.seed)
+
+    print(f"✅ {report['rows']:,} rows on {report['cpu_count']} cores with {report['model']}")
+    for result in report["results"]:
+        print(f"  {result['workers']:>3} workers  {result['rows_per_sec']:>10,.1f} rows/s  "
+              f"{result['seconds']:>7}s  x{result['speedup']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,104 @@
+"""Local stand-in for the Groq chat completions API.
+
+    python -m benchmarks.groq_stub --port 8100 --latency-ms 300
+
+Point the API at it with ``GROQ_BASE_URL=http://127.0.0.1:8100`` (and any
+``GROQ_API_KEY``) to load-test summaries without network calls or rate
+limits. Every request sleeps ``--latency-ms`` and returns a fixed answer;
+streamed requests send it as ``--chunks`` OpenAI-style SSE chunks spread over
+the same latency.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+STUB_ANSWER = (
+    "You spent most of this on food and shopping. The largest payments were to a few "
+    "merchants, and your debits outweigh your credits for the period."
+)
+
+
+def make_handler(latency_ms: float, chunks: int):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = body.get("model", "stub")
+
+            if not body.get("stream"):
+                time.sleep(latency_ms / 1000)
+                payload = json.dumps({
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": STUB_ANSWER},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            words = STUB_ANSWER.split(" ")
+            size = max(1, len(words) // max(1, chunks))
+            for i in range(0, len(words), size):
+                time.sleep(latency_ms / 1000 / max(1, chunks))
+                text = " ".join(words[i:i + size]) + ("" if i + size >= len(words) else " ")
+                event = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+                }
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return StubHandler
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 300, chunks: int = 8) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the stub on a background thread; returns the server and its base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms, chunks))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="groq-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Groq chat completions stub")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--chunks", type=int, default=8, help="chunks per streamed answer")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.latency_ms, args.chunks)
+    print(f"✅ Groq stub listening on {url} (set GROQ_BASE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
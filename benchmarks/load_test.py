@@ -0,0 +1,120 @@
+"""Load test for the API under mixed search and summarize traffic.
+
+Start the API first (``python api/app.py``), then run:
+
+    python -m benchmarks.load_test --concurrency 32 --duration 30 --summarize-ratio 0.2
+
+Each virtual client loops for the given duration, sending a plain
+``/api/search`` request or, with probability ``--summarize-ratio``, one with
+``summarize=true``. Throughput and latency percentiles are reported per kind,
+which shows whether slow LLM calls stall plain searches.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List
+import httpx
+
+QUERIES = [
+    "Show all UPI transactions above ₹1000",
+    "What's my biggest expense in August?",
+    "How much did I spend on food last month?",
+    "Show my top 5 expenses in September",
+    "List all salary credits",
+    "What did I spend on entertainment?",
+    "Show transactions from Swiggy",
+    "My total spending on shopping",
+]
+
+USERS = [None, "user_1", "user_2", "user_3"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def client_loop(client: httpx.AsyncClient, deadline: float, summarize_ratio: float,
+                      latencies: Dict[str, List[float]], errors: Dict[str, int], rng: random.Random):
+    while time.perf_counter() < deadline:
+        kind = "summarize" if rng.random() < summarize_ratio else "search"
+        payload = {
+            "query": rng.choice(QUERIES),
+            "user_id": rng.choice(USERS),
+            "top_k": 10,
+            "summarize": kind == "summarize"
+        }
+        start = time.perf_counter()
+        try:
+            response = await client.post("/api/search", json=payload)
+            response.raise_for_status()
+            latencies[kind].append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            errors[kind] += 1
+
+
+async def run_load_test(base_url: str, concurrency: int, duration: float,
+                        summarize_ratio: float, seed: int) -> Dict:
+    latencies = {"search": [], "summarize": []}
+    errors = {"search": 0, "summarize": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*[
+            client_loop(client, deadline, summarize_ratio, latencies, errors, random.Random(seed + i))
+            for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    report = {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "summarize_ratio": summarize_ratio,
+        "total_rps": round(sum(len(v) for v in latencies.values()) / elapsed, 2),
+        "kinds": {}
+    }
+    for kind, values in latencies.items():
+        report["kinds"][kind] = {
+            "requests": len(values),
+            "errors": errors[kind],
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1)
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mixed search/summarize load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--summarize-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(
+        args.base_url, args.concurrency, args.duration, args.summarize_ratio, args.seed
+    ))
+
+    print(f"✅ {report['total_rps']} req/s total over {report['duration_s']}s "
+          f"with {report['concurrency']} clients")
+    for kind, stats in report["kinds"].items():
+        print(f"  {kind:<10} {stats['requests']:>6} ok  {stats['errors']:>4} err  "
+              f"{stats['rps']:>8} req/s  p50 {stats['p50_ms']}ms  "
+              f"p95 {stats['p95_ms']}ms  p99 {stats['p99_ms']}ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
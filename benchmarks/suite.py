@@ -0,0 +1,330 @@
+"""Reproducible end-to-end benchmark: ingest, query latency, recall and API latency.
+
+    python -m benchmarks.suite --sizes 10000 100000 1000000 --output report.json
+    python -m benchmarks.suite --sizes 10000 --compare report.json
+
+For each size, a fixed-seed dataset is generated with
+``FinancialDataGenerator.generate_bulk``. Each size then runs in a fresh
+subprocess with its own Chroma, NumPy index and embedding cache directories,
+so peak RSS and timings are not polluted by earlier sizes. Measured:
+
+* ingest rows/sec of a full ``initialize_database`` build, and peak RSS
+* single-query latency of ``search`` (query embedding cache cleared each time)
+* batched latency: ``--batch-size`` concurrent ``asearch`` calls at a time
+* recall@k of ``search_by_embedding`` against an exact scan of the user's vectors
+* end-to-end ``POST /api/search`` latency in process, with and without
+  summaries, against a local Groq stub (``benchmarks.groq_stub``)
+
+The JSON report records the git commit and the relevant settings;
+``--compare`` prints each metric next to the same metric in an earlier report.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+import numpy as np
+from benchmarks.load_test import QUERIES, percentile
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    return {
+        "count": len(latencies),
+        "mean_ms": round(float(np.mean(latencies)) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def query_plan(users: List[str], count: int) -> List[tuple]:
+    return [(QUERIES[i % len(QUERIES)], users[(i // len(QUERIES)) % len(users)]) for i in range(count)]
+
+
+def bench_single(service, plan: List[tuple], k: int) -> Dict:
+    for query, user_id in plan[:5]:
+        service.search(query, n_results=k, user_id=user_id)
+
+    latencies = []
+    for query, user_id in plan:
+        service.query_embedding_cache.clear()
+        started = time.perf_counter()
+        service.search(query, n_results=k, user_id=user_id)
+        latencies.append(time.perf_counter() - started)
+    return latency_summary(latencies)
+
+
+def bench_batched(service, plan: List[tuple], k: int, batch_size: int) -> Dict:
+    async def timed(query: str, user_id: str) -> float:
+        started = time.perf_counter()
+        await service.asearch(query, n_results=k, user_id=user_id)
+        return time.perf_counter() - started
+
+    async def run() -> Dict:
+        latencies = []
+        started = time.perf_counter()
+        for i in range(0, len(plan), batch_size):
+            service.query_embedding_cache.clear()
+            latencies += await asyncio.gather(*(timed(q, u) for q, u in plan[i:i + batch_size]))
+        elapsed = time.perf_counter() - started
+        return {**latency_summary(latencies), "batch_size": batch_size, "qps": round(len(latencies) / elapsed, 1)}
+
+    return asyncio.run(run())
+
+
+def bench_recall(service, plan: List[tuple], k: int) -> Dict:
+    """Mean recall@k of the vector store against an exact scan of each user's vectors"""
+    embedding_service = service.embedding_service
+    user_vectors = {}
+    recalls = []
+    for query, user_id in plan:
+        if user_id not in user_vectors:
+            transactions = service.get_all_transactions(user_id)
+            texts = [embedding_service.create_transaction_text(txn) for txn in transactions]
+            vectors = np.asarray(embedding_service.generate_embeddings_batch(texts, verbose=False), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            user_vectors[user_id] = ([txn['id'] for txn in transactions], vectors)
+        ids, vectors = user_vectors[user_id]
+        if not ids:
+            continue
+
+        embedding = np.asarray(embedding_service.generate_embedding(query), dtype=np.float32)
+        exact = {ids[i] for i in np.argsort(-(vectors @ embedding), kind='stable')[:k]}
+        found = {txn['id'] for txn in service.search_by_embedding(embedding.tolist(), n_results=k, user_id=user_id)}
+        recalls.append(len(found & exact) / len(exact))
+    return {"k": k, "queries": len(recalls), "recall": round(float(np.mean(recalls)), 4) if recalls else None}
+
+
+def bench_api(plan: List[tuple], k: int, summarize_every: int, llm_latency_ms: float) -> Dict:
+    import httpx
+    from benchmarks.groq_stub import start_stub_server
+
+    server, url = start_stub_server(latency_ms=llm_latency_ms)
+    os.environ["GROQ_BASE_URL"] = url
+    try:
+        from api.app import app
+        from services.service_registry import service_registry
+
+        # ASGITransport does not run startup events; warm up so the first timed request does not load the model
+        service_registry.warm_up()
+
+        async def run() -> Dict:
+            latencies = {"search": [], "search_summarize": []}
+            errors = 0
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                for i, (query, user_id) in enumerate(plan):
+                    summarize = summarize_every > 0 and i % summarize_every == 0
+                    started = time.perf_counter()
+                    response = await client.post("/api/search", json={
+                        "query": query, "user_id": user_id, "top_k": k, "summarize": summarize
+                    })
+                    elapsed = time.perf_counter() - started
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                    latencies["search_summarize" if summarize else "search"].append(elapsed)
+            report = {kind: latency_summary(values) for kind, values in latencies.items() if values}
+            report["errors"] = errors
+            report["llm_latency_ms"] = llm_latency_ms
+            return report
+
+        return asyncio.run(run())
+    finally:
+        server.shutdown()
+
+
+def run_size(args) -> Dict:
+    """One size, in this (fresh) process; paths come from the environment set by the parent"""
+    from config.settings import settings
+    from services.data_generator import FinancialDataGenerator
+
+    num_users = (args.rows - 1) // args.per_user + 1
+    result = {"rows": num_users * args.per_user, "users": num_users, "per_user": args.per_user}
+
+    started = time.perf_counter()
+    FinancialDataGenerator().generate_bulk(settings.DATA_PATH, num_users, args.per_user, output_format="jsonl",
+                                           seed=args.seed, end_date=args.end_date)
+    result["generate_seconds"] = round(time.perf_counter() - started, 2)
+
+    from services.vector_search_service import VectorSearchService
+    service = VectorSearchService()
+    started = time.perf_counter()
+    service.initialize_database(settings.DATA_PATH, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    result["ingest"] = {
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(result["rows"] / elapsed, 1),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    rng = np.random.default_rng(args.seed)
+    users = [f"user_{i}" for i in sorted(rng.choice(np.arange(1, num_users + 1), min(num_users, 8), replace=False))]
+    plan = query_plan(users, args.queries)
+
+    result["query_single"] = bench_single(service, plan, args.k)
+    result["query_batched"] = bench_batched(service, plan, args.k, args.batch_size)
+    result["recall"] = bench_recall(service, plan[:args.recall_queries], args.k)
+    try:
+        result["api"] = bench_api(plan[:args.api_requests], args.k, args.summarize_every, args.llm_latency_ms)
+    except Exception as e:
+        print(f"⚠️ API benchmark skipped: {e}")
+        result["api"] = {"error": str(e)}
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    result["config"] = {
+        "vector_backend": settings.VECTOR_BACKEND,
+        "vector_partitions": settings.VECTOR_PARTITIONS,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "embedding_backend": settings.EMBEDDING_BACKEND,
+        "embedding_quantization": settings.EMBEDDING_QUANTIZATION,
+        "embedding_workers": args.workers if args.workers is not None else settings.EMBEDDING_WORKERS,
+        "ingest_chunk_size": settings.INGEST_CHUNK_SIZE,
+        "lexical_search": settings.LEXICAL_SEARCH_ENABLED,
+        "query_batching": settings.QUERY_BATCHING_ENABLED
+    }
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(report: Dict, prefix: str = "") -> Dict[str, float]:
+    values = {}
+    for key, value in report.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(report: Dict, baseline: Dict):
+    """Print every numeric metric next to the baseline's, per matching size"""
+    previous = {run["rows"]: flatten(run) for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        old = previous.get(run["rows"])
+        if old is None:
+            print(f"⚠️ No baseline run with {run['rows']:,} rows")
+            continue
+        print(f"{run['rows']:,} rows vs {baseline.get('git_commit') or 'baseline'}:")
+        for name, value in flatten(run).items():
+            if name in old and old[name] and name not in ("rows", "users", "per_user") and not name.endswith(".count"):
+                change = (value - old[name]) / old[name] * 100
+                print(f"  {name:<40} {old[name]:>12} -> {value:<12} {change:+.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest, query latency, recall and API benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--per-user", type=int, default=1000, help="transactions per user")
+    parser.add_argument("--queries", type=int, default=200, help="queries per latency measurement")
+    parser.add_argument("--batch-size", type=int, default=16, help="concurrent queries per batch")
+    parser.add_argument("--recall-queries", type=int, default=64)
+    parser.add_argument("--api-requests", type=int, default=100)
+    parser.add_argument("--summarize-every", type=int, default=5, help="every Nth API request asks for a summary (0 = never)")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="latency of the Groq stub")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes for ingest")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", default="2024-12-31", help="last transaction date, fixed for reproducibility")
+    parser.add_argument("--workdir", help="Keep generated data and indexes here instead of a temporary directory")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with open(args.result, 'w', encoding='utf-8') as f:
+            json.dump(run_size(args), f, indent=2)
+        sys.exit(0)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="benchmark_suite_")
+    passthrough = [
+        "--per-user", str(args.per_user), "--queries", str(args.queries), "--batch-size", str(args.batch_size),
+        "--recall-queries", str(args.recall_queries), "--api-requests", str(args.api_requests),
+        "--summarize-every", str(args.summarize_every), "--llm-latency-ms", str(args.llm_latency_ms),
+        "--k", str(args.k), "--seed", str(args.seed), "--end-date", args.end_date
+    ]
+    if args.workers is not None:
+        passthrough += ["--workers", str(args.workers)]
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "runs": []
+    }
+    try:
+        for rows in args.sizes:
+            directory = os.path.join(workdir, f"rows_{rows}")
+            os.makedirs(directory, exist_ok=True)
+            env = {
+                **os.environ,
+                "DATA_PATH": os.path.join(directory, "transactions.jsonl"),
+                "CHROMA_DB_PATH": os.path.join(directory, "chroma_db"),
+                "NUMPY_INDEX_PATH": os.path.join(directory, "numpy_index"),
+                "EMBEDDING_CACHE_PATH": os.path.join(directory, "embedding_cache"),
+                "LLM_CACHE_ENABLED": "false",
+                "RESULT_CACHE_ENABLED": "false",
+                "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "stub"
+            }
+            result_path = os.path.join(directory, "result.json")
+            print(f"🔄 Benchmarking {rows:,} rows...")
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.suite", "--child", "--rows", str(rows), "--result", result_path,
+                 *passthrough],
+                env=env, check=True
+            )
+            with open(result_path, 'r', encoding='utf-8') as f:
+                report["runs"].append(json.load(f))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n✅ Benchmarked {len(report['runs'])} sizes at commit {report['git_commit'] or 'unknown'}")
+    for run in report["runs"]:
+        single, batched = run["query_single"], run["query_batched"]
+        print(f"  {run['rows']:>9,} rows  ingest {run['ingest']['rows_per_sec']:>9,.1f} rows/s  "
+              f"peak RSS {run['peak_rss_mb']:,.0f} MB  recall@{run['recall']['k']} {run['recall']['recall']}")
+        print(f"  {'':>14}single p50/p95/p99 {single['p50_ms']}/{single['p95_ms']}/{single['p99_ms']}ms  "
+              f"batched x{batched['batch_size']} {batched['p50_ms']}/{batched['p95_ms']}/{batched['p99_ms']}ms "
+              f"({batched['qps']} qps)")
+        api = run["api"]
+        if "search" in api:
+            line = f"  {'':>14}/api/search p50/p95/p99 {api['search']['p50_ms']}/{api['search']['p95_ms']}/{api['search']['p99_ms']}ms"
+            if "search_summarize" in api:
+                summarize = api["search_summarize"]
+                line += f"  with summary {summarize['p50_ms']}/{summarize['p95_ms']}/{summarize['p99_ms']}ms"
+            print(line)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
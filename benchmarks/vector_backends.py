@@ -0,0 +1,172 @@
+"""Latency and recall of the vector backends against an exact brute-force scan.
+
+    python -m benchmarks.vector_backends --rows 100000 --per-user 2000 --queries 200
+
+Synthetic transactions are given clustered unit vectors (a centroid per
+category plus a smaller one per merchant plus noise) instead of model
+embeddings, so large collections can be built quickly. Every backend is built
+from the same rows in a temporary directory and asked the same queries: most
+are scoped to one user, as the API does, and ``--global-ratio`` of them search
+all users. Recall@k is measured against an exact scan of the same vectors.
+``--partitions N`` builds every backend split into N user-hash partitions.
+"""
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+import numpy as np
+from benchmarks.load_test import percentile
+from services.data_generator import generate_columns
+from services.vector_backends import create_vector_backend
+
+
+def build_rows(rows: int, per_user: int, dim: int, seed: int) -> Dict:
+    rng = np.random.default_rng(seed)
+    columns = generate_columns(rng, 0, (rows - 1) // per_user + 1, per_user, "2024-12-31")
+    columns = {name: values[:rows] for name, values in columns.items()}
+
+    _, category_idx = np.unique(columns["category"], return_inverse=True)
+    _, merchant_idx = np.unique(columns["description"], return_inverse=True)
+    vectors = (
+        rng.normal(size=(category_idx.max() + 1, dim))[category_idx]
+        + 0.5 * rng.normal(size=(merchant_idx.max() + 1, dim))[merchant_idx]
+        + 0.5 * rng.normal(size=(rows, dim))
+    ).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    metadatas = [
+        {"id": txn_id, "userId": user, "category": category, "amount_num": float(amount)}
+        for txn_id, user, category, amount in zip(
+            columns["id"].tolist(), columns["userId"].tolist(),
+            columns["category"].tolist(), columns["amount"].tolist()
+        )
+    ]
+    return {
+        "ids": columns["id"].tolist(),
+        "users": columns["userId"],
+        "documents": columns["description"].tolist(),
+        "metadatas": metadatas,
+        "vectors": vectors
+    }
+
+
+def build_queries(data: Dict, count: int, global_ratio: float, seed: int) -> List[Dict]:
+    rng = np.random.default_rng(seed + 1)
+    users = np.unique(data["users"])
+    queries = []
+    for _ in range(count):
+        # Perturb a stored vector so queries land near real clusters
+        base = data["vectors"][rng.integers(0, len(data["vectors"]))]
+        vector = base + 0.8 * rng.normal(size=base.shape).astype(np.float32) / np.sqrt(len(base))
+        user = None if rng.random() < global_ratio else str(rng.choice(users))
+        queries.append({"vector": vector / np.linalg.norm(vector), "user": user})
+    return queries
+
+
+def exact_top_k(data: Dict, query: Dict, k: int) -> List[str]:
+    scores = data["vectors"] @ query["vector"]
+    if query["user"] is not None:
+        scores = np.where(data["users"] == query["user"], scores, -np.inf)
+    top = np.argsort(-scores, kind='stable')[:k]
+    return [data["ids"][i] for i in top if np.isfinite(scores[i])]
+
+
+def run_backend(name: str, data: Dict, queries: List[Dict], truth: List[List[str]],
+                k: int, batch_size: int, partitions: int) -> Dict:
+    directory = tempfile.mkdtemp(prefix=f"vector_{name}_")
+    try:
+        backend = create_vector_backend(name, directory, partitions)
+        collection = backend.create_collection(name="benchmark")
+
+        start = time.perf_counter()
+        for i in range(0, len(data["ids"]), batch_size):
+            collection.upsert(
+                ids=data["ids"][i:i + batch_size],
+                embeddings=data["vectors"][i:i + batch_size],
+                documents=data["documents"][i:i + batch_size],
+                metadatas=data["metadatas"][i:i + batch_size]
+            )
+        backend.optimize(collection)
+        build_seconds = time.perf_counter() - start
+
+        for query in queries[:5]:
+            collection.query(query_embeddings=[query["vector"].tolist()], n_results=k,
+                             where={"userId": query["user"]} if query["user"] else None)
+
+        latencies = {"user": [], "global": []}
+        recalls = []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            result = collection.query(
+                query_embeddings=[query["vector"].tolist()],
+                n_results=k,
+                where={"userId": query["user"]} if query["user"] else None
+            )
+            latencies["user" if query["user"] else "global"].append(time.perf_counter() - started)
+            found = set(result["ids"][0])
+            recalls.append(len(found & set(expected)) / len(expected) if expected else 1.0)
+
+        report = {"backend": name, "partitions": partitions, "build_seconds": round(build_seconds, 2), "recall_at_k": round(float(np.mean(recalls)), 4)}
+        for scope, values in latencies.items():
+            if values:
+                report[f"{scope}_p50_ms"] = round(percentile(values, 50) * 1000, 3)
+                report[f"{scope}_p95_ms"] = round(percentile(values, 95) * 1000, 3)
+                report[f"{scope}_p99_ms"] = round(percentile(values, 99) * 1000, 3)
+        return report
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_benchmark(backends: List[str], rows: int, per_user: int, dim: int, queries: int,
+                  global_ratio: float, k: int, batch_size: int, partitions: int, seed: int) -> Dict:
+    data = build_rows(rows, per_user, dim, seed)
+    query_set = build_queries(data, queries, global_ratio, seed)
+    truth = [exact_top_k(data, query, k) for query in query_set]
+
+    results = []
+    for name in backends:
+        try:
+            results.append(run_backend(name, data, query_set, truth, k, batch_size, partitions))
+        except ImportError as e:
+            print(f"⚠️ Skipping {name} backend: {e}")
+
+    return {
+        "rows": rows,
+        "users": int(len(np.unique(data["users"]))),
+        "dim": dim,
+        "queries": queries,
+        "k": k,
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector backend latency and recall")
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--per-user", type=int, default=2000, help="transactions per user")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--global-ratio", type=float, default=0.1, help="share of queries across all users")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per upsert")
+    parser.add_argument("--partitions", type=int, default=0, help="user-hash partitions (0 = one collection)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.backends, args.rows, args.per_user, args.dim, args.queries,
+                           args.global_ratio, args.k, args.batch_size, args.partitions, args.seed)
+
+    print(f"✅ {report['rows']:,} rows over {report['users']} users, {report['queries']} queries, k={report['k']}")
+    for result in report["results"]:
+        print(f"  {result['backend']:<8} x{result['partitions']:<3} recall@k {result['recall_at_k']:<7} "
+              f"user p50 {result.get('user_p50_ms', '-')}ms p95 {result.get('user_p95_ms', '-')}ms  "
+              f"global p50 {result.get('global_p50_ms', '-')}ms p95 {result.get('global_p95_ms', '-')}ms  "
+              f"build {result['build_seconds']}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
@@ -10,11 +10,49 @@ class Settings:
     # Model Configuration
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
     LLM_MODEL = "llama-3.1-8b-instant"  # Groq model
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch or onnx
+    EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "")  # onnx int8: avx2, avx512, avx512_vnni or arm64
+    EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH", "./embeddings/onnx_models")
     
     # Paths
     DATA_PATH = os.getenv("DATA_PATH", "./data/transactions.json")
+    DATA_SIDECAR_ENABLED = os.getenv("DATA_SIDECAR_ENABLED", "true").lower() == "true"  # columnar copy at <DATA_PATH>.columns/
     CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./embeddings/chroma_db")
     
+    # Vector Store
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")  # chroma or numpy
+    NUMPY_INDEX_PATH = os.getenv("NUMPY_INDEX_PATH", "./embeddings/numpy_index")
+    VECTOR_PARTITIONS = int(os.getenv("VECTOR_PARTITIONS", "0"))  # user-hash partitions; 0 = one shared collection
+    VECTOR_OPEN_PARTITIONS = int(os.getenv("VECTOR_OPEN_PARTITIONS", "16"))  # LRU of open partitions
+    
+    # Embedding Cache
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embeddings/embedding_cache")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+    EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")  # float16 or float32
+    
+    # Multi-process Embedding (bulk ingest)
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))  # 0 = one per CPU core
+    EMBEDDING_THREADS_PER_WORKER = int(os.getenv("EMBEDDING_THREADS_PER_WORKER", "0"))  # 0 = cores / workers
+    EMBEDDING_POOL_CHUNK_SIZE = int(os.getenv("EMBEDDING_POOL_CHUNK_SIZE", "256"))
+    
+    # API Concurrency
+    EXECUTOR_MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", "8"))
+    EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "2"))
+    VECTOR_STORE_CONCURRENCY = int(os.getenv("VECTOR_STORE_CONCURRENCY", "4"))
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+    
+    # Streaming Ingest
+    INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "512"))
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))  # chunks buffered between stages
+    
+    # LLM Response Cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory or disk
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./embeddings/llm_cache.sqlite3")
+    LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+    
     # Data Generation Settings
     NUM_USERS = 3
     TRANSACTIONS_PER_USER = 150
@@ -25,7 +63,41 @@ class Settings:
         "Utilities", "Entertainment", "Travel", "Others"
     ]
     
+    # Merchants per category (used by the data generator and the query parser)
+    MERCHANTS = {
+        "Food": ["Swiggy", "Zomato", "McDonald's", "Dominos", "Starbucks", "Local Restaurant"],
+        "Shopping": ["Amazon", "Flipkart", "Big Basket", "DMart", "Myntra", "Ajio"],
+        "Rent": ["Monthly Rent", "House Rent", "Apartment Rent"],
+        "Salary": ["Monthly Salary", "Salary Credit", "Income"],
+        "Utilities": ["Electricity Bill", "Water Bill", "Internet Bill", "Mobile Recharge", "Gas Bill"],
+        "Entertainment": ["Netflix", "Amazon Prime", "BookMyShow", "Spotify", "Movie Ticket"],
+        "Travel": ["Uber", "Ola", "Rapido", "Petrol", "Train Ticket", "Flight Booking"],
+        "Others": ["ATM Withdrawal", "Bank Charges", "Insurance", "Medical", "Groceries"]
+    }
+    
     # Search Settings
     TOP_K_RESULTS = 10
+    QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "false").lower() == "true"
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+    LEXICAL_SEARCH_ENABLED = os.getenv("LEXICAL_SEARCH_ENABLED", "true").lower() == "true"
+    RRF_K = int(os.getenv("RRF_K", "60"))  # reciprocal-rank fusion constant
+    SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "500"))  # per /api/search/batch request
+    SEARCH_BATCH_SUMMARY_CONCURRENCY = int(os.getenv("SEARCH_BATCH_SUMMARY_CONCURRENCY", "4"))
+    LOCAL_ANSWERS_ENABLED = os.getenv("LOCAL_ANSWERS_ENABLED", "true").lower() == "true"  # totals, counts, top-N without the LLM
+    
+    # Query Embedding Micro-batching
+    QUERY_BATCHING_ENABLED = os.getenv("QUERY_BATCHING_ENABLED", "true").lower() == "true"
+    QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+    QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+    
+    # Observability
+    SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"  # allows ?profile=1 per request
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+    PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    
+    # API Startup
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"  # load the model and query the store at startup
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,476 @@
+import base64
+import bisect
+import json
+import os
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config.settings import settings
+from services.query_parser import COMPARISONS
+from services.transaction_io import iter_transaction_chunks
+
+GROUP_COLUMNS = ("user", "month", "category", "type")
+
+
+class Vocabulary:
+    """Dictionary encoding of a string column"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def encode(self, values: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.code(v) for v in values), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class AnalyticsStore:
+    """Columnar in-memory copy of all transactions for vectorized aggregation
+
+    Amounts, dates and dictionary-encoded user/category/type codes are kept as
+    NumPy arrays, so totals and group-bys are a few array operations instead of
+    Python loops over transaction dicts. The arrays are swapped atomically on
+    update, so readers always see a consistent snapshot.
+    """
+
+    def __init__(self):
+        self.users = Vocabulary()
+        self.categories = Vocabulary(settings.CATEGORIES)
+        self.types = Vocabulary(["Debit", "Credit"])
+        self.source_path = None
+        self.source_signature = None
+        self._lock = threading.Lock()
+        self._cols = self._build_columns([])
+        self._order_cache = {"cols": self._cols}
+        self._id_rows = {"cols": None}
+
+    def _build_columns(self, transactions: List[Dict]) -> Dict[str, np.ndarray]:
+        dates = np.array([txn['date'][:10] for txn in transactions], dtype='datetime64[D]')
+        return {
+            "id": np.array([txn['id'] for txn in transactions], dtype=object),
+            "user": self.users.encode(txn['userId'] for txn in transactions),
+            "category": self.categories.encode(txn['category'] for txn in transactions),
+            "type": self.types.encode(txn['type'] for txn in transactions),
+            "amount": np.array([txn['amount'] for txn in transactions], dtype=np.float64),
+            "balance": np.array([txn.get('balance', 0) for txn in transactions], dtype=np.float64),
+            "date": dates.astype(np.int32),  # days since 1970-01-01
+            "month": dates.astype('datetime64[M]').astype(np.int32),  # months since 1970-01
+            "description": np.array([txn['description'] for txn in transactions], dtype=object),
+        }
+
+    def __len__(self) -> int:
+        return len(self._cols["id"])
+
+    def reference_date(self, cols: Optional[Dict] = None) -> date:
+        """Date that relative phrases like "last month" are resolved against
+
+        The latest transaction date, not today, so a dataset that ends months
+        ago still has a "last month"; today is only used when there is no data.
+        Search and local answers both anchor here.
+        """
+        cols = cols if cols is not None else self._cols
+        if len(cols["date"]) == 0:
+            return date.today()
+        return date.fromisoformat(str(np.datetime64(int(cols["date"].max()), 'D')))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Current column arrays; a consistent snapshot that must not be modified"""
+        return self._cols
+
+    def replace(self, transactions: List[Dict]):
+        """Replace the whole store with a new set of transactions"""
+        cols = self._build_columns(transactions)
+        with self._lock:
+            self._cols = cols
+
+    def encode(self, transactions: List[Dict]) -> Dict[str, np.ndarray]:
+        """Encode a chunk of transactions as column arrays for replace_columns"""
+        return self._build_columns(transactions)
+
+    def replace_columns(self, parts: List[Dict[str, np.ndarray]]):
+        """Replace the whole store with chunks produced by encode"""
+        if not parts:
+            cols = self._build_columns([])
+        else:
+            cols = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        with self._lock:
+            self._cols = cols
+
+    def upsert(self, transactions: List[Dict]):
+        """Insert new transactions and overwrite existing ones with the same id"""
+        if not transactions:
+            return
+        new = self._build_columns(transactions)
+        with self._lock:
+            keep = ~np.isin(self._cols["id"], new["id"])
+            self._cols = {
+                name: np.concatenate([column[keep], new[name]])
+                for name, column in self._cols.items()
+            }
+
+    def remove(self, ids: Iterable[str]):
+        """Drop transactions by id"""
+        ids = np.array(list(ids), dtype=object)
+        if len(ids) == 0:
+            return
+        with self._lock:
+            keep = ~np.isin(self._cols["id"], ids)
+            self._cols = {name: column[keep] for name, column in self._cols.items()}
+
+    @staticmethod
+    def file_signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def mark_source(self, path: str):
+        """Record the file the current contents came from"""
+        self.source_path = path
+        self.source_signature = self.file_signature(path)
+
+    def encode_sidecar(self, sidecar) -> Dict[str, np.ndarray]:
+        """Column arrays straight from a ColumnarSidecar, without building transaction dicts"""
+        date_vocab = sidecar.vocab["date"]
+        dates = np.array([value[:10] for value in date_vocab], dtype='datetime64[D]')
+        date_codes = sidecar.column("date")
+        return {
+            "id": sidecar.values("id"),
+            "user": self.users.encode(sidecar.vocab["userId"])[sidecar.column("userId")],
+            "category": self.categories.encode(sidecar.vocab["category"])[sidecar.column("category")],
+            "type": self.types.encode(sidecar.vocab["type"])[sidecar.column("type")],
+            "amount": sidecar.column("amount").astype(np.float64),
+            "balance": sidecar.column("balance").astype(np.float64),
+            "date": dates.astype(np.int32)[date_codes],
+            "month": dates.astype('datetime64[M]').astype(np.int32)[date_codes],
+            "description": sidecar.values("description"),
+        }
+
+    def load_file(self, path: str):
+        """Load all transactions from a JSON, JSONL or columnar file
+        
+        JSON and JSONL files are loaded from their columnar sidecar when it is
+        enabled, which skips JSON parsing and per-row dicts entirely.
+        """
+        from services.columnar_sidecar import open_sidecar
+        
+        sidecar = open_sidecar(path)
+        if sidecar is not None:
+            self.replace_columns([self.encode_sidecar(sidecar)])
+        else:
+            self.replace_columns([self.encode(chunk) for chunk in iter_transaction_chunks(path, 10000)])
+        self.mark_source(path)
+
+    def refresh(self, path: Optional[str] = None) -> bool:
+        """Reload from the source file if it changed since the last load
+
+        Without a path this is the file the vector collection was built from
+        (see ingested_source), so search and the store see the same data;
+        DATA_PATH is only used before anything has been ingested.
+        """
+        path = path or ingested_source() or self.source_path or settings.DATA_PATH
+        signature = self.file_signature(path)
+        same_path = self.source_path is not None and os.path.abspath(path) == os.path.abspath(self.source_path)
+        if signature is None or (same_path and signature == self.source_signature):
+            return False
+        self.load_file(path)
+        return True
+
+    def mask(self, user_id: Optional[str] = None, category: Optional[str] = None,
+             txn_type: Optional[str] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, amount_min: Optional[float] = None,
+             amount_max: Optional[float] = None, amount_filters: Iterable[Tuple[str, float]] = (),
+             cols: Optional[Dict] = None) -> np.ndarray:
+        """Boolean row mask for the given filters
+
+        amount_filters takes ParsedQuery-style (operator, value) pairs such as ("$gt", 500).
+        """
+        cols = cols if cols is not None else self._cols
+        mask = np.ones(len(cols["id"]), dtype=bool)
+
+        for column, vocab, value in [
+            ("user", self.users, user_id),
+            ("category", self.categories, category),
+            ("type", self.types, txn_type),
+        ]:
+            if value is not None:
+                code = vocab.codes.get(value)
+                if code is None:
+                    return np.zeros_like(mask)
+                mask &= cols[column] == code
+
+        if date_from is not None:
+            mask &= cols["date"] >= np.datetime64(str(date_from)[:10], 'D').astype(np.int32)
+        if date_to is not None:
+            mask &= cols["date"] <= np.datetime64(str(date_to)[:10], 'D').astype(np.int32)
+        if amount_min is not None:
+            mask &= cols["amount"] >= amount_min
+        if amount_max is not None:
+            mask &= cols["amount"] <= amount_max
+        for operator, value in amount_filters:
+            mask &= COMPARISONS[operator](cols["amount"], value)
+        return mask
+
+    def _label(self, column: str, code: int) -> str:
+        if column == "user":
+            return self.users.values[code]
+        if column == "category":
+            return self.categories.values[code]
+        if column == "type":
+            return self.types.values[code]
+        return str(np.datetime64(int(code), 'M'))
+
+    def aggregate(self, group_by: Iterable[str] = (), **filters) -> List[Dict]:
+        """Sum, count, min, max and mean of amounts grouped by any of user, month, category, type"""
+        group_by = list(group_by)
+        for column in group_by:
+            if column not in GROUP_COLUMNS:
+                raise ValueError(f"Cannot group by '{column}'; expected one of {', '.join(GROUP_COLUMNS)}")
+
+        cols = self._cols
+        mask = self.mask(cols=cols, **filters)
+        amounts = cols["amount"][mask]
+        if len(amounts) == 0:
+            return []
+
+        # Combine the group columns into one integer key per row
+        codes, dims, offsets = [], [], []
+        for column in group_by:
+            values = cols[column][mask]
+            offset = int(values.min())
+            codes.append(values - offset)
+            dims.append(int(values.max()) - offset + 1)
+            offsets.append(offset)
+        keys = np.ravel_multi_index(codes, dims) if group_by else np.zeros(len(amounts), dtype=np.int64)
+
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(unique_keys))
+        sums = np.bincount(inverse, weights=amounts, minlength=len(unique_keys))
+        mins = np.full(len(unique_keys), np.inf)
+        maxs = np.full(len(unique_keys), -np.inf)
+        np.minimum.at(mins, inverse, amounts)
+        np.maximum.at(maxs, inverse, amounts)
+
+        group_codes = np.unravel_index(unique_keys, dims) if group_by else []
+        rows = []
+        for i in range(len(unique_keys)):
+            row = {
+                column: self._label(column, int(group_codes[j][i]) + offsets[j])
+                for j, column in enumerate(group_by)
+            }
+            row.update({
+                "sum": float(sums[i]),
+                "count": int(counts[i]),
+                "min": float(mins[i]),
+                "max": float(maxs[i]),
+                "mean": float(sums[i] / counts[i])
+            })
+            rows.append(row)
+        return rows
+
+    def spending_stats(self, user_id: Optional[str] = None) -> Dict:
+        """Totals and per-category spending used by the insights prompt"""
+        by_type = {row["type"]: row for row in self.aggregate(["type"], user_id=user_id)}
+        by_category = self.aggregate(["category"], user_id=user_id, txn_type="Debit")
+        return {
+            "transaction_count": sum(row["count"] for row in by_type.values()),
+            "debit_count": by_type.get("Debit", {}).get("count", 0),
+            "credit_count": by_type.get("Credit", {}).get("count", 0),
+            "total_debit": by_type.get("Debit", {}).get("sum", 0.0),
+            "total_credit": by_type.get("Credit", {}).get("sum", 0.0),
+            "average_debit": by_type.get("Debit", {}).get("mean", 0.0),
+            "max_debit": by_type.get("Debit", {}).get("max", 0.0),
+            "category_spending": {row["category"]: row["sum"] for row in by_category}
+        }
+
+    def records(self, indices: np.ndarray, cols: Optional[Dict] = None) -> List[Dict]:
+        """Rebuild transaction dicts for the given row indices"""
+        cols = cols if cols is not None else self._cols
+        records = []
+        for i in indices:
+            amount = float(cols["amount"][i])
+            balance = float(cols["balance"][i])
+            records.append({
+                "id": cols["id"][i],
+                "userId": self.users.values[cols["user"][i]],
+                "date": str(np.datetime64(int(cols["date"][i]), 'D')),
+                "description": cols["description"][i],
+                "amount": int(amount) if amount.is_integer() else amount,
+                "type": self.types.values[cols["type"][i]],
+                "category": self.categories.values[cols["category"][i]],
+                "balance": int(balance) if balance.is_integer() else balance
+            })
+        return records
+
+    def rows_by_id(self, ids: Iterable[str], cols: Optional[Dict] = None) -> np.ndarray:
+        """Row indices of the given ids, in the given order, skipping unknown ids
+
+        Uses an id -> row dict built once per snapshot, so a lookup costs the
+        number of ids rather than a scan of the whole id column.
+        """
+        cols = cols if cols is not None else self._cols
+        cache = self._id_rows
+        if cache["cols"] is not cols:
+            cache = {"cols": cols, "rows": {txn_id: i for i, txn_id in enumerate(cols["id"].tolist())}}
+            self._id_rows = cache
+        rows = cache["rows"]
+        return np.array([rows[txn_id] for txn_id in ids if txn_id in rows], dtype=np.int64)
+
+    def records_by_id(self, ids: Iterable[str]) -> List[Dict]:
+        """Current version of the given transactions, in the given order, skipping unknown ids"""
+        cols = self._cols
+        return self.records(self.rows_by_id(ids, cols), cols)
+
+    def _ordered_rows(self, cols: Dict, user_id: Optional[str]) -> np.ndarray:
+        """Row indices sorted by (date, id), cached per user until the next update"""
+        cache = self._order_cache
+        if cache["cols"] is not cols:
+            cache = {"cols": cols}
+            self._order_cache = cache
+
+        if user_id not in cache:
+            if "id_rank" not in cache:
+                cache["id_rank"] = np.argsort(np.argsort(cols["id"], kind='stable'), kind='stable')
+            if user_id is None:
+                rows = np.arange(len(cols["id"]))
+            else:
+                rows = np.flatnonzero(self.mask(cols=cols, user_id=user_id))
+            order = np.lexsort((cache["id_rank"][rows], cols["date"][rows]))
+            cache[user_id] = rows[order]
+        return cache[user_id]
+
+    @staticmethod
+    def encode_cursor(date_value: int, txn_id: str) -> str:
+        raw = f"{date_value}:{txn_id}".encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode('utf-8')
+            date_value, txn_id = raw.split(":", 1)
+            return int(date_value), txn_id
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+
+    def page(self, user_id: Optional[str] = None, limit: int = 100, offset: int = 0,
+             cursor: Optional[str] = None, descending: bool = True) -> Dict:
+        """One page of transactions sorted by date, with the exact total
+
+        Rows are addressed through a cached per-user index sorted by (date, id),
+        so a page costs the same regardless of its position or the table size.
+        A cursor (returned as next_cursor) resumes right after the last row of
+        the previous page and is stable under inserts; otherwise offset is used.
+        """
+        cols = self._cols
+        rows = self._ordered_rows(cols, user_id)
+        total = len(rows)
+
+        if cursor:
+            cursor_date, cursor_id = self.decode_cursor(cursor)
+            dates = cols["date"][rows]
+            lo = int(np.searchsorted(dates, cursor_date, side='left'))
+            hi = int(np.searchsorted(dates, cursor_date, side='right'))
+            run_ids = list(cols["id"][rows[lo:hi]])
+            if descending:
+                start = total - (lo + bisect.bisect_left(run_ids, cursor_id))
+            else:
+                start = lo + bisect.bisect_right(run_ids, cursor_id)
+        else:
+            start = offset
+
+        start = max(start, 0)
+        if descending:
+            # Walk the ascending index backwards without copying it
+            stop = max(total - start, 0)
+            selected = rows[max(stop - limit, 0):stop][::-1]
+        else:
+            selected = rows[start:start + limit]
+
+        next_cursor = None
+        if len(selected) and start + len(selected) < total:
+            last = selected[-1]
+            next_cursor = self.encode_cursor(int(cols["date"][last]), cols["id"][last])
+
+        return {
+            "transactions": self.records(selected, cols),
+            "total": total,
+            "offset": start,
+            "next_cursor": next_cursor
+        }
+
+    def top_n(self, n: int, by: str = "amount", descending: bool = True, **filters) -> List[Dict]:
+        """Largest (or smallest) n transactions by amount or date"""
+        cols = self._cols
+        rows = np.flatnonzero(self.mask(cols=cols, **filters))
+        if n <= 0 or len(rows) == 0:
+            return []
+        values = cols[by][rows]
+        if descending:
+            values = -values
+        if n < len(rows):
+            part = np.argpartition(values, n - 1)[:n]
+            rows, values = rows[part], values[part]
+        order = np.argsort(values, kind='stable')
+        return self.records(rows[order], cols)
+
+
+_store = None
+_store_lock = threading.Lock()
+_ingested = {"signature": None, "source": None}
+
+
+def _ingested_source_path() -> str:
+    return os.path.join(settings.CHROMA_DB_PATH, "ingested_source.json")
+
+
+def record_ingested_source(path: str):
+    """Remember the file the vector collection was just built or synced from"""
+    marker = _ingested_source_path()
+    os.makedirs(os.path.dirname(marker) or ".", exist_ok=True)
+    tmp_path = marker + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"path": os.path.abspath(path)}, f)
+    os.replace(tmp_path, marker)
+
+
+def ingested_source() -> Optional[str]:
+    """File the vector collection was last built or synced from, if it still exists"""
+    marker = _ingested_source_path()
+    signature = AnalyticsStore.file_signature(marker)
+    if signature is None:
+        return None
+    if signature != _ingested["signature"]:
+        try:
+            with open(marker, 'r', encoding='utf-8') as f:
+                source = json.load(f).get("path")
+        except (OSError, ValueError):
+            source = None
+        _ingested.update(signature=signature, source=source)
+    source = _ingested["source"]
+    return source if source and os.path.exists(source) else None
+
+
+def get_analytics_store(refresh: bool = True) -> AnalyticsStore:
+    """Process-wide store, loaded once and reloaded when its source file changes or another file is ingested"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AnalyticsStore()
+        if refresh:
+            _store.refresh()
+    return _store
@@ -0,0 +1,207 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import numpy as np
+from services.analytics_store import AnalyticsStore, get_analytics_store
+from services.metrics import timed, count_answer
+from services.query_parser import QueryParser, ParsedQuery, COMPARISONS
+
+COUNT_PATTERN = re.compile(r"\b(?:how many|number of|count)\b")
+AGGREGATE_PATTERN = re.compile(r"\b(?:how much|total|totals|sum|overall|average|avg|mean)\b")
+AVERAGE_PATTERN = re.compile(r"\b(?:average|avg|mean)\b")
+# Advice, comparisons and explanations need the LLM even when they mention totals
+OPEN_ENDED_PATTERN = re.compile(
+    r"\b(?:why|should|could|would|advice|advise|suggest|suggestions?|recommend|tips?|improve|reduce|"
+    r"save|saving|savings|budget|compare|comparison|versus|vs|trends?|patterns?|insights?|"
+    r"analy[sz]e|analysis|explain|unusual|habits?)\b"
+)
+
+AMOUNT_WORDS = {"$gt": "above", "$gte": "of at least", "$lt": "below", "$lte": "of at most"}
+TYPE_NOUNS = {"Debit": "debits", "Credit": "credits", None: "transactions"}
+
+
+@dataclass
+class LocalAnswer:
+    """Answer computed from the analytics store instead of the LLM"""
+    intent: str  # "aggregate", "count" or "top_n"
+    text: str
+    values: Dict
+    transactions: List[Dict] = field(default_factory=list)
+
+
+def _rupees(value: float) -> str:
+    return f"₹{value:,.2f}"
+
+
+def _counted(count: int, noun: str) -> str:
+    return f"{count:,} {noun if count != 1 else noun[:-1]}"
+
+
+def _scope(parsed: ParsedQuery, user_id: Optional[str]) -> str:
+    """Human-readable description of the filters an answer covers"""
+    parts = []
+    if parsed.category:
+        parts.append(f"in {parsed.category}")
+    if parsed.document_terms:
+        parts.append("matching " + " or ".join(f"'{term}'" for term in parsed.document_terms))
+    for operator, value in parsed.amount_filters:
+        parts.append(f"{AMOUNT_WORDS[operator]} {_rupees(value)}")
+    if parsed.date_from and parsed.date_to:
+        parts.append(f"from {parsed.date_from.isoformat()} to {parsed.date_to.isoformat()}")
+    elif parsed.date_from:
+        parts.append(f"since {parsed.date_from.isoformat()}")
+    elif parsed.date_to:
+        parts.append(f"up to {parsed.date_to.isoformat()}")
+    parts.append(f"for {user_id}" if user_id else "across all users")
+    return " " + " ".join(parts)
+
+
+class AnswerEngine:
+    """Intent router in front of SummarizerService
+
+    Totals ("how much did I spend on food last month"), counts ("how many
+    Swiggy orders") and rankings ("top 5 expenses in September") are answered
+    exactly from the columnar store over every matching transaction, not from
+    the top-k search hits the LLM would see. Anything else, and any question
+    asking for advice or explanation, returns None so the caller uses the LLM.
+    """
+
+    def __init__(self, parser: Optional[QueryParser] = None):
+        self.parser = parser or QueryParser()
+
+    def detect_intent(self, query: str, parsed: ParsedQuery) -> Optional[str]:
+        """aggregate, count or top_n; None for open-ended questions"""
+        text = " ".join(query.lower().split())
+        if OPEN_ENDED_PATTERN.search(text):
+            return None
+        if COUNT_PATTERN.search(text):
+            return "count"
+        # "how much was my biggest expense" asks for the ranked row, not a total
+        if parsed.sort_by and (parsed.limit is not None or not AGGREGATE_PATTERN.search(text)):
+            return "top_n"
+        if AGGREGATE_PATTERN.search(text):
+            return "aggregate"
+        return None
+
+    @staticmethod
+    def matching_rows(store: AnalyticsStore, cols: Dict, parsed: ParsedQuery,
+                      user_id: Optional[str]) -> np.ndarray:
+        """Indices of every transaction satisfying the parsed constraints"""
+        mask = store.mask(
+            user_id=user_id, category=parsed.category, txn_type=parsed.txn_type,
+            date_from=parsed.date_from, date_to=parsed.date_to, cols=cols
+        )
+        for operator, value in parsed.amount_filters:
+            mask &= COMPARISONS[operator](cols["amount"], value)
+        rows = np.flatnonzero(mask)
+        if parsed.document_terms and len(rows):
+            descriptions = cols["description"][rows]
+            keep = np.fromiter(
+                (any(term in text for term in parsed.document_terms) for text in descriptions),
+                dtype=bool, count=len(rows)
+            )
+            rows = rows[keep]
+        return rows
+
+    def answer(self, query: str, user_id: Optional[str] = None, limit: int = 10,
+               filters: Optional[Dict] = None) -> Optional[LocalAnswer]:
+        """Answer locally, or None when the question needs the LLM
+
+        filters (the keyword arguments of ParsedQuery.with_filters) override
+        what was parsed from the query text.
+        """
+        with timed("local_answer"):
+            store = get_analytics_store()
+            cols = store.columns()
+            parsed = self.parser.parse(query, reference_date=store.reference_date(cols))
+            if filters:
+                parsed = parsed.with_filters(**filters)
+            intent = self.detect_intent(query, parsed)
+            if intent is None:
+                count_answer("llm", "open_ended")
+                return None
+
+            rows = self.matching_rows(store, cols, parsed, user_id)
+            if intent == "top_n":
+                result = self._top_n(store, cols, rows, parsed, user_id, limit)
+            else:
+                result = self._totals(store, cols, rows, parsed, user_id, limit, intent, query)
+            result.values["filters"] = parsed.describe()
+        count_answer("local", intent)
+        return result
+
+    @staticmethod
+    def _latest(store: AnalyticsStore, cols: Dict, rows: np.ndarray, limit: int) -> List[Dict]:
+        order = np.argsort(-cols["date"][rows], kind='stable')[:max(limit, 0)]
+        return store.records(rows[order], cols)
+
+    def _totals(self, store: AnalyticsStore, cols: Dict, rows: np.ndarray, parsed: ParsedQuery,
+                user_id: Optional[str], limit: int, intent: str, query: str) -> LocalAnswer:
+        amounts = cols["amount"][rows]
+        is_debit = cols["type"][rows] == store.types.codes["Debit"]
+        values = {
+            "count": int(len(rows)),
+            "debit_count": int(is_debit.sum()),
+            "credit_count": int(len(rows) - is_debit.sum()),
+            "total_debit": float(amounts[is_debit].sum()),
+            "total_credit": float(amounts[~is_debit].sum()),
+            "average": float(amounts.mean()) if len(rows) else 0.0
+        }
+        scope = _scope(parsed, user_id)
+        noun = TYPE_NOUNS[parsed.txn_type]
+        spent = f"{_rupees(values['total_debit'])} across {_counted(values['debit_count'], 'debits')}"
+        received = f"{_rupees(values['total_credit'])} across {_counted(values['credit_count'], 'credits')}"
+
+        if not len(rows):
+            text = f"No {noun} found{scope}."
+        elif intent == "count":
+            text = f"{_counted(values['count'], noun)}{scope}."
+            if values["debit_count"] and values["credit_count"]:
+                text += f" {_counted(values['debit_count'], 'debits')} and {_counted(values['credit_count'], 'credits')}."
+        elif AVERAGE_PATTERN.search(query.lower()):
+            text = f"Average of {_counted(values['count'], noun)}{scope}: {_rupees(values['average'])}."
+        elif not values["credit_count"]:
+            text = f"Total spent{scope}: {spent}."
+        elif not values["debit_count"]:
+            text = f"Total received{scope}: {received}."
+        else:
+            text = f"Total spent{scope}: {spent}. Total received: {received}."
+        return LocalAnswer(intent, text, values, self._latest(store, cols, rows, limit))
+
+    def _top_n(self, store: AnalyticsStore, cols: Dict, rows: np.ndarray, parsed: ParsedQuery,
+               user_id: Optional[str], limit: int) -> LocalAnswer:
+        n = parsed.limit or limit
+        keys = cols[parsed.sort_by][rows]
+        order = np.argsort(-keys if parsed.descending else keys, kind='stable')[:max(n, 0)]
+        transactions = store.records(rows[order], cols)
+
+        scope = _scope(parsed, user_id)
+        shown = _counted(len(transactions), TYPE_NOUNS[parsed.txn_type])
+        if parsed.sort_by == "date":
+            heading = f"{'Latest' if parsed.descending else 'Earliest'} {shown}{scope}"
+        else:
+            heading = f"{'Largest' if parsed.descending else 'Smallest'} {shown}{scope}"
+        if transactions:
+            lines = [
+                f"{i}. {txn['date']}: {txn['description']} - {_rupees(txn['amount'])} ({txn['type']}) [{txn['category']}]"
+                for i, txn in enumerate(transactions, 1)
+            ]
+            text = f"{heading}, out of {len(rows):,} matching:\n" + "\n".join(lines)
+        else:
+            text = f"No {TYPE_NOUNS[parsed.txn_type]} found{scope}."
+        values = {"count": int(len(rows)), "returned": len(transactions), "sort_by": parsed.sort_by}
+        return LocalAnswer("top_n", text, values, transactions)
+
+
+answer_engine = AnswerEngine()
+
+
+if __name__ == "__main__":
+    import sys
+
+    for question in sys.argv[1:] or ["How much did I spend on food last month?", "My total spending on shopping",
+                                     "How many Swiggy orders?", "Show my top 5 expenses in September",
+                                     "Why is my spending so high?"]:
+        result = answer_engine.answer(question, user_id="user_1", limit=5)
+        print(f"\n❓ {question}")
+        print(f"🔄 {result.intent} (local)\n{result.text}" if result else "🔄 open-ended (llm)")
@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from config.settings import settings
+from services.data_generator import COLUMNS
+
+SIDECAR_SUFFIX = ".columns"
+SIDECAR_VERSION = 1
+
+# Low-cardinality string columns, stored as int32 codes plus a vocabulary
+DICTIONARY_COLUMNS = ("userId", "date", "description", "type", "category")
+NUMERIC_COLUMNS = ("amount", "balance")
+
+# Source signatures of files that could not be represented, so they are not re-parsed on every load
+_unsupported: Dict[str, List[int]] = {}
+
+
+def sidecar_path(path: str) -> str:
+    """Directory holding the columnar copy of a transactions file"""
+    return path.rstrip("/\\") + SIDECAR_SUFFIX
+
+
+def source_signature(path: str) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class ColumnarSidecar:
+    """Memory-mapped columns of a transactions file, opened one column at a time
+
+    Each column is a .npy file: ids as fixed-width strings, amounts and
+    balances as int64 (float64 if any value is fractional) and the other
+    string columns as int32 codes into a vocabulary kept in meta.json. Only
+    the columns a reader touches are mapped, and only pages it reads are
+    loaded, so projecting two columns of a million rows costs two columns.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta["rows"]
+        self.vocab: Dict[str, List[str]] = self.meta["vocab"]
+        self._arrays = {}
+        self._vocab_arrays = {}
+
+    @property
+    def source(self) -> List[int]:
+        return self.meta["source"]
+
+    def column(self, name: str) -> np.ndarray:
+        """Raw memory-mapped column; codes for dictionary-encoded columns"""
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode='r')
+        return self._arrays[name]
+
+    def _vocab_array(self, name: str) -> np.ndarray:
+        if name not in self._vocab_arrays:
+            values = np.empty(len(self.vocab[name]), dtype=object)
+            values[:] = self.vocab[name]
+            self._vocab_arrays[name] = values
+        return self._vocab_arrays[name]
+
+    def values(self, name: str, rows: slice = slice(None)) -> np.ndarray:
+        """Decoded values of a column (strings as an object array) for a range of rows"""
+        if name in DICTIONARY_COLUMNS:
+            return self._vocab_array(name)[self.column(name)[rows]]
+        if name == "id":
+            return self.column(name)[rows].astype(object)
+        return np.array(self.column(name)[rows])
+
+    def iter_chunks(self, chunk_size: int = 10000, columns: Sequence[str] = COLUMNS) -> Iterator[List[Dict]]:
+        """Rebuild transaction dicts with the given columns, chunk_size rows at a time"""
+        for start in range(0, self.rows, chunk_size):
+            rows = slice(start, start + chunk_size)
+            lists = []
+            for name in columns:
+                values = self.values(name, rows).tolist()
+                if name in NUMERIC_COLUMNS and self.column(name).dtype.kind == 'f':
+                    # Mixed int/float columns are stored as float64; give whole numbers back as ints
+                    values = [int(v) if v.is_integer() else v for v in values]
+                lists.append(values)
+            yield [dict(zip(columns, row)) for row in zip(*lists)]
+
+
+def _numeric_column(values: List) -> np.ndarray:
+    if all(type(v) is int for v in values):
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=np.float64)
+
+
+def _assemble_column(directory: str, name: str, parts: List[str], rows: int):
+    """Concatenate a column's chunk files into name.npy, one chunk in memory at a time"""
+    dtypes = [np.load(part, mmap_mode='r').dtype for part in parts]
+    if name == "id":
+        dtype = np.dtype(f"<U{max([d.itemsize // 4 for d in dtypes] + [1])}")
+    elif name in NUMERIC_COLUMNS:
+        dtype = np.dtype(np.float64 if any(d.kind == 'f' for d in dtypes) else np.int64)
+    else:
+        dtype = np.dtype(np.int32)
+
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)}
+    with open(os.path.join(directory, f"{name}.npy"), 'wb') as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for part in parts:
+            f.write(np.load(part).astype(dtype, copy=False).tobytes())
+            os.remove(part)
+
+
+def write_sidecar(path: str, chunk_size: int = 10000) -> ColumnarSidecar:
+    """Parse a JSON or JSONL transactions file once and write its columnar sidecar
+
+    Each chunk of rows is written to disk as soon as it is parsed and the
+    columns are assembled from those pieces at the end, so memory use does
+    not grow with the file. Raises ValueError if a transaction does not have
+    exactly the generator's columns or has a non-string id, since the sidecar
+    could not reproduce it. The sidecar is written to a temporary directory
+    and renamed into place, so readers never see a partial one.
+    """
+    from services.transaction_io import iter_transaction_chunks
+
+    signature = source_signature(path)
+    expected = set(COLUMNS)
+    codes = {name: {} for name in DICTIONARY_COLUMNS}
+    parts = {name: [] for name in COLUMNS}
+
+    final = sidecar_path(path)
+    temp = f"{final}.tmp-{os.getpid()}"
+    shutil.rmtree(temp, ignore_errors=True)
+    os.makedirs(temp)
+
+    rows = 0
+    try:
+        for index, chunk in enumerate(iter_transaction_chunks(path, chunk_size, use_sidecar=False)):
+            for txn in chunk:
+                if txn.keys() != expected:
+                    raise ValueError(f"Transaction {txn.get('id')} has fields {sorted(txn)}, expected {sorted(expected)}")
+                if not isinstance(txn["id"], str):
+                    raise ValueError(f"Transaction id {txn['id']!r} is not a string")
+            columns = {"id": np.array([txn["id"] for txn in chunk], dtype=str)}
+            for name in NUMERIC_COLUMNS:
+                columns[name] = _numeric_column([txn[name] for txn in chunk])
+            for name in DICTIONARY_COLUMNS:
+                vocab = codes[name]
+                columns[name] = np.fromiter(
+                    (vocab.setdefault(txn[name], len(vocab)) for txn in chunk), dtype=np.int32, count=len(chunk)
+                )
+            for name, column in columns.items():
+                part = os.path.join(temp, f"{name}.part-{index:05d}.npy")
+                np.save(part, column)
+                parts[name].append(part)
+            rows += len(chunk)
+
+        for name in COLUMNS:
+            _assemble_column(temp, name, parts[name], rows)
+    except BaseException:
+        shutil.rmtree(temp, ignore_errors=True)
+        raise
+
+    meta = {
+        "version": SIDECAR_VERSION,
+        "source": signature,
+        "rows": rows,
+        "vocab": {name: list(codes[name]) for name in DICTIONARY_COLUMNS}
+    }
+    with open(os.path.join(temp, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    # Swap in the new directory; open memory maps of the old one stay valid
+    old = f"{final}.old-{os.getpid()}"
+    if os.path.exists(final):
+        os.rename(final, old)
+    try:
+        os.rename(temp, final)
+    except OSError:
+        # Another process put its sidecar in place first
+        shutil.rmtree(temp, ignore_errors=True)
+    shutil.rmtree(old, ignore_errors=True)
+    return ColumnarSidecar(final)
+
+
+def open_sidecar(path: str, create: bool = True) -> Optional[ColumnarSidecar]:
+    """Up-to-date sidecar of a JSON or JSONL file, or None to fall back to parsing it
+
+    The sidecar is stale once the source's mtime or size differs from the
+    one recorded when it was written. A missing or stale sidecar is rewritten
+    when create is set. Returns None when DATA_SIDECAR_ENABLED is off, for
+    columnar directories, or when the file cannot be represented.
+    """
+    if not settings.DATA_SIDECAR_ENABLED or not os.path.isfile(path):
+        return None
+
+    signature = source_signature(path)
+    try:
+        sidecar = ColumnarSidecar(sidecar_path(path))
+        if sidecar.meta.get("version") == SIDECAR_VERSION and sidecar.source == signature:
+            return sidecar
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if not create or _unsupported.get(path) == signature:
+        return None
+    try:
+        sidecar = write_sidecar(path)
+    except (OSError, ValueError) as e:
+        _unsupported[path] = signature
+        print(f"⚠️ Columnar sidecar not written for {path}: {e}")
+        return None
+    print(f"✅ Wrote columnar sidecar for {sidecar.rows:,} transactions to {sidecar.directory}")
+    return sidecar if sidecar.source == source_signature(path) else None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write the columnar sidecar of a transactions file")
+    parser.add_argument("path", nargs="?", default=settings.DATA_PATH)
+    args = parser.parse_args()
+
+    sidecar = write_sidecar(args.path)
+    print(f"✅ Wrote {sidecar.rows:,} rows to {sidecar.directory}")
@@ -0,0 +1,76 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from config.settings import settings
+
+
+class StageExecutor:
+    """Runs blocking work off the event loop with a concurrency limit per stage
+
+    Stages are the expensive steps of a request: "embedding" (model encode),
+    "vector_store" (Chroma calls) and "llm" (Groq completions). Blocking stages
+    share one bounded thread pool; each stage also has its own semaphore so a
+    burst of one kind of work cannot take every slot. asyncio semaphores are
+    bound to the loop they are first used on, and the executor is shared by
+    the API loop and asyncio.run callers, so each running loop gets its own.
+    """
+
+    def __init__(self, max_workers: int = None, limits: Dict[str, int] = None):
+        self.max_workers = max_workers or settings.EXECUTOR_MAX_WORKERS
+        self.limits = limits or {
+            "embedding": settings.EMBEDDING_CONCURRENCY,
+            "vector_store": settings.VECTOR_STORE_CONCURRENCY,
+            "llm": settings.LLM_CONCURRENCY
+        }
+        self._executor = None
+        # event loop -> stage -> semaphore
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="stage"
+            )
+        return self._executor
+
+    def limit(self, stage: str) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent work in a stage on the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            semaphores = self._semaphores.get(loop)
+            if semaphores is None:
+                # Semaphores reference their loop, so closed loops are dropped here rather than by the weak keys
+                for closed in [other for other in self._semaphores if other.is_closed()]:
+                    del self._semaphores[closed]
+                semaphores = self._semaphores[loop] = {}
+            if stage not in semaphores:
+                semaphores[stage] = asyncio.Semaphore(self.limits.get(stage, self.max_workers))
+            return semaphores[stage]
+
+    async def run(self, stage: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call in the thread pool under the stage's limit
+        
+        The call runs in a copy of the caller's context, so per-request state
+        such as Server-Timing stage timings follows it into the thread.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        async with self.limit(stage):
+            return await loop.run_in_executor(
+                self.executor, functools.partial(context.run, func, *args, **kwargs)
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+stage_executor = StageExecutor()
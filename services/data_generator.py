@@ -1,23 +1,34 @@
 import json
 import random
+import time
 from datetime import datetime, timedelta
+from multiprocessing import Pool
 from faker import Faker
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
+import numpy as np
 import os
+from config.settings import settings
 
 fake = Faker('en_IN')
 
+# (low, high) amount per category; anything not listed uses DEFAULT_AMOUNT_RANGE
+AMOUNT_RANGES = {
+    "Salary": (50000, 150000),
+    "Rent": (8000, 25000),
+    "Shopping": (500, 5000),
+    "Food": (100, 1500),
+    "Utilities": (200, 3000),
+    "Entertainment": (200, 1000),
+    "Travel": (50, 2000)
+}
+DEFAULT_AMOUNT_RANGE = (100, 3000)
+PAYMENT_METHODS = ["UPI payment to", "Card payment at", "Net banking transfer to"]
+COLUMNS = ["id", "userId", "date", "description", "amount", "type", "category", "balance"]
+
 class FinancialDataGenerator:
     def __init__(self):
         self.categories = {
-            "Food": ["Swiggy", "Zomato", "McDonald's", "Dominos", "Starbucks", "Local Restaurant"],
-            "Shopping": ["Amazon", "Flipkart", "Big Basket", "DMart", "Myntra", "Ajio"],
-            "Rent": ["Monthly Rent", "House Rent", "Apartment Rent"],
-            "Salary": ["Monthly Salary", "Salary Credit", "Income"],
-            "Utilities": ["Electricity Bill", "Water Bill", "Internet Bill", "Mobile Recharge", "Gas Bill"],
-            "Entertainment": ["Netflix", "Amazon Prime", "BookMyShow", "Spotify", "Movie Ticket"],
-            "Travel": ["Uber", "Ola", "Rapido", "Petrol", "Train Ticket", "Flight Booking"],
-            "Others": ["ATM Withdrawal", "Bank Charges", "Insurance", "Medical", "Groceries"]
+            category: list(merchants) for category, merchants in settings.MERCHANTS.items()
         }
         
         self.transaction_id_counter = 1
@@ -30,8 +41,7 @@ class FinancialDataGenerator:
             else:
                 return f"Refund from {merchant}"
         else:
-            payment_methods = ["UPI payment to", "Card payment at", "Net banking transfer to"]
-            return f"{random.choice(payment_methods)} {merchant}"
+            return f"{random.choice(PAYMENT_METHODS)} {merchant}"
     
     def generate_transactions_for_user(self, user_id: str, num_transactions: int) -> List[Dict]:
         """Generate transactions for a single user"""
@@ -56,25 +66,12 @@ class FinancialDataGenerator:
             # Determine transaction type
             if category == "Salary":
                 trans_type = "Credit"
-                amount = random.randint(50000, 150000)
+                amount = random.randint(*AMOUNT_RANGES["Salary"])
             else:
                 # 90% debit, 10% credit (refunds)
                 trans_type = "Debit" if random.random() > 0.1 else "Credit"
                 
-                if category == "Rent":
-                    amount = random.randint(8000, 25000)
-                elif category == "Shopping":
-                    amount = random.randint(500, 5000)
-                elif category == "Food":
-                    amount = random.randint(100, 1500)
-                elif category == "Utilities":
-                    amount = random.randint(200, 3000)
-                elif category == "Entertainment":
-                    amount = random.randint(200, 1000)
-                elif category == "Travel":
-                    amount = random.randint(50, 2000)
-                else:
-                    amount = random.randint(100, 3000)
+                amount = random.randint(*AMOUNT_RANGES.get(category, DEFAULT_AMOUNT_RANGE))
             
             # Update balance
             if trans_type == "Credit":
@@ -121,14 +118,195 @@ class FinancialDataGenerator:
             json.dump(transactions, f, indent=2, ensure_ascii=False)
         
         print(f"✅ Generated {len(transactions)} transactions saved to {file_path}")
+        
+        if settings.DATA_SIDECAR_ENABLED:
+            from services.columnar_sidecar import write_sidecar
+            write_sidecar(file_path)
+
+    
+    def generate_bulk(self, file_path: str, num_users: int, transactions_per_user: int,
+                      output_format: str = "jsonl", seed: int = 42, users_per_chunk: int = 100,
+                      workers: int = 1, end_date: Optional[str] = None) -> Dict:
+        """Generate a large dataset with NumPy and stream it to disk chunk by chunk
+        
+        output_format is "jsonl" (one file) or "columnar" (a directory of .npz
+        chunks, see load_columnar). Output depends only on the seed, end_date
+        and users_per_chunk, not on the number of workers. end_date
+        (YYYY-MM-DD) defaults to today, so runs are only reproducible across
+        days when it is fixed.
+        """
+        if output_format not in ("jsonl", "columnar"):
+            raise ValueError("output_format must be 'jsonl' or 'columnar'")
+        
+        end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+        tasks = [
+            (seed, chunk_index, first_user, min(users_per_chunk, num_users - first_user),
+             transactions_per_user, end_date, output_format)
+            for chunk_index, first_user in enumerate(range(0, num_users, users_per_chunk))
+        ]
+        
+        if output_format == "jsonl":
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            out = open(file_path, 'w', encoding='utf-8')
+        else:
+            os.makedirs(file_path, exist_ok=True)
+            out = None
+        
+        started = time.perf_counter()
+        rows = 0
+        pool = Pool(workers) if workers > 1 else None
+        try:
+            chunks = pool.imap(_generate_chunk, tasks) if pool else map(_generate_chunk, tasks)
+            for chunk_index, (count, payload) in enumerate(chunks):
+                if out is not None:
+                    out.write(payload)
+                else:
+                    np.savez(os.path.join(file_path, f"part-{chunk_index:05d}.npz"), **payload)
+                rows += count
+                
+                elapsed = time.perf_counter() - started
+                print(f"🔄 {rows:,}/{num_users * transactions_per_user:,} rows "
+                      f"({rows / elapsed:,.0f} rows/sec)", end="\r", flush=True)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            if out is not None:
+                out.close()
+        
+        elapsed = time.perf_counter() - started
+        print(f"\n✅ Generated {rows:,} transactions in {elapsed:.1f}s "
+              f"({rows / elapsed:,.0f} rows/sec) saved to {file_path}")
+        return {"rows": rows, "seconds": elapsed, "rows_per_sec": rows / elapsed if elapsed else 0.0}
+
+
+def generate_columns(rng: np.random.Generator, first_user: int, num_users: int,
+                     transactions_per_user: int, end_date: str) -> Dict[str, np.ndarray]:
+    """Vectorized equivalent of generate_transactions_for_user for a block of users
+    
+    Rows are grouped by user and sorted by date; balances are the running sum
+    of signed amounts from a random opening balance.
+    """
+    categories = list(settings.MERCHANTS)
+    merchants = [list(settings.MERCHANTS[category]) for category in categories]
+    total = num_users * transactions_per_user
+    
+    users = np.repeat(np.arange(first_user + 1, first_user + num_users + 1), transactions_per_user)
+    days_ago = rng.integers(0, 181, size=total)
+    category_idx = rng.integers(0, len(categories), size=total)
+    
+    # Merchant index within the row's category
+    merchant_counts = np.array([len(names) for names in merchants])
+    merchant_idx = (rng.random(total) * merchant_counts[category_idx]).astype(np.int64)
+    
+    ranges = np.array([AMOUNT_RANGES.get(category, DEFAULT_AMOUNT_RANGE) for category in categories])
+    amounts = rng.integers(ranges[category_idx, 0], ranges[category_idx, 1] + 1)
+    
+    is_salary = np.array([category == "Salary" for category in categories])[category_idx]
+    is_credit = is_salary | (rng.random(total) < 0.1)
+    
+    # Sort by date within each user (users are already contiguous)
+    order = np.lexsort((-days_ago, users))
+    days_ago, category_idx, merchant_idx = days_ago[order], category_idx[order], merchant_idx[order]
+    amounts, is_salary, is_credit = amounts[order], is_salary[order], is_credit[order]
+    
+    signed = np.where(is_credit, amounts, -amounts).reshape(num_users, transactions_per_user)
+    opening = rng.integers(50000, 200001, size=(num_users, 1))
+    balances = np.maximum(opening + np.cumsum(signed, axis=1), 0).ravel()
+    
+    end = np.datetime64(end_date, 'D')
+    dates = np.datetime_as_string(end - days_ago.astype('timedelta64[D]'), unit='D')
+    
+    # Descriptions are picked from small pools so Faker is not called per row
+    merchant_names = np.array([name for names in merchants for name in names])
+    merchant_offsets = np.concatenate([[0], np.cumsum(merchant_counts)[:-1]])
+    merchant_names = merchant_names[merchant_offsets[category_idx] + merchant_idx]
+    
+    company_faker = Faker('en_IN')
+    company_faker.seed_instance(int(rng.integers(0, 2 ** 31)))
+    companies = np.array([f"Salary credited by {company_faker.company()}" for _ in range(64)])
+    methods = np.array(PAYMENT_METHODS)
+    
+    descriptions = np.char.add(
+        np.char.add(methods[rng.integers(0, len(methods), size=total)], " "), merchant_names
+    )
+    descriptions = np.where(is_credit, np.char.add("Refund from ", merchant_names), descriptions)
+    descriptions = np.where(is_salary, companies[rng.integers(0, len(companies), size=total)], descriptions)
+    
+    ids = np.arange(first_user * transactions_per_user + 1, first_user * transactions_per_user + total + 1)
+    
+    return {
+        "id": np.char.add("txn_", ids.astype(str)),
+        "userId": np.char.add("user_", users.astype(str)),
+        "date": dates,
+        "description": descriptions,
+        "amount": amounts,
+        "type": np.where(is_credit, "Credit", "Debit"),
+        "category": np.array(categories)[category_idx],
+        "balance": balances
+    }
+
+
+def _generate_chunk(task):
+    """Pool worker: generate one block of users and serialize it"""
+    seed, chunk_index, first_user, num_users, transactions_per_user, end_date, output_format = task
+    rng = np.random.default_rng([seed, chunk_index])
+    columns = generate_columns(rng, first_user, num_users, transactions_per_user, end_date)
+    count = len(columns["id"])
+    
+    if output_format == "columnar":
+        return count, columns
+    
+    # String columns have few distinct values, so JSON-encode each one once
+    encoded = {"id": [f'"{value}"' for value in columns["id"].tolist()]}
+    for column in ("userId", "date", "description", "type", "category"):
+        values, inverse = np.unique(columns[column], return_inverse=True)
+        literals = [json.dumps(value, ensure_ascii=False) for value in values.tolist()]
+        encoded[column] = [literals[i] for i in inverse.tolist()]
+    lines = [
+        f'{{"id": {txn_id}, "userId": {user}, "date": {date}, "description": {description}, '
+        f'"amount": {amount}, "type": {txn_type}, "category": {category}, "balance": {balance}}}\n'
+        for txn_id, user, date, description, amount, txn_type, category, balance in zip(
+            encoded["id"], encoded["userId"], encoded["date"], encoded["description"],
+            columns["amount"].tolist(), encoded["type"], encoded["category"], columns["balance"].tolist()
+        )
+    ]
+    return count, "".join(lines)
+
+
+def load_columnar(path: str) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield the column chunks written by generate_bulk(output_format="columnar")"""
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".npz"):
+            with np.load(os.path.join(path, name)) as chunk:
+                yield {column: chunk[column] for column in COLUMNS}
 
 
 if __name__ == "__main__":
-    from config.settings import settings
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate synthetic transactions")
+    parser.add_argument("--bulk", action="store_true", help="vectorized, streaming generation for large datasets")
+    parser.add_argument("--users", type=int, default=settings.NUM_USERS)
+    parser.add_argument("--per-user", type=int, default=settings.TRANSACTIONS_PER_USER)
+    parser.add_argument("--format", choices=["jsonl", "columnar"], default="jsonl")
+    parser.add_argument("--output", help="defaults to ./data/transactions.jsonl with --bulk, DATA_PATH otherwise")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end-date", help="latest transaction date (YYYY-MM-DD) for --bulk; defaults to today")
+    parser.add_argument("--chunk-users", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
     
     generator = FinancialDataGenerator()
-    transactions = generator.generate_data(
-        num_users=settings.NUM_USERS,
-        transactions_per_user=settings.TRANSACTIONS_PER_USER
-    )
-    generator.save_to_json(transactions, settings.DATA_PATH)
\ No newline at end of file
+    if args.bulk:
+        generator.generate_bulk(
+            args.output or "./data/transactions.jsonl", args.users, args.per_user,
+            output_format=args.format, seed=args.seed, users_per_chunk=args.chunk_users,
+            workers=args.workers, end_date=args.end_date
+        )
+    else:
+        transactions = generator.generate_data(
+            num_users=args.users,
+            transactions_per_user=args.per_user
+        )
+        generator.save_to_json(transactions, args.output or settings.DATA_PATH)
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+from config.settings import settings
+from services.concurrency import stage_executor
+from services.metrics import registry, request_timings
+
+
+class QueryEmbeddingBatcher:
+    """Coalesces concurrent query encodes into batched model calls
+
+    Callers await encode(text). The first queued request opens a batch window
+    of max_wait_ms; everything that arrives within it (up to max_batch_size) is
+    encoded in a single model call and the vectors are handed back to each
+    waiting caller. While all encode slots are busy, requests keep queueing, so
+    batches grow with load.
+    """
+
+    def __init__(self, embedding_service, max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None, max_inflight: Optional[int] = None):
+        self.embedding_service = embedding_service
+        self.max_batch_size = max_batch_size or settings.QUERY_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.QUERY_BATCH_WINDOW_MS) / 1000
+        self.max_inflight = max_inflight or settings.EMBEDDING_CONCURRENCY
+
+        self.batch_size_histogram = registry.histogram(
+            "query_embedding_batch_size",
+            "Number of queries encoded per model call",
+            [1, 2, 4, 8, 16, 32, 64, 128]
+        )
+        self.queue_wait_histogram = registry.histogram(
+            "query_embedding_queue_wait_seconds",
+            "Time a query waited in the batcher before encoding started",
+            [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0]
+        )
+
+        self._loop = None
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        self._tasks = set()
+
+    def _ensure_worker(self):
+        """Start the collector task on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            # The collector outlives the request that starts it, so keep it out of that request's timings
+            token = request_timings.set(None)
+            try:
+                self._worker = loop.create_task(self._run())
+            finally:
+                request_timings.reset(token)
+
+    async def encode(self, text: str) -> List[float]:
+        """Encode one query, batched with other concurrent callers"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List:
+        """Wait for one request, then gather more until the window closes"""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = self._loop.create_task(self._encode_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _encode_batch(self, batch: List):
+        try:
+            started = time.perf_counter()
+            self.batch_size_histogram.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_wait_histogram.observe(started - enqueued)
+
+            texts = [text for text, _, _ in batch]
+            try:
+                vectors = await stage_executor.run(
+                    "embedding", self.embedding_service.generate_query_embeddings, texts
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """Batch-size and queue-wait histograms"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.max_wait * 1000,
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_seconds": self.queue_wait_histogram.snapshot()
+        }
@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _FileLock:
+    """Exclusive lock shared by the threads of this process and by other processes"""
+
+    def __init__(self, path: str):
+        self._thread_lock = threading.Lock()
+        self._file = open(path, 'a+b')
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._thread_lock.release()
+
+
+class EmbeddingCache:
+    """On-disk, content-addressed cache of embedding vectors
+
+    Vectors live in a memory-mapped matrix (one file per model). index.json
+    maps text hashes to rows as of the last checkpoint, and every later
+    assignment is appended to journal.log as one "hash row" line. Entries are
+    kept in LRU order and the least recently used row is reused once the
+    cache reaches max_entries.
+
+    Several processes (API, Streamlit, ingest) can share a cache directory.
+    Every read and write takes an exclusive file lock and first replays
+    journal lines written by others, so rows are only allocated against the
+    current on-disk mapping. The journal is folded into index.json by
+    checkpoint(), which flush() runs once the journal outgrows the index.
+    Each checkpoint starts a new epoch, named in index.json and on the
+    journal's first line, so other processes know to reload.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int = 1_000_000,
+                 dtype: str = "float16", checkpoint_min_entries: int = 10000):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.checkpoint_min_entries = checkpoint_min_entries
+
+        # One sub-directory per model so vectors of different models never mix
+        model_slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.cache_dir = os.path.join(cache_dir, model_slug)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.bin")
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.journal_path = os.path.join(self.cache_dir, "journal.log")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = _FileLock(os.path.join(self.cache_dir, "lock"))
+
+        self._reset_state()
+        with self._lock:
+            self._load()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Content hash used as the cache key for a text"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _reset_state(self):
+        self.dim = None
+        self.capacity = 0
+        self.vectors = None
+        self.index = OrderedDict()  # text hash -> row, least recently used first
+        self.owners: Dict[int, str] = {}  # row -> text hash
+        self.free_rows = set()
+        self._epoch = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    def _reset_files(self):
+        """Start an empty cache on disk; callers hold the lock"""
+        for path in (self.index_path, self.journal_path, self.vectors_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self._reset_state()
+
+    # -- synchronisation with the files (all under the lock) -----------------
+
+    def _load(self):
+        """Load the last checkpoint and replay the journal on top of it"""
+        self._reset_state()
+        if not os.path.exists(self.index_path):
+            if os.path.exists(self.journal_path) or os.path.exists(self.vectors_path):
+                self._reset_files()
+            return
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠️ Embedding cache index unreadable, starting empty: {self.index_path}")
+            self._reset_files()
+            return
+
+        if data.get("dtype") != self.dtype.name:
+            print(f"⚠️ Embedding cache dtype changed, starting empty: {self.cache_dir}")
+            self._reset_files()
+            return
+
+        self.dim = data["dim"]
+        for key, row in data["entries"]:
+            self._assign(key, row)
+        self._epoch = data.get("epoch")
+        self._journal_offset = len(self._journal_header())
+        if self._epoch is None or not self._replay_journal():
+            # Written before journals existed, or a checkpoint stopped between
+            # its two files; the index already holds everything, so start a new epoch
+            self._map_vectors()
+            self._write_index()
+        self._map_vectors()
+
+        # The size cap may have been lowered since the cache was written
+        while len(self.index) > self.max_entries:
+            _, row = self.index.popitem(last=False)
+            del self.owners[row]
+            self.free_rows.add(row)
+            self.evictions += 1
+
+    def _assign(self, key: str, row: int):
+        """Record that row now holds key's vector, dropping whatever it held before"""
+        previous = self.owners.get(row)
+        if previous is not None and previous != key:
+            self.index.pop(previous, None)
+        old_row = self.index.get(key)
+        if old_row is not None and old_row != row:
+            del self.owners[old_row]
+            self.free_rows.add(old_row)
+        self.index[key] = row
+        self.index.move_to_end(key)
+        self.owners[row] = key
+        self.free_rows.discard(row)
+
+    def _journal_header(self) -> bytes:
+        return f"# {self._epoch}\n".encode('ascii')
+
+    def _replay_journal(self) -> bool:
+        """Apply journal lines appended since the last read; False if a checkpoint started a new epoch"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                if f.readline() != self._journal_header():
+                    return False
+                f.seek(self._journal_offset)
+                data = f.read()
+        except OSError:
+            return False
+        # Ignore a partially written last line
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            key, row = line.decode('ascii').split()
+            self._assign(key, int(row))
+            self._journal_entries += 1
+        self._journal_offset += end
+        return True
+
+    def _map_vectors(self):
+        """Map the vector file, picking up growth by other processes"""
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return
+        capacity = os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+        if capacity == self.capacity and self.vectors is not None:
+            return
+        if self.vectors is not None:
+            self.vectors.flush()
+            del self.vectors
+        self.vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode='r+',
+                                 shape=(capacity, self.dim)) if capacity else None
+        self.free_rows = set(range(capacity)) - self.owners.keys()
+        self.capacity = capacity
+
+    def _sync(self):
+        """Catch up with checkpoints and journal lines written by other processes"""
+        if self._epoch is None or not self._replay_journal():
+            self._load()
+        else:
+            self._map_vectors()
+
+    # -- writing ------------------------------------------------------------
+
+    def _write_index(self):
+        """Checkpoint: write the whole mapping under a new epoch and start an empty journal"""
+        self._epoch = uuid.uuid4().hex
+        data = {
+            "model": self.model_name,
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "capacity": self.capacity,
+            "epoch": self._epoch,
+            "entries": list(self.index.items())
+        }
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.index_path)
+
+        header = self._journal_header()
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+        os.replace(tmp_path, self.journal_path)
+        self._journal_offset = len(header)
+        self._journal_entries = 0
+
+    def _grow(self, needed: int):
+        """Grow the vector file so that at least `needed` rows are available"""
+        new_capacity = min(self.max_entries, max(needed, self.capacity * 2, 1024))
+        if new_capacity <= self.capacity:
+            return
+
+        if self.vectors is not None:
+            self.vectors.flush()
+            del self.vectors
+
+        mode = 'r+' if os.path.exists(self.vectors_path) and self.capacity else 'w+'
+        if mode == 'r+':
+            with open(self.vectors_path, 'r+b') as f:
+                f.truncate(new_capacity * self.dim * self.dtype.itemsize)
+
+        self.vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode=mode,
+                                 shape=(new_capacity, self.dim))
+        self.free_rows.update(range(self.capacity, new_capacity))
+        self.capacity = new_capacity
+        if self._epoch is None:
+            # A new cache: record dim and dtype right away for other processes
+            self._write_index()
+
+    def _allocate_row(self) -> int:
+        """Return a free row, growing the file or evicting the LRU entry"""
+        if len(self.index) >= self.max_entries:
+            key, row = self.index.popitem(last=False)
+            del self.owners[row]
+            self.evictions += 1
+            return row
+        if not self.free_rows:
+            self._grow(self.capacity + 1)
+        return self.free_rows.pop()
+
+    def get_many(self, texts: List[str]) -> Tuple[List[Optional[np.ndarray]], List[int]]:
+        """Look up texts, returning cached vectors (or None) and the indices of misses"""
+        results = [None] * len(texts)
+        missing = []
+
+        with self._lock:
+            self._sync()
+            for i, text in enumerate(texts):
+                key = self.hash_text(text)
+                row = self.index.get(key)
+                if row is None:
+                    missing.append(i)
+                    continue
+                self.index.move_to_end(key)
+                results[i] = np.array(self.vectors[row], dtype=np.float32)
+
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        return results, missing
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store vectors for texts, evicting least recently used entries if full
+
+        Vectors are written and the journal appended before the lock is
+        released, so other processes see the new entries on their next call.
+        """
+        vectors = np.asarray(vectors)
+        if len(texts) == 0:
+            return
+
+        with self._lock:
+            self._sync()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match cache dimension {self.dim}"
+                )
+
+            lines = []
+            for text, vector in zip(texts, vectors):
+                key = self.hash_text(text)
+                row = self.index.get(key)
+                if row is None:
+                    row = self._allocate_row()
+                self.vectors[row] = vector
+                self._assign(key, row)
+                lines.append(f"{key} {row}\n")
+
+            # Vectors reach the file before the journal points at them
+            self.vectors.flush()
+            with open(self.journal_path, 'ab') as f:
+                f.write("".join(lines).encode('ascii'))
+                self._journal_offset = f.tell()
+            self._journal_entries += len(lines)
+
+    def checkpoint(self):
+        """Fold the journal into index.json"""
+        with self._lock:
+            self._sync()
+            if self.dim is not None:
+                self._write_index()
+
+    def flush(self):
+        """Persist vectors, and checkpoint once the journal has outgrown the index"""
+        with self._lock:
+            self._sync()
+            if self.vectors is None:
+                return
+            self.vectors.flush()
+            if self._journal_entries > max(self.checkpoint_min_entries, len(self.index) // 2):
+                self._write_index()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.index),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
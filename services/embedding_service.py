@@ -1,14 +1,153 @@
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict
-import json
+from typing import TYPE_CHECKING, List, Dict, Optional
+import multiprocessing
+import os
+import re
+import numpy as np
 from config.settings import settings
+from services.embedding_cache import EmbeddingCache
+from services.metrics import timed
+from services.transaction_io import load_transactions
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+QUANTIZATION_CONFIGS = ("avx2", "avx512", "avx512_vnni", "arm64")
+
+
+def load_embedding_model(model_name: str, backend: str = "torch", quantization: str = "",
+                         threads: Optional[int] = None) -> "SentenceTransformer":
+    """Load a SentenceTransformer on the PyTorch or ONNX Runtime backend
+    
+    For ONNX, quantization picks a dynamically quantized int8 graph for the
+    given CPU family. It is exported once into EMBEDDING_ONNX_PATH and reused
+    afterwards. threads caps intra-op threads for either runtime.
+    
+    sentence_transformers (and torch) are imported here rather than at module
+    level, so importing the API does not pay for them before a model is needed.
+    """
+    from sentence_transformers import SentenceTransformer
+    
+    if backend == "torch":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+    
+    if backend != "onnx":
+        raise ValueError(f"Unknown embedding backend '{backend}'; expected 'torch' or 'onnx'")
+    
+    model_kwargs = {}
+    if threads:
+        import onnxruntime
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = threads
+        model_kwargs["session_options"] = session_options
+    
+    if not quantization:
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+    
+    if quantization not in QUANTIZATION_CONFIGS:
+        raise ValueError(f"Unknown quantization '{quantization}'; expected one of {', '.join(QUANTIZATION_CONFIGS)}")
+    
+    export_dir = os.path.join(settings.EMBEDDING_ONNX_PATH, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+    file_name = f"onnx/model_qint8_{quantization}.onnx"
+    if not os.path.exists(os.path.join(export_dir, file_name)):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+        
+        print(f"Exporting int8 ONNX model ({quantization}) to {export_dir}")
+        model = SentenceTransformer(model_name, backend="onnx")
+        model.save(export_dir)
+        export_dynamic_quantized_onnx_model(model, quantization, export_dir)
+    
+    return SentenceTransformer(export_dir, backend="onnx", model_kwargs={**model_kwargs, "file_name": file_name})
+
+
+# Model loaded in each encoder pool process
+_worker_model = None
+
+
+def _init_encoder_worker(model_name: str, backend: str, quantization: str, threads: int):
+    """Pool initializer: load one model copy per process with capped intra-op threads"""
+    global _worker_model
+    _worker_model = load_embedding_model(model_name, backend, quantization, threads=threads)
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return _worker_model.encode(texts, batch_size=32, convert_to_numpy=True).astype(np.float32)
+
 
 class EmbeddingService:
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, use_cache: Optional[bool] = None,
+                 backend: Optional[str] = None, quantization: Optional[str] = None):
         self.model_name = model_name or settings.EMBEDDING_MODEL
-        print(f"Loading embedding model: {self.model_name}")
-        self.model = SentenceTransformer(self.model_name)
+        self.backend = backend or settings.EMBEDDING_BACKEND
+        self.quantization = settings.EMBEDDING_QUANTIZATION if quantization is None else quantization
+        if self.backend != "onnx":
+            self.quantization = ""
+        print(f"Loading embedding model: {self.model_name} ({self.model_id})")
+        self.model = load_embedding_model(self.model_name, self.backend, self.quantization)
         print("✅ Embedding model loaded successfully")
+        
+        if use_cache is None:
+            use_cache = settings.EMBEDDING_CACHE_ENABLED
+        self.cache = EmbeddingCache(
+            cache_dir=settings.EMBEDDING_CACHE_PATH,
+            model_name=self.model_id,
+            max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            dtype=settings.EMBEDDING_CACHE_DTYPE
+        ) if use_cache else None
+        
+        self.pool = None
+        self.pool_workers = 1
+        self.pool_chunk_size = settings.EMBEDDING_POOL_CHUNK_SIZE
+    
+    @property
+    def model_id(self) -> str:
+        """Model name plus backend; vectors from different backends are cached apart"""
+        if self.backend == "torch":
+            return self.model_name
+        suffix = f"-qint8_{self.quantization}" if self.quantization else ""
+        return f"{self.model_name}@{self.backend}{suffix}"
+    
+    def start_pool(self, workers: Optional[int] = None, threads_per_worker: Optional[int] = None) -> int:
+        """Start encoder processes for bulk ingest; returns the number of workers
+        
+        Each process holds its own model copy and is limited to
+        threads_per_worker intra-op threads, so workers x threads stays at
+        the core count. workers=0 means one per core.
+        """
+        cores = os.cpu_count() or 1
+        workers = settings.EMBEDDING_WORKERS if workers is None else workers
+        workers = workers or cores
+        if workers <= 1:
+            return 1
+        
+        threads_per_worker = threads_per_worker or settings.EMBEDDING_THREADS_PER_WORKER or max(1, cores // workers)
+        self.stop_pool()
+        self.pool = multiprocessing.get_context("spawn").Pool(
+            workers,
+            initializer=_init_encoder_worker,
+            initargs=(self.model_name, self.backend, self.quantization, threads_per_worker)
+        )
+        self.pool_workers = workers
+        print(f"✅ Started {workers} embedding workers ({threads_per_worker} threads each)")
+        return workers
+    
+    def stop_pool(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            self.pool_workers = 1
+    
+    def _encode(self, texts: List[str], show_progress: bool = False) -> np.ndarray:
+        """Encode texts, spread across the worker pool when one is running"""
+        with timed("batch_encode"):
+            if self.pool is None or len(texts) <= self.pool_chunk_size:
+                return self.model.encode(texts, convert_to_numpy=True, show_progress_bar=show_progress)
+            
+            chunks = [texts[i:i + self.pool_chunk_size] for i in range(0, len(texts), self.pool_chunk_size)]
+            return np.vstack(self.pool.map(_encode_in_worker, chunks, chunksize=1))
     
     def create_transaction_text(self, transaction: Dict) -> str:
         """Convert transaction to text representation for embedding"""
@@ -20,18 +159,43 @@ class EmbeddingService:
     
     def generate_embedding(self, text: str) -> List[float]:
         """Generate embedding for a single text"""
-        embedding = self.model.encode(text, convert_to_numpy=True)
+        with timed("query_encode"):
+            embedding = self.model.encode(text, convert_to_numpy=True)
         return embedding.tolist()
     
-    def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts"""
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
+    def generate_query_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Encode a small batch of queries in one model call, bypassing the disk cache"""
+        with timed("query_encode"):
+            embeddings = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
         return embeddings.tolist()
     
+    def generate_embeddings_batch(self, texts: List[str], verbose: bool = True,
+                                  flush: bool = True) -> List[List[float]]:
+        """Generate embeddings for multiple texts, encoding only cache misses
+        
+        Callers embedding many small chunks pass verbose=False and flush=False
+        and call cache.flush() once at the end.
+        """
+        if self.cache is None:
+            return self._encode(texts, show_progress=verbose).tolist()
+        
+        cached, missing = self.cache.get_many(texts)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = self._encode(missing_texts, show_progress=verbose)
+            self.cache.put_many(missing_texts, encoded)
+            if flush:
+                self.cache.flush()
+            for i, vector in zip(missing, encoded):
+                cached[i] = vector
+        
+        if verbose:
+            print(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        return np.asarray(cached, dtype=np.float32).tolist() if texts else []
+    
     def load_and_prepare_transactions(self, file_path: str) -> tuple:
         """Load transactions and prepare text representations"""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            transactions = json.load(f)
+        transactions = load_transactions(file_path)
         
         texts = [self.create_transaction_text(txn) for txn in transactions]
         
@@ -0,0 +1,201 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, Optional
+from config.settings import settings
+from services.analytics_store import AnalyticsStore
+from services.transaction_io import iter_transaction_chunks
+
+_DONE = object()
+
+
+class IngestPipeline:
+    """Streams a transactions file into Chroma in overlapping stages
+
+    A reader thread parses the file chunk by chunk and builds texts and
+    metadata, an embedding thread encodes them, and the calling thread upserts
+    them into the collection. The stages are connected by bounded queues, so
+    the next chunk is being encoded while the previous one is written and only
+    a few chunks are ever held in memory. After each write the number of rows
+    done is checkpointed, so an interrupted ingest can resume where it stopped.
+    """
+
+    def __init__(self, vector_service, chunk_size: Optional[int] = None,
+                 queue_size: Optional[int] = None, checkpoint_path: Optional[str] = None):
+        self.vector_service = vector_service
+        self.chunk_size = chunk_size or settings.INGEST_CHUNK_SIZE
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+        self.checkpoint_path = checkpoint_path or os.path.join(settings.CHROMA_DB_PATH, "ingest_checkpoint.json")
+
+    def checkpoint_rows(self, path: str) -> int:
+        """Rows already written for this exact file, or 0 if there is no usable checkpoint"""
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        signature = AnalyticsStore.file_signature(path)
+        if checkpoint.get("source") != os.path.abspath(path) or signature is None:
+            return 0
+        if list(signature) != checkpoint.get("signature"):
+            return 0
+        return int(checkpoint.get("rows", 0))
+
+    def _save_checkpoint(self, path: str, rows: int):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "source": os.path.abspath(path),
+                "signature": list(AnalyticsStore.file_signature(path) or ()),
+                "rows": rows
+            }, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        try:
+            os.remove(self.checkpoint_path)
+        except OSError:
+            pass
+
+    def run(self, path: str, start_row: int = 0,
+            analytics_store: Optional[AnalyticsStore] = None) -> Dict:
+        """Ingest a file into the current collection, skipping the first start_row rows
+
+        Skipped rows are still read (for the latest date and, when an
+        analytics store is given, its columns) but not embedded or written.
+        """
+        service = self.vector_service
+        embedding_service = service.embedding_service
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        column_parts = []
+        state = {"rows": 0, "latest_date": None, "embed_seconds": 0.0}
+
+        def put(q, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def read():
+            try:
+                for chunk in iter_transaction_chunks(path, self.chunk_size):
+                    if analytics_store is not None:
+                        column_parts.append(analytics_store.encode(chunk))
+                    latest = max(txn['date'] for txn in chunk)
+                    if state["latest_date"] is None or latest > state["latest_date"]:
+                        state["latest_date"] = latest
+
+                    first = state["rows"]
+                    state["rows"] += len(chunk)
+                    if state["rows"] <= start_row:
+                        continue
+                    chunk = chunk[max(start_row - first, 0):]
+
+                    texts = [embedding_service.create_transaction_text(txn) for txn in chunk]
+                    metadatas = [
+                        service._prepare_metadata(txn, service.hash_text(text))
+                        for txn, text in zip(chunk, texts)
+                    ]
+                    if not put(embed_queue, ([txn['id'] for txn in chunk], texts, metadatas, state["rows"])):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(embed_queue, _DONE)
+
+        def embed():
+            try:
+                while True:
+                    item = get(embed_queue)
+                    if item is _DONE:
+                        break
+                    ids, texts, metadatas, end_row = item
+                    started = time.perf_counter()
+                    embeddings = embedding_service.generate_embeddings_batch(texts, verbose=False, flush=False)
+                    state["embed_seconds"] += time.perf_counter() - started
+                    if not put(write_queue, (ids, texts, metadatas, embeddings, end_row)):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(write_queue, _DONE)
+
+        threads = [
+            threading.Thread(target=read, name="ingest-read", daemon=True),
+            threading.Thread(target=embed, name="ingest-embed", daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+
+        started = time.perf_counter()
+        written = 0
+        write_seconds = 0.0
+        try:
+            while True:
+                item = get(write_queue)
+                if item is _DONE:
+                    break
+                ids, texts, metadatas, embeddings, end_row = item
+
+                write_started = time.perf_counter()
+                service.collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=texts,
+                    metadatas=metadatas
+                )
+                write_seconds += time.perf_counter() - write_started
+                self._save_checkpoint(path, end_row)
+
+                written += len(ids)
+                elapsed = time.perf_counter() - started
+                print(f"🔄 Ingested {end_row:,} rows ({written / elapsed:,.0f} rows/sec)", end="\r", flush=True)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            if embedding_service.cache is not None:
+                embedding_service.cache.checkpoint()
+
+        if errors:
+            raise errors[0]
+
+        if analytics_store is not None:
+            analytics_store.replace_columns(column_parts)
+            analytics_store.mark_source(path)
+        self.clear_checkpoint()
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "rows": state["rows"],
+            "written": written,
+            "resumed_from": start_row,
+            "latest_date": state["latest_date"],
+            "seconds": elapsed,
+            "rows_per_sec": written / elapsed if elapsed else 0.0,
+            "embed_seconds": state["embed_seconds"],
+            "write_seconds": write_seconds
+        }
+        print(
+            f"\n✅ Ingested {written:,} rows in {elapsed:.1f}s ({stats['rows_per_sec']:,.0f} rows/sec; "
+            f"embedding {stats['embed_seconds']:.1f}s, writing {write_seconds:.1f}s overlapped)"
+        )
+        return stats
@@ -1,11 +1,54 @@
 from .data_generator import FinancialDataGenerator
 from .embedding_service import EmbeddingService
-from .vector_search_service import VectorSearchService
+from .embedding_cache import EmbeddingCache
+from .query_cache import LRUCache, GenerationCounter, UserGenerations
+from .embedding_batcher import QueryEmbeddingBatcher
+from .query_parser import QueryParser, ParsedQuery
+from .analytics_store import AnalyticsStore, get_analytics_store
+from .rollup_store import RollupStore, get_rollup_store
+from .transaction_io import iter_transactions, load_transactions
+from .columnar_sidecar import ColumnarSidecar, open_sidecar, write_sidecar
+from .ingest_pipeline import IngestPipeline
+from .lexical_index import LexicalIndex, get_lexical_index, reciprocal_rank_fusion
+from .vector_backends import VectorBackend, ChromaBackend, NumpyBackend, PartitionedBackend, create_vector_backend
+from .vector_search_service import VectorSearchService, BatchQuery
+from .llm_cache import LLMResponseCache
 from .summarizer_service import SummarizerService
+from .answer_engine import AnswerEngine, LocalAnswer, answer_engine
 
 __all__ = [
     'FinancialDataGenerator',
     'EmbeddingService',
+    'EmbeddingCache',
+    'LRUCache',
+    'GenerationCounter',
+    'UserGenerations',
+    'QueryEmbeddingBatcher',
+    'QueryParser',
+    'ParsedQuery',
+    'AnalyticsStore',
+    'get_analytics_store',
+    'RollupStore',
+    'get_rollup_store',
+    'iter_transactions',
+    'load_transactions',
+    'ColumnarSidecar',
+    'open_sidecar',
+    'write_sidecar',
+    'IngestPipeline',
+    'LexicalIndex',
+    'get_lexical_index',
+    'reciprocal_rank_fusion',
+    'VectorBackend',
+    'ChromaBackend',
+    'NumpyBackend',
+    'PartitionedBackend',
+    'create_vector_backend',
     'VectorSearchService',
-    'SummarizerService'
+    'BatchQuery',
+    'LLMResponseCache',
+    'SummarizerService',
+    'AnswerEngine',
+    'LocalAnswer',
+    'answer_engine'
 ]
\ No newline at end of file
@@ -0,0 +1,214 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.settings import settings
+from services.analytics_store import AnalyticsStore, get_analytics_store
+from services.query_parser import CATEGORY_KEYWORDS, CREDIT_KEYWORDS, DEBIT_KEYWORDS, MONTHS
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Query words that carry no lexical meaning
+STOPWORDS = {
+    "a", "all", "an", "any", "are", "by", "did", "do", "does", "done", "find", "for", "from", "get",
+    "give", "how", "i", "in", "is", "list", "made", "many", "me", "much", "my", "of", "on", "please",
+    "show", "tell", "the", "to", "transaction", "transactions", "was", "were", "what", "whats",
+    "which", "with"
+}
+
+# Words the query parser already turns into filters
+FILTER_WORDS = {
+    "above", "and", "at", "below", "between", "day", "days", "greater", "higher", "inr", "k", "lakh",
+    "last", "least", "less", "lower", "month", "more", "most", "over", "past", "previous", "rs",
+    "rupees", "than", "this", "thousand", "today", "under", "up", "week", "year", "yesterday"
+}
+
+
+def stem(token: str) -> str:
+    """Light plural folding so "payments" matches "payment" and "bills" matches "bill" """
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1]
+
+
+IGNORED_QUERY_TERMS = {stem(word) for word in STOPWORDS | FILTER_WORDS | set(MONTHS)} | {
+    stem(token)
+    for words in [*CATEGORY_KEYWORDS.values(), CREDIT_KEYWORDS, DEBIT_KEYWORDS]
+    for word in words
+    for token in TOKEN_PATTERN.findall(word)
+}
+
+
+class LexicalIndex:
+    """BM25 inverted index over transaction descriptions
+
+    Descriptions name the merchant and the payment method ("UPI payment to
+    Swiggy"), so exact-token queries can be answered here without running the
+    embedding model. Postings are stored as CSR arrays (term offsets into a
+    doc-index array) and persisted as .npz next to the Chroma DB.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self.path = path or os.path.join(settings.CHROMA_DB_PATH, "lexical_index.npz")
+        self.k1 = k1
+        self.b = b
+        self.signature = None
+        self._set_arrays(
+            terms=np.array([], dtype=str), offsets=np.zeros(1, dtype=np.int64),
+            postings=np.array([], dtype=np.int32), tfs=np.array([], dtype=np.float32),
+            ids=np.array([], dtype=str), users=np.array([], dtype=str),
+            doc_users=np.array([], dtype=np.int32), doc_lengths=np.array([], dtype=np.float32)
+        )
+
+    def _set_arrays(self, **arrays):
+        self.arrays = arrays
+        self.term_ids = {term: i for i, term in enumerate(arrays["terms"].tolist())}
+        self.user_ids = {user: i for i, user in enumerate(arrays["users"].tolist())}
+        lengths = arrays["doc_lengths"]
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.arrays["ids"])
+
+    def rebuild(self, analytics_store: AnalyticsStore):
+        """Index every transaction in the columnar store"""
+        cols = analytics_store.columns()
+        ids = cols["id"]
+
+        # Descriptions repeat a lot, so tokenize each distinct one once
+        descriptions, inverse = np.unique(cols["description"].astype(str), return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(descriptions) + 1))
+
+        term_docs: Dict[str, List[np.ndarray]] = {}
+        term_tfs: Dict[str, List[np.ndarray]] = {}
+        description_lengths = np.zeros(len(descriptions), dtype=np.float32)
+        for i, description in enumerate(descriptions.tolist()):
+            counts = Counter(tokenize(description))
+            description_lengths[i] = sum(counts.values())
+            docs = order[bounds[i]:bounds[i + 1]].astype(np.int32)
+            for term, tf in counts.items():
+                term_docs.setdefault(term, []).append(docs)
+                term_tfs.setdefault(term, []).append(np.full(len(docs), tf, dtype=np.float32))
+
+        terms = sorted(term_docs)
+        postings = [np.concatenate(term_docs[term]) for term in terms]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in postings])
+
+        self._set_arrays(
+            terms=np.array(terms, dtype=str),
+            offsets=offsets,
+            postings=np.concatenate(postings) if postings else np.array([], dtype=np.int32),
+            tfs=np.concatenate([np.concatenate(term_tfs[t]) for t in terms]) if terms else np.array([], dtype=np.float32),
+            ids=np.array(ids.tolist(), dtype=str),
+            users=np.array(analytics_store.users.values, dtype=str),
+            doc_users=cols["user"].astype(np.int32),
+            doc_lengths=description_lengths[inverse] if len(ids) else np.array([], dtype=np.float32)
+        )
+
+    def analyze_query(self, query: str) -> Tuple[List[str], bool]:
+        """Indexed terms of a query, and whether those terms are all the query contains
+
+        Stopwords, numbers and words the query parser turns into filters are
+        ignored. The second value is True when every remaining word is in the
+        index, i.e. the query is a pure lexical lookup.
+        """
+        words = [
+            token for token in tokenize(query)
+            if token not in IGNORED_QUERY_TERMS and not token.isdigit()
+        ]
+        terms = [token for token in dict.fromkeys(words) if token in self.term_ids]
+        return terms, bool(words) and len(terms) == len(set(words))
+
+    def search(self, terms: List[str], user_id: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Ids and BM25 scores of every matching transaction, best first"""
+        arrays = self.arrays
+        total = len(arrays["ids"])
+        scores = np.zeros(total, dtype=np.float32)
+        for term in set(terms):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = arrays["offsets"][term_id], arrays["offsets"][term_id + 1]
+            docs, tf = arrays["postings"][start:end], arrays["tfs"][start:end]
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * arrays["doc_lengths"][docs] / self.average_length)
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        candidates = np.flatnonzero(scores > 0)
+        if user_id is not None:
+            user = self.user_ids.get(user_id)
+            if user is None:
+                return arrays["ids"][:0], scores[:0]
+            candidates = candidates[arrays["doc_users"][candidates] == user]
+
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return arrays["ids"][candidates], scores[candidates]
+
+    def save(self):
+        """Persist the index to disk"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, **self.arrays)
+        os.replace(tmp_path, self.path)
+        self.signature = AnalyticsStore.file_signature(self.path)
+
+    def load(self) -> bool:
+        """Load the index from disk; returns False if there is nothing to load"""
+        signature = AnalyticsStore.file_signature(self.path)
+        if signature is None:
+            return False
+        with np.load(self.path) as data:
+            self._set_arrays(**{name: data[name] for name in data.files})
+        self.signature = signature
+        return True
+
+    def refresh(self) -> bool:
+        """Reload if another process rewrote the index file"""
+        signature = AnalyticsStore.file_signature(self.path)
+        if signature is None or signature == self.signature:
+            return False
+        return self.load()
+
+
+def reciprocal_rank_fusion(rankings: List[List[Dict]], k: int = 60) -> List[Dict]:
+    """Merge ranked transaction lists by summing 1 / (k + rank) per transaction id"""
+    scores: Dict[str, float] = {}
+    transactions: Dict[str, Dict] = {}
+    for ranking in rankings:
+        for rank, transaction in enumerate(ranking, start=1):
+            txn_id = transaction['id']
+            scores[txn_id] = scores.get(txn_id, 0.0) + 1.0 / (k + rank)
+            transactions.setdefault(txn_id, transaction)
+    ranked = sorted(scores, key=lambda txn_id: scores[txn_id], reverse=True)
+    return [transactions[txn_id] for txn_id in ranked]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index(refresh: bool = True, build_missing: bool = True) -> LexicalIndex:
+    """Process-wide index, built from the analytics store on first use if not on disk"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LexicalIndex()
+            _index.load()
+        elif refresh:
+            _index.refresh()
+
+        if build_missing and _index.signature is None:
+            analytics_store = get_analytics_store()
+            if len(analytics_store):
+                _index.rebuild(analytics_store)
+                _index.save()
+    return _index
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class LLMResponseCache:
+    """Prompt-hash keyed cache of LLM responses with TTL and LRU eviction
+
+    Keys cover the model, the full message list, the generation parameters and
+    a data generation string, so a response is reused only for a byte-identical
+    prompt over unchanged data. With backend="disk" entries live in a SQLite
+    file and survive restarts; otherwise they are kept in memory.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 1000,
+                 backend: str = "memory", path: Optional[str] = None):
+        if backend not in ("memory", "disk"):
+            raise ValueError("backend must be 'memory' or 'disk'")
+
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (expires_at, response)
+        self._db = None
+
+        if backend == "disk":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], params: Dict, data_generation: Optional[str] = None) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params, "data": data_generation},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self.hits += 1
+                    return row[0]
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+            else:
+                entry = self._memory.get(key)
+                if entry is not None and entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                if entry is not None:
+                    del self._memory[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, expires_at, now)
+                )
+                # Drop expired rows, then the least recently used beyond the cap
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+                self._db.commit()
+            else:
+                self._memory[key] = (expires_at, response)
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            if self._db is not None:
+                size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            else:
+                size = len(self._memory)
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,186 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Seconds; spans cache hits (well under a millisecond) up to slow LLM calls
+STAGE_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Stage durations of the current request, set by the API while it collects Server-Timing
+request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str], extra: Optional[Dict[str, str]] = None) -> str:
+    merged = {**labels, **(extra or {})}
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in merged.items()) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, in the style of Prometheus histograms"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: List[float],
+                 labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self.labels = labels or {}
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict:
+        """Cumulative bucket counts plus sum and count"""
+        with self._lock:
+            cumulative = {}
+            running = 0
+            for bound, count in zip(self.buckets, self._counts):
+                running += count
+                cumulative[str(bound)] = running
+            cumulative["+Inf"] = running + self._counts[-1]
+            return {
+                "buckets": cumulative,
+                "count": self._count,
+                "sum": self._sum,
+                "mean": self._sum / self._count if self._count else 0.0
+            }
+
+    def samples(self) -> List[str]:
+        """Prometheus text-format sample lines"""
+        snapshot = self.snapshot()
+        lines = [
+            f"{self.name}_bucket{_format_labels(self.labels, {'le': bound})} {count}"
+            for bound, count in snapshot["buckets"].items()
+        ]
+        lines.append(f"{self.name}_sum{_format_labels(self.labels)} {snapshot['sum']}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels)} {snapshot['count']}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter, in the style of Prometheus counters"""
+
+    type = "counter"
+
+    def __init__(self, name: str, description: str, labels: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.description = description
+        self.labels = labels or {}
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {self._value}"]
+
+
+class MetricsRegistry:
+    """Process-wide metrics keyed by name and labels, rendered for Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, Tuple], object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name: str, labels: Dict[str, str], *args):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = factory(name, *args, labels=labels)
+        return metric
+
+    def histogram(self, name: str, description: str, buckets: List[float], **labels) -> Histogram:
+        return self._get(Histogram, name, labels, description, buckets)
+
+    def counter(self, name: str, description: str, **labels) -> Counter:
+        return self._get(Counter, name, labels, description)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        families: Dict[str, list] = {}
+        for metric in metrics:
+            families.setdefault(metric.name, []).append(metric)
+
+        lines = []
+        for name, family in families.items():
+            lines.append(f"# HELP {name} {family[0].description}")
+            lines.append(f"# TYPE {name} {family[0].type}")
+            for metric in family:
+                lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def record_stage(stage: str, seconds: float, error: bool = False):
+    """Record one run of a hot-path stage, and add it to the current request's timings"""
+    registry.histogram("stage_duration_seconds", "Time spent in each hot-path stage", STAGE_BUCKETS,
+                       stage=stage).observe(seconds)
+    registry.counter("stage_calls_total", "Runs of each hot-path stage", stage=stage).inc()
+    if error:
+        registry.counter("stage_errors_total", "Runs of each hot-path stage that raised", stage=stage).inc()
+
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage: str):
+    """Time the enclosed block as one run of a stage"""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - started, error)
+
+
+def count_cache_lookup(cache: str, hit: bool):
+    registry.counter("cache_lookups_total", "Cache lookups by cache and result",
+                     cache=cache, result="hit" if hit else "miss").inc()
+
+
+def count_answer(path: str, intent: str):
+    registry.counter("answers_total", "Summaries by answer path (local or llm) and intent",
+                     path=path, intent=intent).inc()
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    """Format stage durations (seconds) as a Server-Timing header value in milliseconds"""
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+from config.settings import settings
+
+# Leaf frames of threads that are parked waiting for work, not running it
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get")
+}
+
+
+class SamplingProfiler:
+    """Samples the Python stack of every thread at a fixed interval
+
+    Stacks are counted in collapsed form ("outer;inner;leaf count"), which
+    flamegraph.pl and speedscope read directly. Threads parked waiting for work
+    are skipped. Every thread is sampled, so requests running at the same time
+    show up too; profile one request at a time for a clean picture.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.PROFILE_INTERVAL_MS / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((os.path.basename(code.co_filename), code.co_name))
+                    frame = frame.f_back
+                if not stack or stack[0] in IDLE_FRAMES:
+                    continue
+                self.stacks[";".join(f"{name}:{function}" for name, function in reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def save(self, label: str, directory: Optional[str] = None) -> str:
+        """Write the collapsed stacks to <directory>/<timestamp>-<label>.folded and return the path"""
+        directory = directory or settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        safe_label = "".join(c if c.isalnum() else "_" for c in label).strip("_") or "request"
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{safe_label}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+        return path
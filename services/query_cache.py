@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping with hit/miss counters"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None"""
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any):
+        """Insert a value, evicting the least recently used entry if full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class GenerationCounter:
+    """Monotonic counter persisted in a file, bumped whenever the data changes
+
+    Readers in other processes (API workers, the Streamlit app) notice a bump
+    by the file's mtime, so checking the generation costs one stat() call.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._value = 0
+
+    def _read(self) -> int:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    @property
+    def value(self) -> int:
+        """Current generation, re-read only when the file has changed"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self._value
+        with self._lock:
+            if mtime != self._mtime:
+                self._value = self._read()
+                self._mtime = mtime
+            return self._value
+
+    def bump(self) -> int:
+        """Increment the generation and persist it"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._value = self._read() + 1
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(str(self._value))
+            os.replace(tmp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+            return self._value
+
+
+class UserGenerations:
+    """Per-user data generations persisted as JSON
+
+    A full rebuild bumps the epoch (invalidating every user); an incremental
+    sync bumps only the users whose transactions changed. Like
+    GenerationCounter, the file is re-read only when its mtime changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._data = {"epoch": 0, "users": {}}
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {"epoch": int(data.get("epoch", 0)), "users": dict(data.get("users", {}))}
+        except (OSError, ValueError):
+            return {"epoch": 0, "users": {}}
+
+    def _current(self) -> dict:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self._data
+        if mtime != self._mtime:
+            self._data = self._read()
+            self._mtime = mtime
+        return self._data
+
+    def value(self, user_id: str) -> str:
+        """Generation string for one user's transactions"""
+        with self._lock:
+            data = self._current()
+            return f"{data['epoch']}.{data['users'].get(user_id, 0)}"
+
+    def _write(self, data: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+        self._data = data
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def bump_users(self, user_ids: Iterable[str]):
+        """Invalidate the given users"""
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            data = self._read()
+            for user_id in user_ids:
+                data["users"][user_id] = data["users"].get(user_id, 0) + 1
+            self._write(data)
+
+    def bump_all(self):
+        """Invalidate every user"""
+        with self._lock:
+            data = self._read()
+            self._write({"epoch": data["epoch"] + 1, "users": {}})
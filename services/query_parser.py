@@ -0,0 +1,378 @@
+import calendar
+import re
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+
+# Internal numeric metadata fields that filters are applied to
+AMOUNT_KEY = "amount_num"
+DATE_KEY = "date_ord"
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10,
+    "nov": 11, "november": 11, "dec": 12, "december": 12
+}
+
+CATEGORY_KEYWORDS = {
+    "Food": ["food", "dining", "restaurant", "restaurants", "eating out"],
+    "Shopping": ["shopping", "shop"],
+    "Rent": ["rent", "rental"],
+    "Salary": ["salary", "salaries", "paycheck", "payroll"],
+    "Utilities": ["utilities", "utility", "bill", "bills"],
+    "Entertainment": ["entertainment", "movies", "movie", "streaming"],
+    "Travel": ["travel", "transport", "commute", "cab", "cabs", "taxi"],
+    "Others": ["other", "others", "miscellaneous"]
+}
+
+CREDIT_KEYWORDS = ["credit", "credits", "credited", "received", "income", "refund", "refunds", "deposit", "deposits"]
+DEBIT_KEYWORDS = [
+    "debit", "debits", "debited", "expense", "expenses", "spent", "spend", "spending",
+    "paid", "purchase", "purchases", "bought"
+]
+
+# Query phrase -> text that appears in the transaction description
+PAYMENT_METHODS = {
+    r"upi": "UPI payment",
+    r"card": "Card payment",
+    r"net\s*banking|bank transfer": "Net banking"
+}
+
+NUMBER = r"(?:₹|rs\.?|inr)?\s*(\d[\d,]*(?:\.\d+)?)\s*(k|thousand|lakh|lakhs|lac)?\b(?:\s*(?:rupees|rs\.?|inr))?"
+ISO_DATE = r"(\d{4}-\d{2}-\d{2})"
+
+AMOUNT_PATTERNS = [
+    (re.compile(rf"\bbetween\s+{NUMBER}\s+(?:and|to|-)\s+{NUMBER}"), "between"),
+    (re.compile(rf"(?:\bat least|\bminimum of|\bmin\.?|>=)\s*{NUMBER}"), "$gte"),
+    (re.compile(rf"(?:\babove|\bover|\bmore than|\bgreater than|\bexceeding|\bhigher than|>)\s*{NUMBER}"), "$gt"),
+    (re.compile(rf"(?:\bat most|\bup to|\bupto|\bmaximum of|\bmax\.?|<=)\s*{NUMBER}"), "$lte"),
+    (re.compile(rf"(?:\bbelow|\bunder|\bless than|\blower than|\bcheaper than|<)\s*{NUMBER}"), "$lt"),
+]
+
+TOP_N_PATTERN = re.compile(
+    r"\b(top|largest|biggest|highest|most expensive|costliest|bottom|smallest|lowest|cheapest)\s+(\d+)\b"
+)
+SUPERLATIVE_PATTERN = re.compile(
+    r"\b(largest|biggest|highest|most expensive|costliest|smallest|lowest|cheapest)\b"
+)
+RECENT_N_PATTERN = re.compile(r"\b(?:latest|last|most recent|recent)\s+(\d+)\s+(?:transactions?|payments?|expenses?|credits?|debits?)\b")
+ASCENDING_WORDS = {"bottom", "smallest", "lowest", "cheapest"}
+
+COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b
+}
+
+
+@dataclass
+class ParsedQuery:
+    """Structured constraints extracted from a natural-language query"""
+    text: str
+    category: Optional[str] = None
+    txn_type: Optional[str] = None
+    amount_filters: List[Tuple[str, float]] = field(default_factory=list)
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    document_terms: List[str] = field(default_factory=list)
+    sort_by: Optional[str] = None  # "amount" or "date"
+    descending: bool = True
+    limit: Optional[int] = None
+
+    @property
+    def has_filters(self) -> bool:
+        return bool(
+            self.category or self.txn_type or self.amount_filters
+            or self.date_from or self.date_to or self.document_terms
+        )
+
+    def build_where(self, user_id: Optional[str] = None) -> Optional[Dict]:
+        """Chroma metadata filter for these constraints"""
+        conditions = []
+        if user_id:
+            conditions.append({"userId": user_id})
+        if self.category:
+            conditions.append({"category": self.category})
+        if self.txn_type:
+            conditions.append({"type": self.txn_type})
+        for operator, value in self.amount_filters:
+            conditions.append({AMOUNT_KEY: {operator: float(value)}})
+        if self.date_from:
+            conditions.append({DATE_KEY: {"$gte": date_to_ordinal(self.date_from)}})
+        if self.date_to:
+            conditions.append({DATE_KEY: {"$lte": date_to_ordinal(self.date_to)}})
+
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+    def build_where_document(self) -> Optional[Dict]:
+        """Chroma document filter for merchant and payment-method mentions"""
+        if not self.document_terms:
+            return None
+        if len(self.document_terms) == 1:
+            return {"$contains": self.document_terms[0]}
+        return {"$or": [{"$contains": term} for term in self.document_terms]}
+
+    def matches(self, transaction: Dict) -> bool:
+        """Whether a transaction satisfies these constraints (same semantics as the Chroma filters)"""
+        if self.category and transaction['category'] != self.category:
+            return False
+        if self.txn_type and transaction['type'] != self.txn_type:
+            return False
+        amount = float(transaction['amount'])
+        for operator, value in self.amount_filters:
+            if not COMPARISONS[operator](amount, value):
+                return False
+        if self.date_from or self.date_to:
+            day = parse_date(transaction['date'])
+            if (self.date_from and day < self.date_from) or (self.date_to and day > self.date_to):
+                return False
+        if self.document_terms and not any(term in transaction['description'] for term in self.document_terms):
+            return False
+        return True
+
+    def with_filters(self, category: Optional[str] = None, txn_type: Optional[str] = None,
+                     amount_min: Optional[float] = None, amount_max: Optional[float] = None,
+                     date_from: Optional[str] = None, date_to: Optional[str] = None) -> "ParsedQuery":
+        """Copy with explicit filters; each one given replaces what was parsed from the text"""
+        updated = replace(self, amount_filters=list(self.amount_filters), document_terms=list(self.document_terms))
+        if category is not None:
+            updated.category = category
+        if txn_type is not None:
+            updated.txn_type = txn_type
+        if amount_min is not None or amount_max is not None:
+            updated.amount_filters = []
+            if amount_min is not None:
+                updated.amount_filters.append(("$gte", float(amount_min)))
+            if amount_max is not None:
+                updated.amount_filters.append(("$lte", float(amount_max)))
+        if date_from is not None:
+            updated.date_from = parse_date(date_from)
+        if date_to is not None:
+            updated.date_to = parse_date(date_to)
+        return updated
+
+    def describe(self) -> Dict:
+        """JSON-friendly summary of the extracted filters"""
+        return {
+            "category": self.category,
+            "type": self.txn_type,
+            "amount": [[operator, value] for operator, value in self.amount_filters],
+            "date_from": self.date_from.isoformat() if self.date_from else None,
+            "date_to": self.date_to.isoformat() if self.date_to else None,
+            "terms": list(self.document_terms),
+            "sort_by": self.sort_by,
+            "descending": self.descending,
+            "limit": self.limit
+        }
+
+
+def date_to_ordinal(value: date) -> int:
+    """Sortable integer form of a date (YYYYMMDD) stored in metadata"""
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def parse_date(value: str) -> date:
+    return date.fromisoformat(value[:10])
+
+
+def _to_amount(number: str, unit: Optional[str]) -> float:
+    value = float(number.replace(",", ""))
+    if unit in ("k", "thousand"):
+        value *= 1_000
+    elif unit in ("lakh", "lakhs", "lac"):
+        value *= 100_000
+    return value
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _shift_month(year: int, month: int, delta: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def _word_pattern(words: List[str]) -> re.Pattern:
+    return re.compile(r"\b(?:" + "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True)) + r")\b")
+
+
+class QueryParser:
+    """Deterministic extraction of amount, date, category, type, merchant and top-N constraints"""
+
+    def __init__(self, merchants: Optional[Dict[str, List[str]]] = None):
+        merchants = merchants or settings.MERCHANTS
+        # Salary merchant names never appear in descriptions, so they are not searchable terms
+        names = {name for category, items in merchants.items() if category != "Salary" for name in items}
+        self.merchant_patterns = [
+            (name, re.compile(r"\b" + re.escape(name.lower()) + r"(?:'?s)?\b"))
+            for name in sorted(names, key=len, reverse=True)
+        ]
+        self.category_patterns = {
+            category: _word_pattern(words) for category, words in CATEGORY_KEYWORDS.items()
+        }
+        self.credit_pattern = _word_pattern(CREDIT_KEYWORDS)
+        self.debit_pattern = _word_pattern(DEBIT_KEYWORDS)
+        self.month_pattern = re.compile(
+            r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\b(?:\s+(\d{4}))?"
+        )
+
+    def parse(self, query: str, reference_date: Optional[date] = None) -> ParsedQuery:
+        """Parse a query; relative dates are resolved against reference_date"""
+        reference_date = reference_date or date.today()
+        text = " ".join(query.lower().split())
+        parsed = ParsedQuery(text=query)
+
+        text = self._parse_amounts(text, parsed)
+        text = self._parse_dates(text, parsed, reference_date)
+        self._parse_ranking(text, parsed)
+        text = self._parse_terms(text, parsed)
+        self._parse_category_and_type(text, parsed)
+
+        return parsed
+
+    def _parse_amounts(self, text: str, parsed: ParsedQuery) -> str:
+        for pattern, operator in AMOUNT_PATTERNS:
+            match = pattern.search(text)
+            if not match:
+                continue
+            if operator == "between":
+                low = _to_amount(match.group(1), match.group(2))
+                high = _to_amount(match.group(3), match.group(4))
+                low, high = min(low, high), max(low, high)
+                parsed.amount_filters += [("$gte", low), ("$lte", high)]
+            else:
+                parsed.amount_filters.append((operator, _to_amount(match.group(1), match.group(2))))
+            text = text[:match.start()] + " " + text[match.end():]
+        return text
+
+    def _parse_dates(self, text: str, parsed: ParsedQuery, today: date) -> str:
+        def consume(match) -> str:
+            return text[:match.start()] + " " + text[match.end():]
+
+        # Explicit ISO dates
+        match = re.search(rf"\bbetween\s+{ISO_DATE}\s+(?:and|to)\s+{ISO_DATE}", text) or \
+            re.search(rf"\bfrom\s+{ISO_DATE}\s+(?:to|until|till)\s+{ISO_DATE}", text)
+        if match:
+            parsed.date_from, parsed.date_to = sorted([parse_date(match.group(1)), parse_date(match.group(2))])
+            text = consume(match)
+        for pattern, bound in [
+            (rf"\b(?:since|after|from)\s+{ISO_DATE}", "from"),
+            (rf"\b(?:before|until|till|up to)\s+{ISO_DATE}", "to"),
+            (rf"\bon\s+{ISO_DATE}", "on"),
+        ]:
+            match = re.search(pattern, text)
+            if not match:
+                continue
+            value = parse_date(match.group(1))
+            if bound == "from":
+                parsed.date_from = value
+            elif bound == "to":
+                parsed.date_to = value
+            else:
+                parsed.date_from = parsed.date_to = value
+            text = consume(match)
+
+        # Relative periods
+        match = re.search(r"\b(?:last|past|previous)\s+(\d+)\s+(day|week|month)s?\b", text)
+        if match:
+            count, unit = int(match.group(1)), match.group(2)
+            days = {"day": 1, "week": 7, "month": 30}[unit] * count
+            parsed.date_from, parsed.date_to = today - timedelta(days=days), today
+            return consume(match)
+
+        relative = [
+            (r"\b(?:last|previous) month\b", lambda: _month_range(*_shift_month(today.year, today.month, -1))),
+            (r"\bthis month\b", lambda: (today.replace(day=1), today)),
+            (r"\b(?:last|previous) week\b", lambda: (
+                today - timedelta(days=today.weekday() + 7), today - timedelta(days=today.weekday() + 1)
+            )),
+            (r"\bthis week\b", lambda: (today - timedelta(days=today.weekday()), today)),
+            (r"\b(?:last|previous) year\b", lambda: (date(today.year - 1, 1, 1), date(today.year - 1, 12, 31))),
+            (r"\bthis year\b", lambda: (date(today.year, 1, 1), today)),
+            (r"\byesterday\b", lambda: (today - timedelta(days=1), today - timedelta(days=1))),
+            (r"\btoday\b", lambda: (today, today)),
+        ]
+        for pattern, resolve in relative:
+            match = re.search(pattern, text)
+            if match:
+                parsed.date_from, parsed.date_to = resolve()
+                return consume(match)
+
+        # Month names, e.g. "in August" or "sept 2025"
+        ranges = []
+        for match in self.month_pattern.finditer(text):
+            name, year = match.group(1), match.group(2)
+            # "may" is usually a verb unless a year or preposition makes it a month
+            if name == "may" and not year and not re.search(r"\b(?:in|during|for|of|since)\s+$", text[:match.start()]):
+                continue
+            month = MONTHS[name]
+            if year:
+                ranges.append(_month_range(int(year), month))
+            else:
+                # Most recent occurrence of that month on or before the reference date
+                ranges.append(_month_range(today.year if month <= today.month else today.year - 1, month))
+        if ranges:
+            parsed.date_from = min(start for start, _ in ranges)
+            parsed.date_to = max(end for _, end in ranges)
+            text = self.month_pattern.sub(" ", text)
+
+        return text
+
+    def _parse_ranking(self, text: str, parsed: ParsedQuery):
+        match = RECENT_N_PATTERN.search(text)
+        if match:
+            parsed.sort_by, parsed.descending, parsed.limit = "date", True, int(match.group(1))
+            return
+
+        match = TOP_N_PATTERN.search(text)
+        if match:
+            parsed.sort_by = "amount"
+            parsed.descending = match.group(1) not in ASCENDING_WORDS
+            parsed.limit = int(match.group(2))
+            return
+
+        match = SUPERLATIVE_PATTERN.search(text)
+        if match:
+            parsed.sort_by = "amount"
+            parsed.descending = match.group(1) not in ASCENDING_WORDS
+            # "biggest expense" asks for one row, "biggest expenses" for a ranked list
+            following = text[match.end():].split()
+            parsed.limit = 1 if following and not following[0].endswith("s") else None
+            return
+
+        if re.search(r"\btop\b", text):
+            parsed.sort_by, parsed.descending = "amount", True
+        elif re.search(r"\b(?:latest|most recent|newest)\b", text):
+            parsed.sort_by, parsed.descending = "date", True
+
+    def _parse_terms(self, text: str, parsed: ParsedQuery) -> str:
+        for pattern, term in PAYMENT_METHODS.items():
+            if re.search(r"\b(?:" + pattern + r")\b", text):
+                parsed.document_terms.append(term)
+        for name, pattern in self.merchant_patterns:
+            match = pattern.search(text)
+            if match:
+                parsed.document_terms.append(name)
+                # Stop "amazon prime" from also matching "amazon"
+                text = text[:match.start()] + " " + text[match.end():]
+        return text
+
+    def _parse_category_and_type(self, text: str, parsed: ParsedQuery):
+        matches = [category for category, pattern in self.category_patterns.items() if pattern.search(text)]
+        if len(matches) == 1:
+            parsed.category = matches[0]
+
+        is_credit = bool(self.credit_pattern.search(text))
+        is_debit = bool(self.debit_pattern.search(text))
+        if is_credit != is_debit:
+            parsed.txn_type = "Credit" if is_credit else "Debit"
+        elif parsed.category == "Salary":
+            parsed.txn_type = "Credit"
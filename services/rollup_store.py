@@ -0,0 +1,262 @@
+import calendar
+import json
+import os
+import re
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from config.settings import settings
+from services.analytics_store import AnalyticsStore, GROUP_COLUMNS, get_analytics_store
+
+# Cell key: (user, month, category, type); value: [sum, count, min, max]
+CellKey = Tuple[str, str, str, str]
+
+DATE_BOUND = re.compile(r"(\d{4})-(\d{2})(?:-(\d{2}))?")
+
+
+def data_source(analytics_store: AnalyticsStore) -> Optional[List]:
+    """[path, mtime_ns, size] of the file the analytics store was loaded from"""
+    if analytics_store.source_path is None or analytics_store.source_signature is None:
+        return None
+    return [os.path.abspath(analytics_store.source_path), *analytics_store.source_signature]
+
+
+class RollupStore:
+    """Materialized sum/count/min/max per user x month x category x type
+
+    Cells are updated incrementally as transactions are ingested and persisted
+    as JSON next to the Chroma DB. Queries merge cells, so their cost depends on
+    the number of users, months and categories, not on the number of rows.
+    `source` records the data file (see data_source) the cells describe, so
+    they can be rebuilt when the analytics store is reloaded from another file.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(settings.CHROMA_DB_PATH, "rollups.json")
+        self.cells: Dict[CellKey, List[float]] = {}
+        self.signature = None
+        self.source = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cell_key(transaction: Dict) -> CellKey:
+        return (
+            transaction['userId'],
+            transaction['date'][:7],
+            transaction['category'],
+            transaction['type']
+        )
+
+    def rebuild(self, analytics_store: AnalyticsStore):
+        """Recompute every cell from the columnar store"""
+        cells = {}
+        for row in analytics_store.aggregate(GROUP_COLUMNS):
+            key = tuple(row[column] for column in GROUP_COLUMNS)
+            cells[key] = [row["sum"], row["count"], row["min"], row["max"]]
+        with self._lock:
+            self.cells = cells
+        self.source = data_source(analytics_store)
+
+    def describes(self, analytics_store: AnalyticsStore) -> bool:
+        """Whether the cells were built from the data the analytics store holds"""
+        return self.signature is not None and self.source == data_source(analytics_store)
+
+    def apply(self, added: Iterable[Dict], removed: Iterable[Dict], analytics_store: AnalyticsStore):
+        """Incrementally add and remove transactions
+
+        `removed` must hold the previous version of updated rows as well as
+        deleted rows. Cells whose min or max may have been removed are
+        recomputed from the (already updated) columnar store.
+        """
+        dirty = set()
+        with self._lock:
+            for txn in removed:
+                key = self.cell_key(txn)
+                cell = self.cells.get(key)
+                if cell is None:
+                    continue
+                amount = float(txn['amount'])
+                cell[0] -= amount
+                cell[1] -= 1
+                if cell[1] <= 0:
+                    del self.cells[key]
+                    dirty.discard(key)
+                elif amount <= cell[2] or amount >= cell[3]:
+                    dirty.add(key)
+
+            for txn in added:
+                key = self.cell_key(txn)
+                amount = float(txn['amount'])
+                cell = self.cells.get(key)
+                if cell is None:
+                    self.cells[key] = [amount, 1, amount, amount]
+                else:
+                    cell[0] += amount
+                    cell[1] += 1
+                    cell[2] = min(cell[2], amount)
+                    cell[3] = max(cell[3], amount)
+
+            for key in dirty:
+                if key not in self.cells:
+                    continue
+                user, month, category, txn_type = key
+                rows = analytics_store.aggregate(
+                    [], user_id=user, category=category, txn_type=txn_type,
+                    date_from=f"{month}-01", date_to=_month_end(month)
+                )
+                if rows:
+                    self.cells[key] = [rows[0]["sum"], rows[0]["count"], rows[0]["min"], rows[0]["max"]]
+                else:
+                    del self.cells[key]
+        self.source = data_source(analytics_store)
+
+    def query(self, group_by: Iterable[str] = (), user_id: Optional[str] = None,
+              category: Optional[str] = None, txn_type: Optional[str] = None,
+              month_from: Optional[str] = None, month_to: Optional[str] = None) -> List[Dict]:
+        """Merge cells into sum, count, min, max and mean per group"""
+        group_by = list(group_by)
+        for column in group_by:
+            if column not in GROUP_COLUMNS:
+                raise ValueError(f"Cannot group by '{column}'; expected one of {', '.join(GROUP_COLUMNS)}")
+        positions = [GROUP_COLUMNS.index(column) for column in group_by]
+
+        groups = {}
+        with self._lock:
+            for key, (total, count, low, high) in self.cells.items():
+                user, month, cell_category, cell_type = key
+                if user_id is not None and user != user_id:
+                    continue
+                if category is not None and cell_category != category:
+                    continue
+                if txn_type is not None and cell_type != txn_type:
+                    continue
+                if month_from is not None and month < month_from:
+                    continue
+                if month_to is not None and month > month_to:
+                    continue
+
+                group = tuple(key[p] for p in positions)
+                merged = groups.get(group)
+                if merged is None:
+                    groups[group] = [total, count, low, high]
+                else:
+                    merged[0] += total
+                    merged[1] += count
+                    merged[2] = min(merged[2], low)
+                    merged[3] = max(merged[3], high)
+
+        rows = []
+        for group, (total, count, low, high) in sorted(groups.items()):
+            row = dict(zip(group_by, group))
+            row.update({
+                "sum": float(total),
+                "count": int(count),
+                "min": float(low),
+                "max": float(high),
+                "mean": float(total / count)
+            })
+            rows.append(row)
+        return rows
+
+    def save(self):
+        """Persist cells to disk"""
+        with self._lock:
+            data = [list(key) + values for key, values in self.cells.items()]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "columns": list(GROUP_COLUMNS) + ["sum", "count", "min", "max"],
+                "source": self.source,
+                "cells": data
+            }, f)
+        os.replace(tmp_path, self.path)
+        self.signature = AnalyticsStore.file_signature(self.path)
+
+    def load(self) -> bool:
+        """Load cells from disk; returns False if there is nothing to load"""
+        signature = AnalyticsStore.file_signature(self.path)
+        if signature is None:
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        cells = {tuple(row[:4]): list(row[4:]) for row in data["cells"]}
+        with self._lock:
+            self.cells = cells
+        self.source = data.get("source")
+        self.signature = signature
+        return True
+
+    def refresh(self) -> bool:
+        """Reload if another process rewrote the rollup file"""
+        signature = AnalyticsStore.file_signature(self.path)
+        if signature is None or signature == self.signature:
+            return False
+        return self.load()
+
+
+def _month_end(month: str) -> str:
+    year, month_number = int(month[:4]), int(month[5:7])
+    return f"{month}-{calendar.monthrange(year, month_number)[1]:02d}"
+
+
+def _check_bound(name: str, value: str):
+    match = DATE_BOUND.fullmatch(value)
+    try:
+        if match is None:
+            raise ValueError
+        date(int(match.group(1)), int(match.group(2)), int(match.group(3) or 1))
+    except ValueError:
+        raise ValueError(f"{name} must be a date as YYYY-MM or YYYY-MM-DD, got '{value}'") from None
+
+
+def month_bounds(date_from: Optional[str], date_to: Optional[str]) -> Optional[Tuple[Optional[str], Optional[str]]]:
+    """Convert a date range to (month_from, month_to) if it covers whole months
+
+    Accepts YYYY-MM or YYYY-MM-DD and raises ValueError for anything else.
+    Returns None when a bound falls inside a month, in which case rollups
+    cannot answer the query exactly.
+    """
+    if date_from:
+        _check_bound("date_from", date_from)
+    if date_to:
+        _check_bound("date_to", date_to)
+    month_from = month_to = None
+    if date_from:
+        if len(date_from) > 7 and not date_from.endswith("-01"):
+            return None
+        month_from = date_from[:7]
+    if date_to:
+        if len(date_to) > 7 and date_to != _month_end(date_to[:7]):
+            return None
+        month_to = date_to[:7]
+    return month_from, month_to
+
+
+_rollups = None
+_rollups_lock = threading.Lock()
+
+
+def get_rollup_store(refresh: bool = True, build_missing: bool = True) -> RollupStore:
+    """Process-wide rollups, built from the analytics store on first use if not on disk
+
+    With build_missing they are also rebuilt when they describe a different
+    data file than the analytics store holds (DATA_PATH changed, or it
+    differs from what was ingested), so rollups and columnar queries agree.
+    """
+    global _rollups
+    with _rollups_lock:
+        if _rollups is None:
+            _rollups = RollupStore()
+            _rollups.load()
+        elif refresh:
+            _rollups.refresh()
+        
+        # Nothing persisted yet (e.g. a database built before rollups existed), or stale
+        if build_missing:
+            analytics_store = get_analytics_store()
+            if not _rollups.describes(analytics_store):
+                _rollups.rebuild(analytics_store)
+                if data_source(analytics_store) is not None:
+                    _rollups.save()
+    return _rollups
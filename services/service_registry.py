@@ -0,0 +1,149 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+from config.settings import settings
+from services.concurrency import stage_executor
+from services.query_cache import GenerationCounter, UserGenerations
+
+
+class ServiceRegistry:
+    """Builds the API's services on first use and warms them up in the background
+
+    Importing the API no longer loads the embedding model or needs a Groq key.
+    VectorSearchService is built the first time a request (or the warm-up)
+    asks for it, and SummarizerService only when a summary is requested. The
+    warm-up runs a dummy encode and a vector query, so the first real request
+    does not pay for model loading, lazy weight init or opening the store.
+    """
+
+    def __init__(self):
+        self._vector_service = None
+        self._summarizer_service = None
+        self._lock = threading.Lock()
+        self._warmup_task = None
+        self.created_at = time.perf_counter()
+        self.state = "cold"  # cold -> warming -> ready | failed
+        self.error = None
+        self.timings: Dict[str, float] = {}
+        self._generations = None
+
+    def _timed_build(self, name: str, factory):
+        started = time.perf_counter()
+        service = factory()
+        self.timings[name] = time.perf_counter() - started
+        return service
+
+    def vector_service(self):
+        """The shared VectorSearchService, built on first call"""
+        if self._vector_service is None:
+            with self._lock:
+                if self._vector_service is None:
+                    from services.vector_search_service import VectorSearchService
+                    self._vector_service = self._timed_build("vector_service_init", VectorSearchService)
+        return self._vector_service
+
+    def summarizer_service(self):
+        """The shared SummarizerService, built on first call; raises ValueError without GROQ_API_KEY"""
+        if self._summarizer_service is None:
+            with self._lock:
+                if self._summarizer_service is None:
+                    from services.summarizer_service import SummarizerService
+                    self._summarizer_service = self._timed_build("summarizer_service_init", SummarizerService)
+        return self._summarizer_service
+
+    def data_generation(self, user_id: Optional[str] = None) -> str:
+        """Same value as VectorSearchService.data_generation, without building the service
+
+        Reads the generation files every (re)index bumps, so callers that only
+        need a cache key (e.g. /insights) skip loading the embedding model.
+        """
+        if self._vector_service is not None:
+            return self._vector_service.data_generation(user_id)
+        if self._generations is None:
+            self._generations = (
+                GenerationCounter(os.path.join(settings.CHROMA_DB_PATH, "generation")),
+                UserGenerations(os.path.join(settings.CHROMA_DB_PATH, "user_generations.json"))
+            )
+        generation, user_generations = self._generations
+        return str(generation.value) if user_id is None else user_generations.value(user_id)
+
+    @property
+    def loaded_summarizer(self):
+        """The SummarizerService if it has been built, without building it"""
+        return self._summarizer_service
+
+    async def _build_off_loop(self, getter):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(stage_executor.executor, getter)
+
+    async def avector_service(self):
+        """Async variant of vector_service; a first build runs off the event loop"""
+        if self._vector_service is not None:
+            return self._vector_service
+        return await self._build_off_loop(self.vector_service)
+
+    async def asummarizer_service(self):
+        """Async variant of summarizer_service; a first build runs off the event loop"""
+        if self._summarizer_service is not None:
+            return self._summarizer_service
+        return await self._build_off_loop(self.summarizer_service)
+
+    def warm_up(self):
+        """Build the services and push one query through the encode and vector store paths"""
+        self.state = "warming"
+        started = time.perf_counter()
+        try:
+            vector_service = self.vector_service()
+
+            step = time.perf_counter()
+            embedding = vector_service.embedding_service.generate_query_embeddings(["warm up"])[0]
+            self.timings["warmup_encode"] = time.perf_counter() - step
+
+            if vector_service.collection is not None:
+                step = time.perf_counter()
+                vector_service.search_by_embedding(embedding, n_results=1)
+                self.timings["warmup_vector_query"] = time.perf_counter() - step
+
+            if settings.GROQ_API_KEY:
+                self.summarizer_service()
+
+            self.timings["warmup_total"] = time.perf_counter() - started
+            self.state = "ready"
+            print(f"✅ Services warmed up in {self.timings['warmup_total']:.2f}s")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            print(f"⚠️ Warm-up failed: {e}")
+
+    def start_warmup(self) -> Optional[asyncio.Future]:
+        """Run warm_up in the thread pool without blocking startup"""
+        if self._warmup_task is None:
+            print("🔄 Warming up services in the background...")
+            loop = asyncio.get_running_loop()
+            self._warmup_task = loop.run_in_executor(stage_executor.executor, self.warm_up)
+        return self._warmup_task
+
+    def readiness(self) -> Dict:
+        """State, build and warm-up timings (ms), and seconds since the registry was created"""
+        vector_service = self._vector_service
+        # Without warm-up, services are built by the first request, so readiness only reflects failures
+        ready = self.state == "ready" or (not settings.WARMUP_ENABLED and self.state != "failed")
+        return {
+            "ready": ready,
+            "status": self.state,
+            "error": self.error,
+            "collection_loaded": vector_service is not None and vector_service.collection is not None,
+            "summarizer_loaded": self._summarizer_service is not None,
+            "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in self.timings.items()},
+            "uptime_s": round(time.perf_counter() - self.created_at, 3)
+        }
+
+
+service_registry = ServiceRegistry()
+
+
+if __name__ == "__main__":
+    service_registry.warm_up()
+    print(service_registry.readiness())
@@ -1,6 +1,10 @@
-from groq import Groq
-from typing import List, Dict
+from groq import Groq, AsyncGroq
+import time
+from typing import List, Dict, Optional, Iterator, AsyncIterator
 from config.settings import settings
+from services.concurrency import stage_executor
+from services.llm_cache import LLMResponseCache
+from services.metrics import timed, record_stage, count_cache_lookup
 
 class SummarizerService:
     def __init__(self):
@@ -8,13 +12,19 @@ class SummarizerService:
             raise ValueError("GROQ_API_KEY not found in environment variables")
         
         self.client = Groq(api_key=settings.GROQ_API_KEY)
+        self.async_client = AsyncGroq(api_key=settings.GROQ_API_KEY)
         self.model = settings.LLM_MODEL
-    
-    def summarize_transactions(self, query: str, transactions: List[Dict]) -> str:
-        """Summarize transactions using Groq LLM"""
-        if not transactions:
-            return "No transactions found for your query."
         
+        # Identical prompts over unchanged data reuse the previous response
+        self.cache = LLMResponseCache(
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            backend=settings.LLM_CACHE_BACKEND,
+            path=settings.LLM_CACHE_PATH
+        ) if settings.LLM_CACHE_ENABLED else None
+    
+    def _build_summary_messages(self, query: str, transactions: List[Dict]) -> List[Dict]:
+        """Build the chat messages for a transaction summary"""
         # Prepare transaction data for the prompt
         transaction_text = "\n".join([
             f"- {txn['date']}: {txn['description']} - ₹{txn['amount']} ({txn['type']}) [{txn['category']}]"
@@ -36,35 +46,20 @@ Please provide:
 
 Keep the response conversational and helpful."""
 
-        try:
-            # Call Groq API
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful financial assistant that provides clear, concise summaries of financial transactions."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model=self.model,
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            return chat_completion.choices[0].message.content
-        
-        except Exception as e:
-            return f"Error generating summary: {str(e)}"
+        return [
+            {
+                "role": "system",
+                "content": "You are a helpful financial assistant that provides clear, concise summaries of financial transactions."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
     
-    def get_spending_insights(self, transactions: List[Dict]) -> str:
-        """Get spending insights from transactions"""
-        if not transactions:
-            return "No transactions available for insights."
-        
-        # Calculate statistics
+    @staticmethod
+    def compute_spending_stats(transactions: List[Dict]) -> Dict:
+        """Totals and per-category spending for a list of transactions"""
         total_debit = sum(txn['amount'] for txn in transactions if txn['type'] == 'Debit')
         total_credit = sum(txn['amount'] for txn in transactions if txn['type'] == 'Credit')
         
@@ -74,6 +69,19 @@ Keep the response conversational and helpful."""
                 category = txn['category']
                 category_spending[category] = category_spending.get(category, 0) + txn['amount']
         
+        return {
+            "transaction_count": len(transactions),
+            "total_debit": total_debit,
+            "total_credit": total_credit,
+            "category_spending": category_spending
+        }
+    
+    def _build_insights_messages(self, stats: Dict) -> List[Dict]:
+        """Build the chat messages for spending insights"""
+        total_debit = stats["total_debit"]
+        total_credit = stats["total_credit"]
+        category_spending = stats["category_spending"]
+        
         # Create prompt for insights
         prompt = f"""Analyze these financial statistics and provide 3-4 key insights:
 
@@ -86,28 +94,221 @@ Spending by Category:
 
 Provide brief, actionable insights about spending patterns."""
 
-        try:
+        return [
+            {
+                "role": "system",
+                "content": "You are a financial advisor providing spending insights."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    def _cache_key(self, messages: List[Dict], max_tokens: int, data_generation: Optional[str]) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.make_key(
+            self.model, messages, {"temperature": 0.7, "max_tokens": max_tokens}, data_generation
+        )
+    
+    def _complete(self, messages: List[Dict], max_tokens: int, data_generation: Optional[str] = None) -> str:
+        """Run a chat completion, reusing a cached response for an identical prompt"""
+        key = self._cache_key(messages, max_tokens, data_generation)
+        if key is not None:
+            cached = self.cache.get(key)
+            count_cache_lookup("llm", cached is not None)
+            if cached is not None:
+                return cached
+        
+        with timed("llm_completion"):
             chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a financial advisor providing spending insights."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                messages=messages,
                 model=self.model,
                 temperature=0.7,
-                max_tokens=300
+                max_tokens=max_tokens
             )
+        content = chat_completion.choices[0].message.content
+        
+        if key is not None:
+            self.cache.put(key, content)
+        return content
+    
+    async def _acache_get(self, key: str) -> Optional[str]:
+        """Cache lookup that keeps SQLite reads of the disk backend off the event loop"""
+        if self.cache.backend == "disk":
+            return await stage_executor.run("llm_cache", self.cache.get, key)
+        return self.cache.get(key)
+    
+    async def _acache_put(self, key: str, response: str):
+        if self.cache.backend == "disk":
+            await stage_executor.run("llm_cache", self.cache.put, key, response)
+        else:
+            self.cache.put(key, response)
+    
+    async def _acomplete(self, messages: List[Dict], max_tokens: int, data_generation: Optional[str] = None) -> str:
+        """Async variant of _complete using the async Groq client"""
+        key = self._cache_key(messages, max_tokens, data_generation)
+        if key is not None:
+            cached = await self._acache_get(key)
+            count_cache_lookup("llm", cached is not None)
+            if cached is not None:
+                return cached
+        
+        async with stage_executor.limit("llm"):
+            with timed("llm_completion"):
+                chat_completion = await self.async_client.chat.completions.create(
+                    messages=messages,
+                    model=self.model,
+                    temperature=0.7,
+                    max_tokens=max_tokens
+                )
+        content = chat_completion.choices[0].message.content
+        
+        if key is not None:
+            await self._acache_put(key, content)
+        return content
+    
+    def summarize_transactions(self, query: str, transactions: List[Dict],
+                               data_generation: Optional[str] = None) -> str:
+        """Summarize transactions using Groq LLM"""
+        if not transactions:
+            return "No transactions found for your query."
+        
+        try:
+            messages = self._build_summary_messages(query, transactions)
+            return self._complete(messages, max_tokens=500, data_generation=data_generation)
+        
+        except Exception as e:
+            return f"Error generating summary: {str(e)}"
+    
+    async def asummarize_transactions(self, query: str, transactions: List[Dict],
+                                      data_generation: Optional[str] = None) -> str:
+        """Summarize transactions with the async Groq client"""
+        if not transactions:
+            return "No transactions found for your query."
+        
+        try:
+            messages = self._build_summary_messages(query, transactions)
+            return await self._acomplete(messages, max_tokens=500, data_generation=data_generation)
+        
+        except Exception as e:
+            return f"Error generating summary: {str(e)}"
+    
+    def stream_summary(self, query: str, transactions: List[Dict],
+                       data_generation: Optional[str] = None) -> Iterator[str]:
+        """Yield summary text chunks as Groq produces them"""
+        if not transactions:
+            yield "No transactions found for your query."
+            return
+        
+        messages = self._build_summary_messages(query, transactions)
+        key = self._cache_key(messages, 500, data_generation)
+        if key is not None:
+            cached = self.cache.get(key)
+            count_cache_lookup("llm", cached is not None)
+            if cached is not None:
+                yield cached
+                return
+        
+        try:
+            started = time.perf_counter()
+            stream = self.client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True
+            )
+            parts = []
+            for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    if not parts:
+                        record_stage("llm_first_token", time.perf_counter() - started)
+                    parts.append(content)
+                    yield content
+            record_stage("llm_stream", time.perf_counter() - started)
             
-            return chat_completion.choices[0].message.content
+            if key is not None:
+                self.cache.put(key, "".join(parts))
+        
+        except Exception as e:
+            yield f"Error generating summary: {str(e)}"
+    
+    async def astream_summary(self, query: str, transactions: List[Dict],
+                              data_generation: Optional[str] = None) -> AsyncIterator[str]:
+        """Async variant of stream_summary using the async Groq client
+        
+        LLM errors are raised rather than yielded as text (possibly after some
+        tokens), so callers can tell a failure apart from the summary.
+        """
+        if not transactions:
+            yield "No transactions found for your query."
+            return
+        
+        messages = self._build_summary_messages(query, transactions)
+        key = self._cache_key(messages, 500, data_generation)
+        if key is not None:
+            cached = await self._acache_get(key)
+            count_cache_lookup("llm", cached is not None)
+            if cached is not None:
+                yield cached
+                return
+        
+        async with stage_executor.limit("llm"):
+            started = time.perf_counter()
+            stream = await self.async_client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=0.7,
+                max_tokens=500,
+                stream=True
+            )
+            parts = []
+            async for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    if not parts:
+                        record_stage("llm_first_token", time.perf_counter() - started)
+                    parts.append(content)
+                    yield content
+            record_stage("llm_stream", time.perf_counter() - started)
+        
+        if key is not None:
+            await self._acache_put(key, "".join(parts))
+    
+    def get_spending_insights(self, transactions: Optional[List[Dict]] = None,
+                              stats: Optional[Dict] = None,
+                              data_generation: Optional[str] = None) -> str:
+        """Get spending insights from transactions or precomputed statistics"""
+        if stats is None:
+            stats = self.compute_spending_stats(transactions or [])
+        if not stats["transaction_count"]:
+            return "No transactions available for insights."
+        
+        try:
+            messages = self._build_insights_messages(stats)
+            return self._complete(messages, max_tokens=300, data_generation=data_generation)
+        
+        except Exception as e:
+            return f"Error generating insights: {str(e)}"
+    
+    async def aget_spending_insights(self, transactions: Optional[List[Dict]] = None,
+                                     stats: Optional[Dict] = None,
+                                     data_generation: Optional[str] = None) -> str:
+        """Get spending insights with the async Groq client"""
+        if stats is None:
+            stats = self.compute_spending_stats(transactions or [])
+        if not stats["transaction_count"]:
+            return "No transactions available for insights."
+        
+        try:
+            messages = self._build_insights_messages(stats)
+            return await self._acomplete(messages, max_tokens=300, data_generation=data_generation)
         
         except Exception as e:
             return f"Error generating insights: {str(e)}"
-
 
 if __name__ == "__main__":
     service = SummarizerService()
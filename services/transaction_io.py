@@ -0,0 +1,103 @@
+import json
+import os
+import re
+from typing import Dict, Iterator, List
+from config.settings import settings
+
+# Whitespace and separators between elements of a JSON array
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+def _iter_json_array(f, block_size: int) -> Iterator[Dict]:
+    """Decode the objects of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(block_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Expected a JSON array of transactions")
+    pos = 1
+    eof = False
+
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Incomplete", buffer, pos)
+            transaction, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The object straddles the end of the buffer; read more
+            if eof:
+                raise
+            more = f.read(block_size)
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+            continue
+
+        yield transaction
+        pos = end
+
+
+def _iter_json_lines(f) -> Iterator[Dict]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_columnar(path: str) -> Iterator[Dict]:
+    from services.data_generator import COLUMNS, load_columnar
+
+    for chunk in load_columnar(path):
+        columns = [chunk[column].tolist() for column in COLUMNS]
+        for values in zip(*columns):
+            yield dict(zip(COLUMNS, values))
+
+
+def iter_transactions(path: str, block_size: int = 1 << 20, use_sidecar: bool = True) -> Iterator[Dict]:
+    """Stream transactions from a JSON array, a JSONL file or a columnar directory
+
+    The format is detected from the file itself, so memory use does not grow
+    with the size of the file. JSON and JSONL files are read from their
+    columnar sidecar (see services.columnar_sidecar) when use_sidecar is set
+    and DATA_SIDECAR_ENABLED is on.
+    """
+    if os.path.isdir(path):
+        yield from _iter_columnar(path)
+        return
+
+    if use_sidecar and settings.DATA_SIDECAR_ENABLED:
+        from services.columnar_sidecar import open_sidecar
+
+        sidecar = open_sidecar(path)
+        if sidecar is not None:
+            for chunk in sidecar.iter_chunks():
+                yield from chunk
+            return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        if head.startswith('['):
+            yield from _iter_json_array(f, block_size)
+        else:
+            yield from _iter_json_lines(f)
+
+
+def iter_transaction_chunks(path: str, chunk_size: int = 1000, use_sidecar: bool = True) -> Iterator[List[Dict]]:
+    """Stream transactions in lists of at most chunk_size"""
+    chunk = []
+    for transaction in iter_transactions(path, use_sidecar=use_sidecar):
+        chunk.append(transaction)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def load_transactions(path: str) -> List[Dict]:
+    """Load every transaction from a file in any supported format"""
+    return list(iter_transactions(path))
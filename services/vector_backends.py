@@ -0,0 +1,901 @@
+import heapq
+import json
+import os
+import re
+import shutil
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from config.settings import settings
+from services.analytics_store import AnalyticsStore
+
+
+class VectorBackend(ABC):
+    """Storage behind VectorSearchService
+
+    A backend manages named collections. Collections follow the subset of
+    the Chroma collection API the service uses: get, query, upsert, delete,
+    modify and the metadata attribute, with Chroma's where / where_document
+    filter syntax.
+    """
+
+    @abstractmethod
+    def get_collection(self, name: str):
+        """Open an existing collection; raises if it does not exist"""
+
+    @abstractmethod
+    def create_collection(self, name: str, metadata: Optional[Dict] = None):
+        """Create a new, empty collection"""
+
+    @abstractmethod
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None):
+        """Open a collection, creating it if it does not exist"""
+
+    @abstractmethod
+    def delete_collection(self, name: str):
+        """Drop a collection and its stored data"""
+
+    def optimize(self, collection):
+        """Reorganize a collection after a bulk write; a no-op unless the backend needs it"""
+
+    def close_collection(self, name: str):
+        """Release what an open collection holds in memory; a no-op unless the backend caches it"""
+
+
+class ChromaBackend(VectorBackend):
+    """Persistent Chroma client (HNSW index plus SQLite metadata)"""
+
+    def __init__(self, path: Optional[str] = None):
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        self.path = path or settings.CHROMA_DB_PATH
+        os.makedirs(self.path, exist_ok=True)
+        self.client = chromadb.PersistentClient(
+            path=self.path,
+            settings=ChromaSettings(
+                anonymized_telemetry=False
+            )
+        )
+
+    def get_collection(self, name: str):
+        return self.client.get_collection(name=name)
+
+    def create_collection(self, name: str, metadata: Optional[Dict] = None):
+        return self.client.create_collection(name=name, metadata=metadata)
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None):
+        return self.client.get_or_create_collection(name=name, metadata=metadata)
+
+    def delete_collection(self, name: str):
+        self.client.delete_collection(name=name)
+
+
+# Catalog metadata key recording how many user-hash partitions a collection has
+PARTITIONS_KEY = "partitions"
+PARTITION_COUNTS_KEY = "partition_counts"  # JSON {bucket: rows}, kept in the catalog metadata
+
+EQUALITY_OPERATORS = {"$eq", "$ne", "$in", "$nin"}
+RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte"}
+
+
+def pinned_user(where: Optional[Dict]) -> Optional[str]:
+    """The userId an equality filter pins a query to, if any"""
+    if not where:
+        return None
+    clauses = where["$and"] if "$and" in where else [where]
+    for clause in clauses:
+        value = clause.get("userId")
+        if isinstance(value, dict):
+            value = value.get("$eq")
+        if isinstance(value, str):
+            return value
+    return None
+
+
+def partition_of(user_id: Optional[str], partitions: int) -> int:
+    """Stable user-hash bucket (crc32, so every process agrees)"""
+    return zlib.crc32(str(user_id).encode('utf-8')) % partitions
+
+
+class NumpyCollection:
+    """Exact cosine search over a memory-mapped matrix of normalized embeddings
+
+    The main segment (main.f32) is sorted by user, and index.json records the
+    row range of each user, so a user-filtered query scans only that user's
+    rows. Writes are appended to a tail segment (tail.f32 plus log.jsonl) that
+    every query also scans; once the tail grows past a fraction of the main
+    segment, both are compacted into a new sorted main segment. A collection
+    reloads itself when another process has rewritten its files.
+    """
+
+    def __init__(self, path: str, name: str, metadata: Optional[Dict] = None, create: bool = False):
+        self.path = path
+        self.name = name
+        self._metadata = metadata
+        self.block_size = 65536
+        self.compact_min_rows = 10000
+        self.compact_ratio = 0.2
+        self._lock = threading.RLock()
+        self.signature = None
+
+        if create:
+            os.makedirs(path, exist_ok=True)
+            self.dim = None
+            self._reset_rows()
+            self._write_main([], None)
+            self.signature = self._signature()
+        else:
+            self._load()
+
+    def _reset_rows(self):
+        self.ids: List[str] = []
+        self.documents: List[Optional[str]] = []
+        self.metadatas: List[Optional[Dict]] = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.id_to_row: Dict[str, int] = {}
+        self.main_count = 0
+        self.user_ranges: Dict[str, List[int]] = {}
+        self.main_vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self.tail_vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self.tail_count = 0
+        self._columns = {}
+        self._get_cache = None
+
+    # -- persistence ---------------------------------------------------------
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _signature(self):
+        return (
+            AnalyticsStore.file_signature(self._file("index.json")),
+            AnalyticsStore.file_signature(self._file("log.jsonl"))
+        )
+
+    def refresh(self) -> bool:
+        """Reload if another process rewrote the collection files"""
+        signature = self._signature()
+        if signature[0] is None or signature == self.signature:
+            return False
+        self._load()
+        return True
+
+    def _load(self):
+        signature = self._signature()
+        with open(self._file("index.json"), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.dim = index["dim"]
+        self._metadata = index.get("metadata")
+        self._reset_rows()
+
+        with open(self._file("main.jsonl"), 'r', encoding='utf-8') as f:
+            for row, line in enumerate(f):
+                txn_id, document, metadata = json.loads(line)
+                self._append_row(txn_id, document, metadata)
+        self.main_count = len(self.ids)
+        self.user_ranges = index["user_ranges"]
+        if self.main_count:
+            self.main_vectors = np.memmap(
+                self._file("main.f32"), dtype=np.float32, mode='r', shape=(self.main_count, self.dim)
+            )
+
+        # Replay writes made since the last compaction
+        if os.path.exists(self._file("log.jsonl")):
+            tail = np.zeros((0, self.dim or 0), dtype=np.float32)
+            if self.dim and os.path.exists(self._file("tail.f32")):
+                tail = np.fromfile(self._file("tail.f32"), dtype=np.float32).reshape(-1, self.dim)
+            vectors = []
+            with open(self._file("log.jsonl"), 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry["op"] == "put":
+                        vectors.append(tail[len(vectors)])
+                        self._append_row(entry["id"], entry["document"], entry["metadata"])
+                    else:
+                        self._kill(entry["id"])
+            self.tail_count = len(vectors)
+            self.tail_vectors = np.array(vectors, dtype=np.float32).reshape(-1, self.dim or 0)
+        self.signature = signature
+
+    def _write_main(self, order: Sequence[int], vectors: Optional[np.ndarray]):
+        """Atomically write the given rows as the new main segment and clear the tail"""
+        user_ranges = {}
+        with open(self._file("main.jsonl.tmp"), 'w', encoding='utf-8') as f:
+            for position, row in enumerate(order):
+                metadata = self.metadatas[row] or {}
+                f.write(json.dumps([self.ids[row], self.documents[row], metadata], ensure_ascii=False) + "\n")
+                user = str(metadata.get("userId"))
+                user_ranges.setdefault(user, [position, position])[1] = position + 1
+        if vectors is not None and len(vectors):
+            vectors.astype(np.float32).tofile(self._file("main.f32.tmp"))
+        else:
+            open(self._file("main.f32.tmp"), 'wb').close()
+
+        os.replace(self._file("main.f32.tmp"), self._file("main.f32"))
+        os.replace(self._file("main.jsonl.tmp"), self._file("main.jsonl"))
+        for name in ("log.jsonl", "tail.f32"):
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))
+        self.main_count = len(order)
+        self.user_ranges = user_ranges
+        self._write_index()
+
+    def _write_index(self):
+        tmp_path = self._file("index.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dim": self.dim,
+                "count": self.main_count,
+                "user_ranges": self.user_ranges,
+                "metadata": self._metadata
+            }, f)
+        os.replace(tmp_path, self._file("index.json"))
+
+    def compact(self):
+        """Merge the tail into a new main segment sorted by user"""
+        with self._lock:
+            rows = np.flatnonzero(self.alive)
+            users = [str((self.metadatas[row] or {}).get("userId")) for row in rows]
+            order = rows[np.argsort(np.array(users, dtype=object), kind='stable')] if len(rows) else rows
+            vectors = self._vectors(order) if len(order) else None
+
+            ids = [self.ids[row] for row in order]
+            documents = [self.documents[row] for row in order]
+            metadatas = [self.metadatas[row] for row in order]
+
+            self.main_vectors = np.zeros((0, self.dim or 0), dtype=np.float32)  # release the old mapping
+            self._write_main(order, vectors)
+
+            user_ranges = self.user_ranges
+            self._reset_rows()
+            for txn_id, document, metadata in zip(ids, documents, metadatas):
+                self._append_row(txn_id, document, metadata)
+            self.main_count = len(ids)
+            self.user_ranges = user_ranges
+            if self.main_count:
+                self.main_vectors = np.memmap(
+                    self._file("main.f32"), dtype=np.float32, mode='r', shape=(self.main_count, self.dim)
+                )
+            self.signature = self._signature()
+
+    # -- row bookkeeping -----------------------------------------------------
+
+    def _append_row(self, txn_id: str, document: Optional[str], metadata: Optional[Dict]):
+        self._kill(txn_id)
+        self.id_to_row[txn_id] = len(self.ids)
+        self.ids.append(txn_id)
+        self.documents.append(document)
+        self.metadatas.append(metadata)
+        if len(self.alive) < len(self.ids):
+            grown = np.zeros(max(16, 2 * len(self.alive)), dtype=bool)
+            grown[:len(self.alive)] = self.alive
+            self.alive = grown
+        self.alive[len(self.ids) - 1] = True
+        self._columns = {}
+        self._get_cache = None
+
+    def _kill(self, txn_id: str):
+        row = self.id_to_row.pop(txn_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self._get_cache = None
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows)
+        if len(rows) and rows[-1] < self.main_count and rows[-1] - rows[0] == len(rows) - 1:
+            return self.main_vectors[rows[0]:rows[-1] + 1]  # contiguous range: a view, no copy
+        in_main = rows < self.main_count
+        if in_main.all():
+            return np.asarray(self.main_vectors[rows])
+        result = np.empty((len(rows), self.dim), dtype=np.float32)
+        result[in_main] = self.main_vectors[rows[in_main]]
+        result[~in_main] = self.tail_vectors[rows[~in_main] - self.main_count]
+        return result
+
+    # -- filtering -----------------------------------------------------------
+
+    def _column(self, key: str, numeric: bool = False) -> np.ndarray:
+        """A metadata field for every row, built on first use; numeric columns hold NaN for non-numbers"""
+        column = self._columns.get((key, numeric))
+        if column is None:
+            values = [(metadata or {}).get(key) for metadata in self.metadatas]
+            if numeric:
+                column = np.array(
+                    [v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in values],
+                    dtype=np.float64
+                )
+            else:
+                column = np.empty(len(values), dtype=object)
+                column[:] = values
+            self._columns[(key, numeric)] = column
+        return column
+
+    def _where_mask(self, where: Dict, rows: np.ndarray) -> np.ndarray:
+        if "$and" in where:
+            mask = np.ones(len(rows), dtype=bool)
+            for clause in where["$and"]:
+                mask &= self._where_mask(clause, rows)
+            return mask
+        if "$or" in where:
+            mask = np.zeros(len(rows), dtype=bool)
+            for clause in where["$or"]:
+                mask |= self._where_mask(clause, rows)
+            return mask
+
+        mask = np.ones(len(rows), dtype=bool)
+        for key, condition in where.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for operator, value in condition.items():
+                if operator in RANGE_OPERATORS:
+                    column = self._column(key, numeric=True)[rows]
+                    with np.errstate(invalid='ignore'):
+                        if operator == "$gt":
+                            mask &= column > value
+                        elif operator == "$gte":
+                            mask &= column >= value
+                        elif operator == "$lt":
+                            mask &= column < value
+                        else:
+                            mask &= column <= value
+                elif operator in EQUALITY_OPERATORS:
+                    column = self._column(key)[rows]
+                    if operator == "$eq":
+                        mask &= column == value
+                    elif operator == "$ne":
+                        mask &= column != value
+                    else:
+                        found = np.isin(column, list(value))
+                        mask &= found if operator == "$in" else ~found
+                else:
+                    raise ValueError(f"Unsupported where operator '{operator}'")
+        return mask
+
+    def _document_mask(self, where_document: Dict, rows: np.ndarray) -> np.ndarray:
+        if "$and" in where_document:
+            mask = np.ones(len(rows), dtype=bool)
+            for clause in where_document["$and"]:
+                mask &= self._document_mask(clause, rows)
+            return mask
+        if "$or" in where_document:
+            mask = np.zeros(len(rows), dtype=bool)
+            for clause in where_document["$or"]:
+                mask |= self._document_mask(clause, rows)
+            return mask
+        if "$contains" in where_document:
+            term = where_document["$contains"]
+            return np.fromiter((term in (self.documents[r] or "") for r in rows), dtype=bool, count=len(rows))
+        if "$not_contains" in where_document:
+            term = where_document["$not_contains"]
+            return np.fromiter((term not in (self.documents[r] or "") for r in rows), dtype=bool, count=len(rows))
+        raise ValueError(f"Unsupported where_document filter {where_document}")
+
+    def _candidate_rows(self, where: Optional[Dict], where_document: Optional[Dict]) -> np.ndarray:
+        """Live rows matching the filters, scanning only the user's range when pinned to one"""
+        user = pinned_user(where)
+        if user is not None:
+            start, end = self.user_ranges.get(user, (0, 0))
+            main_rows = np.arange(start, end)
+        else:
+            main_rows = np.arange(self.main_count)
+        rows = np.concatenate([main_rows, np.arange(self.main_count, len(self.ids))]).astype(np.int64)
+        rows = rows[self.alive[rows]]
+
+        if where and len(rows):
+            rows = rows[self._where_mask(where, rows)]
+        if where_document and len(rows):
+            rows = rows[self._document_mask(where_document, rows)]
+        return rows
+
+    # -- Chroma-compatible API -----------------------------------------------
+
+    @property
+    def metadata(self) -> Optional[Dict]:
+        with self._lock:
+            self.refresh()
+            return self._metadata
+
+    def count(self) -> int:
+        return len(self.id_to_row)
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict]] = None):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids):
+            raise ValueError("embeddings must be a matrix with one row per id")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self.refresh()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self.main_vectors = np.zeros((0, self.dim), dtype=np.float32)
+                self.tail_vectors = np.zeros((0, self.dim), dtype=np.float32)
+                self._write_index()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+
+            documents = documents or [None] * len(ids)
+            metadatas = metadatas or [None] * len(ids)
+            with open(self._file("tail.f32"), 'ab') as f:
+                vectors.tofile(f)
+            with open(self._file("log.jsonl"), 'a', encoding='utf-8') as f:
+                for txn_id, document, metadata in zip(ids, documents, metadatas):
+                    f.write(json.dumps({"op": "put", "id": txn_id, "document": document, "metadata": metadata},
+                                       ensure_ascii=False) + "\n")
+
+            # Grow the in-memory tail geometrically
+            needed = self.tail_count + len(vectors)
+            if needed > len(self.tail_vectors):
+                grown = np.empty((max(needed, 2 * len(self.tail_vectors), 1024), self.dim), dtype=np.float32)
+                grown[:self.tail_count] = self.tail_vectors[:self.tail_count]
+                self.tail_vectors = grown
+            self.tail_vectors[self.tail_count:needed] = vectors
+            self.tail_count = needed
+
+            for txn_id, document, metadata in zip(ids, documents, metadatas):
+                self._append_row(txn_id, document, metadata)
+
+            self.signature = self._signature()
+            if self.tail_count > max(self.compact_min_rows, self.compact_ratio * self.main_count):
+                self.compact()
+
+    def add(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict]] = None):
+        self.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        with self._lock:
+            self.refresh()
+            if ids is None:
+                ids = [self.ids[row] for row in self._candidate_rows(where, None)]
+            with open(self._file("log.jsonl"), 'a', encoding='utf-8') as f:
+                for txn_id in ids:
+                    f.write(json.dumps({"op": "del", "id": txn_id}) + "\n")
+            for txn_id in ids:
+                self._kill(txn_id)
+            self.signature = self._signature()
+
+    def modify(self, name: Optional[str] = None, metadata: Optional[Dict] = None):
+        with self._lock:
+            self.refresh()
+            if metadata is not None:
+                self._metadata = metadata
+                self._write_index()
+            self.signature = self._signature()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            where_document: Optional[Dict] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None) -> Dict:
+        with self._lock:
+            self.refresh()
+            if ids is not None:
+                rows = np.array([self.id_to_row[i] for i in ids if i in self.id_to_row], dtype=np.int64)
+                if len(rows) and where:
+                    rows = rows[self._where_mask(where, rows)]
+                if len(rows) and where_document:
+                    rows = rows[self._document_mask(where_document, rows)]
+            else:
+                # Paging callers repeat the same filter with growing offsets
+                key = json.dumps([where, where_document], sort_keys=True)
+                if self._get_cache is not None and self._get_cache[0] == key:
+                    rows = self._get_cache[1]
+                else:
+                    rows = self._candidate_rows(where, where_document)
+                    self._get_cache = (key, rows)
+
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return {
+                "ids": [self.ids[row] for row in rows],
+                "metadatas": [self.metadatas[row] for row in rows],
+                "documents": [self.documents[row] for row in rows]
+            }
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              where_document: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict:
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self.refresh()
+            rows = self._candidate_rows(where, where_document)
+            k = min(n_results, len(rows))
+            best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+            best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+            # Score in blocks and keep a running top-k, so memory stays bounded
+            for start in range(0, len(rows), self.block_size):
+                block = rows[start:start + self.block_size]
+                scores = queries @ self._vectors(block).T
+                scores = np.concatenate([best_scores, scores], axis=1)
+                candidates = np.concatenate([best_rows, np.broadcast_to(block, (len(queries), len(block)))], axis=1)
+                if scores.shape[1] > k:
+                    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                    scores = np.take_along_axis(scores, top, axis=1)
+                    candidates = np.take_along_axis(candidates, top, axis=1)
+                best_scores, best_rows = scores, candidates
+
+            order = np.argsort(-best_scores, axis=1, kind='stable')
+            best_scores = np.take_along_axis(best_scores, order, axis=1)
+            best_rows = np.take_along_axis(best_rows, order, axis=1)
+
+            return {
+                "ids": [[self.ids[row] for row in q] for q in best_rows],
+                "metadatas": [[self.metadatas[row] for row in q] for q in best_rows],
+                "documents": [[self.documents[row] for row in q] for q in best_rows],
+                # Squared L2 between unit vectors, matching Chroma's default space
+                "distances": [(2 - 2 * q).tolist() for q in best_scores]
+            }
+
+
+class NumpyBackend(VectorBackend):
+    """Collections stored as memory-mapped NumPy matrices, one directory each"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.NUMPY_INDEX_PATH
+        os.makedirs(self.path, exist_ok=True)
+        self._collections: Dict[str, NumpyCollection] = {}
+        self._lock = threading.Lock()
+
+    def _collection_path(self, name: str) -> str:
+        return os.path.join(self.path, re.sub(r"[^A-Za-z0-9_.-]+", "_", name))
+
+    def get_collection(self, name: str) -> NumpyCollection:
+        with self._lock:
+            path = self._collection_path(name)
+            if not os.path.exists(os.path.join(path, "index.json")):
+                raise ValueError(f"Collection {name} does not exist.")
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = self._collections[name] = NumpyCollection(path, name)
+            return collection
+
+    def create_collection(self, name: str, metadata: Optional[Dict] = None) -> NumpyCollection:
+        with self._lock:
+            path = self._collection_path(name)
+            if os.path.exists(os.path.join(path, "index.json")):
+                raise ValueError(f"Collection {name} already exists.")
+            collection = self._collections[name] = NumpyCollection(path, name, metadata, create=True)
+            return collection
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None) -> NumpyCollection:
+        try:
+            return self.get_collection(name)
+        except ValueError:
+            return self.create_collection(name, metadata)
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            path = self._collection_path(name)
+            if not os.path.exists(path):
+                raise ValueError(f"Collection {name} does not exist.")
+            self._collections.pop(name, None)
+            shutil.rmtree(path)
+
+    def close_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def optimize(self, collection: NumpyCollection):
+        if collection.tail_count or collection.count() != collection.main_count:
+            collection.compact()
+
+
+class PartitionedCollection:
+    """One logical collection spread over user-hash partitions
+
+    Every user's rows live in a single partition, so a user-scoped query or
+    page only touches that partition. Queries without a user fan out to every
+    partition and merge by distance. Collection metadata, including the row
+    count of each partition, lives on a catalog collection under the logical
+    name; partitions are named <name>__pNNN.
+    """
+
+    def __init__(self, backend: "PartitionedBackend", name: str, catalog, partitions: int):
+        self.backend = backend
+        self.name = name
+        self.catalog = catalog
+        self.partitions = partitions
+        self.dirty = set()
+        self._counts = None
+
+    def partition_name(self, bucket: int) -> str:
+        return f"{self.name}__p{bucket:03d}"
+
+    def _partition(self, bucket: int, create: bool = False):
+        return self.backend.open_partition(self.partition_name(bucket), create)
+
+    def _partitions(self, buckets: List[int]):
+        """(bucket, partition) for each existing partition of the given buckets
+
+        A single bucket goes through the LRU. A fan-out visits every partition
+        in order, which would miss on every access of an LRU smaller than the
+        partition count, so it uses the partitions already open as they are
+        and opens the others only for the duration of the visit.
+        """
+        if len(buckets) == 1:
+            partition = self._partition(buckets[0])
+            if partition is not None:
+                yield buckets[0], partition
+            return
+        for bucket in buckets:
+            name = self.partition_name(bucket)
+            partition, transient = self.backend.borrow_partition(name)
+            if partition is None:
+                continue
+            try:
+                yield bucket, partition
+            finally:
+                if transient:
+                    self.backend.release_partition(name)
+
+    def _stored_counts(self) -> Optional[Dict[int, int]]:
+        raw = (self.catalog.metadata or {}).get(PARTITION_COUNTS_KEY)
+        return {int(bucket): count for bucket, count in json.loads(raw).items()} if raw else None
+
+    def _record_counts(self, counts: Dict[int, int]):
+        """Save the row counts of the partitions just written"""
+        if not counts:
+            return
+        stored = self._stored_counts() or {}
+        stored.update(counts)
+        self.catalog.modify(metadata={
+            **(self.catalog.metadata or {}),
+            PARTITION_COUNTS_KEY: json.dumps({str(bucket): count for bucket, count in sorted(stored.items())})
+        })
+
+    def _buckets(self, where: Optional[Dict]) -> List[int]:
+        user = pinned_user(where)
+        if user is not None:
+            return [partition_of(user, self.partitions)]
+        return list(range(self.partitions))
+
+    @property
+    def metadata(self) -> Optional[Dict]:
+        return self.catalog.metadata
+
+    def modify(self, name: Optional[str] = None, metadata: Optional[Dict] = None):
+        if metadata is not None:
+            metadata = {**metadata, PARTITIONS_KEY: self.partitions}
+            counts = (self.catalog.metadata or {}).get(PARTITION_COUNTS_KEY)
+            if counts is not None:
+                metadata[PARTITION_COUNTS_KEY] = counts
+            self.catalog.modify(metadata=metadata)
+
+    def count(self) -> int:
+        counts = self._stored_counts()
+        if counts is not None:
+            return sum(counts.values())
+        # Collections written before counts were recorded
+        return sum(partition.count() for _, partition in self._partitions(list(range(self.partitions))))
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict]] = None):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        groups: Dict[int, List[int]] = {}
+        for i, metadata in enumerate(metadatas or [None] * len(ids)):
+            groups.setdefault(partition_of((metadata or {}).get("userId"), self.partitions), []).append(i)
+
+        counts = {}
+        for bucket, rows in groups.items():
+            partition = self._partition(bucket, create=True)
+            partition.upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=vectors[rows],
+                documents=[documents[i] for i in rows] if documents else None,
+                metadatas=[metadatas[i] for i in rows] if metadatas else None
+            )
+            counts[bucket] = partition.count()
+            self.dirty.add(bucket)
+        self._record_counts(counts)
+        self._counts = None
+
+    def add(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict]] = None):
+        self.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        # Ids alone do not say which partition holds them, so ask every one
+        counts = {}
+        for bucket, partition in self._partitions(self._buckets(where)):
+            partition.delete(ids=ids, where=where)
+            counts[bucket] = partition.count()
+            self.dirty.add(bucket)
+        self._record_counts(counts)
+        self._counts = None
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            where_document: Optional[Dict] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None) -> Dict:
+        kwargs = {"where": where, "where_document": where_document}
+        if include is not None:
+            kwargs["include"] = include
+        result = {"ids": [], "metadatas": [], "documents": []}
+
+        buckets = self._buckets(where)
+        if ids is not None or len(buckets) == 1:
+            for _, partition in self._partitions(buckets):
+                page = partition.get(ids=ids, limit=limit, offset=offset, **kwargs)
+                for key in result:
+                    result[key].extend(page.get(key) or [])
+            return result
+
+        # Page across partitions in order; match counts per partition locate
+        # the page start and are cached while the same filter is paged through
+        cache_key = json.dumps([where, where_document], sort_keys=True)
+        if self._counts is None or self._counts[0] != cache_key:
+            self._counts = (cache_key, {})
+        counts = self._counts[1]
+
+        skip = offset or 0
+        remaining = limit
+        for bucket, partition in self._partitions(buckets):
+            if remaining is not None and remaining <= 0:
+                break
+            if skip:
+                if bucket not in counts:
+                    counts[bucket] = len(partition.get(where=where, where_document=where_document, include=[])["ids"])
+                if skip >= counts[bucket]:
+                    skip -= counts[bucket]
+                    continue
+            page = partition.get(limit=remaining, offset=skip, **kwargs)
+            skip = 0
+            for key in result:
+                result[key].extend(page.get(key) or [])
+            if remaining is not None:
+                remaining -= len(page["ids"])
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              where_document: Optional[Dict] = None, include: Optional[List[str]] = None) -> Dict:
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        hits = [[] for _ in queries]
+        for _, partition in self._partitions(self._buckets(where)):
+            result = partition.query(query_embeddings=queries, n_results=n_results,
+                                     where=where, where_document=where_document)
+            for q, found in enumerate(hits):
+                documents = (result.get("documents") or [None] * len(queries))[q] or [None] * len(result["ids"][q])
+                found.extend(zip(result["distances"][q], result["ids"][q], result["metadatas"][q], documents))
+
+        merged = [heapq.nsmallest(n_results, found, key=lambda hit: hit[0]) for found in hits]
+        return {
+            "ids": [[hit[1] for hit in found] for found in merged],
+            "metadatas": [[hit[2] for hit in found] for found in merged],
+            "documents": [[hit[3] for hit in found] for found in merged],
+            "distances": [[hit[0] for hit in found] for found in merged]
+        }
+
+
+class PartitionedBackend(VectorBackend):
+    """Wraps a backend so new collections are split into user-hash partitions
+
+    The partition count of a collection is recorded in its catalog metadata
+    when it is created, so reads follow what is on disk: collections built
+    without partitions are returned as plain collections, and changing
+    VECTOR_PARTITIONS takes effect at the next full rebuild. Partitions
+    opened for a single user are kept in an LRU of max_open entries; evicted
+    ones are closed and reopened on demand. Fan-outs over every partition
+    borrow them without changing the LRU.
+    """
+
+    def __init__(self, inner: VectorBackend, partitions: int, max_open: int):
+        self.inner = inner
+        self.partitions = partitions
+        self.max_open = max(1, max_open)
+        self._open: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open_partition(self, name: str, create: bool = False):
+        """A partition collection from the LRU, opening it if needed; None if it does not exist"""
+        with self._lock:
+            collection = self._open.get(name)
+            if collection is not None:
+                self._open.move_to_end(name)
+                return collection
+
+        if create:
+            collection = self.inner.get_or_create_collection(name)
+        else:
+            try:
+                collection = self.inner.get_collection(name)
+            except Exception:
+                return None
+
+        with self._lock:
+            self._open[name] = collection
+            self._open.move_to_end(name)
+            while len(self._open) > self.max_open:
+                evicted, _ = self._open.popitem(last=False)
+                self.inner.close_collection(evicted)
+        return collection
+
+    def borrow_partition(self, name: str):
+        """(partition, transient) without touching the LRU; None if it does not exist
+
+        An open partition is returned as is. Otherwise it is opened outside the
+        LRU (transient=True) and must be handed back with release_partition.
+        """
+        with self._lock:
+            collection = self._open.get(name)
+        if collection is not None:
+            return collection, False
+        try:
+            return self.inner.get_collection(name), True
+        except Exception:
+            return None, False
+
+    def release_partition(self, name: str):
+        """Close a transiently borrowed partition unless the LRU has since opened it"""
+        with self._lock:
+            if name in self._open:
+                return
+            self.inner.close_collection(name)
+
+    def close_collection(self, name: str):
+        with self._lock:
+            self._open.pop(name, None)
+        self.inner.close_collection(name)
+
+    def _wrap(self, name: str, catalog):
+        partitions = int((catalog.metadata or {}).get(PARTITIONS_KEY, 0))
+        if not partitions:
+            return catalog
+        return PartitionedCollection(self, name, catalog, partitions)
+
+    def get_collection(self, name: str):
+        return self._wrap(name, self.inner.get_collection(name))
+
+    def create_collection(self, name: str, metadata: Optional[Dict] = None):
+        if self.partitions:
+            metadata = {**(metadata or {}), PARTITIONS_KEY: self.partitions}
+        return self._wrap(name, self.inner.create_collection(name, metadata))
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict] = None):
+        try:
+            return self.get_collection(name)
+        except Exception:
+            return self.create_collection(name, metadata)
+
+    def delete_collection(self, name: str):
+        try:
+            partitions = int((self.inner.get_collection(name).metadata or {}).get(PARTITIONS_KEY, 0))
+        except Exception:
+            partitions = self.partitions  # catalog already gone; clear any partitions left behind
+        for bucket in range(partitions):
+            partition_name = f"{name}__p{bucket:03d}"
+            self.close_collection(partition_name)
+            try:
+                self.inner.delete_collection(partition_name)
+            except Exception:
+                pass
+        self.close_collection(name)
+        self.inner.delete_collection(name)
+
+    def optimize(self, collection):
+        if not isinstance(collection, PartitionedCollection):
+            self.inner.optimize(collection)
+            return
+        for _, partition in collection._partitions(sorted(collection.dirty)):
+            self.inner.optimize(partition)
+        collection.dirty.clear()
+
+
+def create_vector_backend(name: Optional[str] = None, path: Optional[str] = None,
+                          partitions: Optional[int] = None) -> VectorBackend:
+    """Backend selected by VECTOR_BACKEND ("chroma" or "numpy"), partitioned per VECTOR_PARTITIONS"""
+    name = name or settings.VECTOR_BACKEND
+    if name == "chroma":
+        inner = ChromaBackend(path)
+    elif name == "numpy":
+        inner = NumpyBackend(path)
+    else:
+        raise ValueError(f"Unknown vector backend '{name}'; expected 'chroma' or 'numpy'")
+    partitions = settings.VECTOR_PARTITIONS if partitions is None else partitions
+    return PartitionedBackend(inner, partitions, settings.VECTOR_OPEN_PARTITIONS)
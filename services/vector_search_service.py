@@ -1,26 +1,79 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from dataclasses import dataclass
+from datetime import date
+import asyncio
+import hashlib
+import heapq
 import json
+import numpy as np
 from services.embedding_service import EmbeddingService
+from services.query_cache import LRUCache, GenerationCounter, UserGenerations
+from services.concurrency import stage_executor
+from services.embedding_batcher import QueryEmbeddingBatcher
+from services.analytics_store import get_analytics_store, record_ingested_source
+from services.answer_engine import AnswerEngine
+from services.rollup_store import get_rollup_store
+from services.ingest_pipeline import IngestPipeline
+from services.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from services.vector_backends import create_vector_backend
+from services.metrics import timed, count_cache_lookup
+from services.query_parser import QueryParser, ParsedQuery, AMOUNT_KEY, DATE_KEY, date_to_ordinal, parse_date
 from config.settings import settings
 import os
 
+# Metadata keys used for bookkeeping that are not part of a transaction
+TEXT_HASH_KEY = "text_hash"
+SCHEMA_KEY = "schema_version"
+INTERNAL_METADATA_KEYS = {TEXT_HASH_KEY, SCHEMA_KEY, AMOUNT_KEY, DATE_KEY}
+
+# Bump when the stored metadata layout changes so sync rewrites old rows
+METADATA_SCHEMA_VERSION = 2
+
+@dataclass
+class BatchQuery:
+    """One query of a batch search
+    
+    filters may hold category, txn_type, amount_min, amount_max, date_from and
+    date_to; each one given replaces the constraint parsed from the query text.
+    """
+    query: str
+    user_id: Optional[str] = None
+    n_results: int = 10
+    filters: Optional[Dict] = None
+
+@dataclass
+class _PlannedQuery:
+    item: BatchQuery
+    parsed: Optional[ParsedQuery] = None
+    route: Optional[str] = None  # "metadata", "lexical" or "vector"
+    terms: Optional[List[str]] = None
+    embedding: Optional[List[float]] = None
+    results: Optional[List[Dict]] = None
+    cached: bool = False
+
 class VectorSearchService:
     def __init__(self):
         self.embedding_service = EmbeddingService()
         
-        # Initialize ChromaDB
+        # Initialize the vector store (Chroma or the exact NumPy index)
         os.makedirs(settings.CHROMA_DB_PATH, exist_ok=True)
         
-        self.client = chromadb.PersistentClient(
-            path=settings.CHROMA_DB_PATH,
-            settings=ChromaSettings(
-                anonymized_telemetry=False
-            )
-        )
+        self.client = create_vector_backend()
         
         self.collection_name = "financial_transactions"
+        self.batch_size = 100
+        
+        # Query caches; cached results are tagged with the collection generation
+        self.generation = GenerationCounter(os.path.join(settings.CHROMA_DB_PATH, "generation"))
+        self.user_generations = UserGenerations(os.path.join(settings.CHROMA_DB_PATH, "user_generations.json"))
+        self.query_embedding_cache = LRUCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+        self.result_cache = LRUCache(settings.RESULT_CACHE_SIZE) if settings.RESULT_CACHE_ENABLED else None
+        
+        # Turns amount, date, category, merchant and top-N phrases into filters
+        self.query_parser = QueryParser()
+        
+        # Coalesces concurrent async query encodes into batched model calls
+        self.query_batcher = QueryEmbeddingBatcher(self.embedding_service) if settings.QUERY_BATCHING_ENABLED else None
         
         try:
             self.collection = self.client.get_collection(name=self.collection_name)
@@ -29,91 +82,675 @@ class VectorSearchService:
             self.collection = None
             print(f"⚠️ Collection not found. Please initialize the database first.")
     
-    def initialize_database(self, transactions_file: str):
-        """Initialize ChromaDB with transactions"""
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Content hash of a transaction text, used to detect changed rows"""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def _prepare_metadata(self, transaction: Dict, text_hash: str) -> Dict:
+        """Attach internal bookkeeping fields to a transaction before storing it"""
+        metadata = dict(transaction)
+        metadata[TEXT_HASH_KEY] = text_hash
+        metadata[SCHEMA_KEY] = METADATA_SCHEMA_VERSION
+        # Numeric copies so amount and date ranges can be filtered in Chroma
+        metadata[AMOUNT_KEY] = float(transaction['amount'])
+        metadata[DATE_KEY] = date_to_ordinal(parse_date(transaction['date']))
+        return metadata
+    
+    def _format_metadata(self, metadata: Dict) -> Dict:
+        """Strip internal bookkeeping fields from a stored metadata dict"""
+        return {k: v for k, v in metadata.items() if k not in INTERNAL_METADATA_KEYS}
+    
+    def _collection_metadata(self, latest_date: Optional[str] = None) -> Dict:
+        """Collection-level metadata, including the latest transaction date"""
+        metadata = {"description": "Financial transaction embeddings"}
+        if latest_date:
+            metadata["latest_date"] = latest_date
+        return metadata
+    
+    def _get_stored_hashes(self, page_size: int = 1000) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+        """Fetch id -> (text hash, schema version) for every row already in the collection"""
+        stored = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = page['ids'] if page else []
+            if not ids:
+                break
+            for txn_id, metadata in zip(ids, page['metadatas']):
+                metadata = metadata or {}
+                stored[txn_id] = (metadata.get(TEXT_HASH_KEY), metadata.get(SCHEMA_KEY))
+            offset += len(ids)
+        return stored
+    
+    def _get_stored_transactions(self, ids: List[str]) -> List[Dict]:
+        """Fetch the currently stored version of the given rows"""
+        transactions = []
+        for i in range(0, len(ids), self.batch_size):
+            page = self.collection.get(ids=ids[i:i + self.batch_size], include=["metadatas"])
+            if page and page['metadatas']:
+                transactions.extend(self._format_metadata(m) for m in page['metadatas'])
+        return transactions
+    
+    def _upsert_rows(self, ids: List[str], texts: List[str], metadatas: List[Dict]):
+        """Embed and upsert rows into the collection in batches"""
+        if not ids:
+            return
+        
+        print(f"Generating embeddings for {len(ids)} transactions...")
+        embeddings = self.embedding_service.generate_embeddings_batch(texts)
+        
+        total_batches = (len(ids) - 1) // self.batch_size + 1
+        for i in range(0, len(ids), self.batch_size):
+            batch_end = min(i + self.batch_size, len(ids))
+            
+            self.collection.upsert(
+                ids=ids[i:batch_end],
+                embeddings=embeddings[i:batch_end],
+                documents=texts[i:batch_end],
+                metadatas=metadatas[i:batch_end]
+            )
+            print(f"Upserted batch {i//self.batch_size + 1}/{total_batches}")
+    
+    def initialize_database(self, transactions_file: str, incremental: bool = False,
+                            resume: bool = False, workers: Optional[int] = None) -> Dict[str, int]:
+        """Initialize ChromaDB with transactions
+        
+        The file is streamed through an IngestPipeline, so memory stays flat
+        regardless of its size. With resume=True an interrupted ingest of the
+        same file continues from its last checkpoint instead of starting over.
+        With incremental=True the existing collection is kept and only new or
+        changed rows are embedded; rows missing from the file are deleted.
+        workers > 1 (or 0 for one per core) encodes a full build in a process
+        pool; the default comes from EMBEDDING_WORKERS.
+        Returns counts of added, updated, removed and skipped rows.
+        """
+        if incremental:
+            return self.sync_database(transactions_file)
+        
         print("🔄 Initializing vector database...")
         
-        # Delete existing collection if exists
+        pipeline = IngestPipeline(self)
+        start_row = pipeline.checkpoint_rows(transactions_file) if resume else 0
+        
+        if start_row:
+            print(f"Resuming after {start_row:,} rows")
+            self.collection = self.client.get_or_create_collection(
+                name=self.collection_name,
+                metadata=self._collection_metadata()
+            )
+        else:
+            # Delete existing collection if exists
+            try:
+                self.client.delete_collection(name=self.collection_name)
+                print("Deleted existing collection")
+            except:
+                pass
+            
+            self.collection = self.client.create_collection(
+                name=self.collection_name,
+                metadata=self._collection_metadata()
+            )
+        
+        analytics_store = get_analytics_store(refresh=False)
+        workers = self.embedding_service.start_pool(workers)
         try:
-            self.client.delete_collection(name=self.collection_name)
-            print("Deleted existing collection")
-        except:
-            pass
+            # Each pipeline chunk should keep every encoder process busy
+            pipeline.chunk_size = max(pipeline.chunk_size, workers * self.embedding_service.pool_chunk_size)
+            result = pipeline.run(transactions_file, start_row=start_row, analytics_store=analytics_store)
+        finally:
+            self.embedding_service.stop_pool()
+        self.collection.modify(metadata=self._collection_metadata(result["latest_date"]))
+        self.client.optimize(self.collection)
+        record_ingested_source(transactions_file)
+        
+        rollups = get_rollup_store(refresh=False, build_missing=False)
+        rollups.rebuild(analytics_store)
+        rollups.save()
+        self._rebuild_lexical_index(analytics_store)
         
-        # Create new collection
-        self.collection = self.client.create_collection(
+        self.user_generations.bump_all()
+        self.generation.bump()
+        print(f"✅ Database initialized with {result['rows']} transactions")
+        return {"added": result["rows"], "updated": 0, "removed": 0, "skipped": 0}
+    
+    def sync_database(self, transactions_file: str) -> Dict[str, int]:
+        """Incrementally sync the collection with a transactions file"""
+        print("🔄 Syncing vector database...")
+        
+        self.collection = self.client.get_or_create_collection(
             name=self.collection_name,
-            metadata={"description": "Financial transaction embeddings"}
+            metadata=self._collection_metadata()
         )
         
-        # Load transactions
         transactions, texts = self.embedding_service.load_and_prepare_transactions(transactions_file)
+        stored_hashes = self._get_stored_hashes()
         
-        # Generate embeddings
-        print(f"Generating embeddings for {len(transactions)} transactions...")
-        embeddings = self.embedding_service.generate_embeddings_batch(texts)
+        ids, changed_texts, metadatas, changed_transactions, updated_ids = [], [], [], [], []
+        added = updated = skipped = 0
+        seen = set()
         
-        # Prepare data for ChromaDB
-        ids = [txn['id'] for txn in transactions]
-        documents = texts
-        metadatas = transactions
-        
-        # Add to collection in batches
-        batch_size = 100
-        for i in range(0, len(ids), batch_size):
-            batch_end = min(i + batch_size, len(ids))
+        for txn, text in zip(transactions, texts):
+            txn_id = txn['id']
+            seen.add(txn_id)
+            text_hash = self.hash_text(text)
             
-            self.collection.add(
-                ids=ids[i:batch_end],
-                embeddings=embeddings[i:batch_end],
-                documents=documents[i:batch_end],
-                metadatas=metadatas[i:batch_end]
+            if txn_id not in stored_hashes:
+                added += 1
+            elif stored_hashes[txn_id] != (text_hash, METADATA_SCHEMA_VERSION):
+                updated += 1
+                updated_ids.append(txn_id)
+            else:
+                skipped += 1
+                continue
+            
+            ids.append(txn_id)
+            changed_texts.append(text)
+            metadatas.append(self._prepare_metadata(txn, text_hash))
+            changed_transactions.append(txn)
+        
+        removed_ids = [txn_id for txn_id in stored_hashes if txn_id not in seen]
+        
+        # Previous versions of rows about to change, as currently indexed
+        previous = self._get_stored_transactions(updated_ids + removed_ids)
+        
+        self._upsert_rows(ids, changed_texts, metadatas)
+        
+        for i in range(0, len(removed_ids), self.batch_size):
+            self.collection.delete(ids=removed_ids[i:i + self.batch_size])
+        
+        # Keep the in-memory analytics columns and the rollups in step with the collection
+        analytics_store = get_analytics_store(refresh=False)
+        rollups = get_rollup_store(refresh=True, build_missing=False)
+        # Deltas only apply to rollups built from the data being updated
+        apply_deltas = rollups.describes(analytics_store)
+        if analytics_store.source_path and os.path.abspath(analytics_store.source_path) == os.path.abspath(transactions_file):
+            analytics_store.upsert(changed_transactions)
+            analytics_store.remove(removed_ids)
+        else:
+            analytics_store.replace(transactions)
+        analytics_store.mark_source(transactions_file)
+        record_ingested_source(transactions_file)
+        
+        if apply_deltas:
+            rollups.apply(changed_transactions, previous, analytics_store)
+        else:
+            rollups.rebuild(analytics_store)
+        rollups.save()
+        if ids or removed_ids:
+            self._rebuild_lexical_index(analytics_store)
+        
+        if ids or removed_ids:
+            latest_date = max((txn['date'] for txn in transactions), default=None)
+            self.collection.modify(metadata=self._collection_metadata(latest_date))
+            self.client.optimize(self.collection)
+            self.user_generations.bump_users(
+                txn['userId'] for txn in changed_transactions + previous
             )
-            print(f"Added batch {i//batch_size + 1}/{(len(ids)-1)//batch_size + 1}")
+            self.generation.bump()
         
-        print(f"✅ Database initialized with {len(transactions)} transactions")
+        stats = {
+            "added": added,
+            "updated": updated,
+            "removed": len(removed_ids),
+            "skipped": skipped
+        }
+        print(
+            f"✅ Sync complete: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['removed']} removed, {stats['skipped']} unchanged"
+        )
+        return stats
+    
+    def _rebuild_lexical_index(self, analytics_store):
+        """Re-index descriptions for lexical search from the columnar store"""
+        if settings.LEXICAL_SEARCH_ENABLED:
+            lexical_index = get_lexical_index(refresh=False, build_missing=False)
+            lexical_index.rebuild(analytics_store)
+            lexical_index.save()
+    
+    def data_generation(self, user_id: Optional[str] = None) -> str:
+        """Version of a user's transactions (or of all data when user_id is None)"""
+        if user_id is None:
+            return str(self.generation.value)
+        return self.user_generations.value(user_id)
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query for caching (case and whitespace insensitive)"""
+        return " ".join(query.lower().split())
+    
+    def get_query_embedding(self, query: str) -> List[float]:
+        """Embed a query, reusing the cached vector for repeated queries"""
+        normalized = self.normalize_query(query)
+        embedding = self.query_embedding_cache.get(normalized)
+        count_cache_lookup("query_embedding", embedding is not None)
+        if embedding is None:
+            with timed("embed_query"):
+                embedding = self.embedding_service.generate_embedding(normalized)
+            self.query_embedding_cache.put(normalized, embedding)
+        return embedding
+    
+    async def aget_query_embedding(self, query: str) -> List[float]:
+        """Async variant of get_query_embedding that goes through the batcher"""
+        normalized = self.normalize_query(query)
+        embedding = self.query_embedding_cache.get(normalized)
+        count_cache_lookup("query_embedding", embedding is not None)
+        if embedding is None:
+            # Includes time queued in the batcher, which query_encode does not
+            with timed("embed_query"):
+                if self.query_batcher is not None:
+                    embedding = await self.query_batcher.encode(normalized)
+                else:
+                    embedding = await stage_executor.run(
+                        "embedding", self.embedding_service.generate_embedding, normalized
+                    )
+            self.query_embedding_cache.put(normalized, embedding)
+        return embedding
+    
+    def get_cached_results(self, query: str, n_results: int, user_id: Optional[str]) -> Optional[List[Dict]]:
+        """Return cached results for a query if they match the current generation"""
+        if self.result_cache is None:
+            return None
+        cached = self.result_cache.get((self.normalize_query(query), user_id, n_results))
+        if cached is not None and cached[0] == self.generation.value:
+            return [dict(txn) for txn in cached[1]]
+        return None
+    
+    def cache_results(self, query: str, n_results: int, user_id: Optional[str],
+                      transactions: List[Dict], generation: int):
+        """Remember results computed against the given collection generation"""
+        if self.result_cache is not None:
+            key = (self.normalize_query(query), user_id, n_results)
+            self.result_cache.put(key, (generation, [dict(txn) for txn in transactions]))
+    
+    def reference_date(self) -> date:
+        """Date that relative phrases like "last month" are resolved against
+        
+        The analytics store's latest transaction date, the same anchor the
+        local answer engine uses; the store holds the ingested data.
+        """
+        return get_analytics_store().reference_date()
+    
+    def parse_query(self, query: str) -> ParsedQuery:
+        """Extract structured filters from a natural-language query"""
+        with timed("parse_query"):
+            return self.query_parser.parse(query, reference_date=self.reference_date())
+    
+    def search_by_embedding(self, query_embedding: List[float], n_results: int = 10,
+                            user_id: Optional[str] = None,
+                            parsed: Optional[ParsedQuery] = None) -> List[Dict]:
+        """Query the collection with a precomputed embedding"""
+        return self.search_by_embeddings([query_embedding], n_results, user_id, parsed)[0]
+    
+    def search_by_embeddings(self, query_embeddings: List[List[float]], n_results: int = 10,
+                             user_id: Optional[str] = None,
+                             parsed: Optional[ParsedQuery] = None) -> List[List[Dict]]:
+        """Query the collection with several embeddings that share one filter, in one call"""
+        if not self.collection:
+            return [[] for _ in query_embeddings]
+        
+        # Build where filters for user and any extracted constraints
+        if parsed is not None:
+            where_filter = parsed.build_where(user_id)
+            where_document = parsed.build_where_document()
+        else:
+            where_filter = {"userId": user_id} if user_id else None
+            where_document = None
+        
+        # Search
+        with timed("vector_query"):
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where_filter,
+                where_document=where_document
+            )
+        
+        # Format results
+        with timed("format_results"):
+            metadatas = (results or {}).get('metadatas') or [[] for _ in query_embeddings]
+            return [[self._format_metadata(metadata) for metadata in found] for found in metadatas]
+    
+    def search_by_metadata(self, parsed: ParsedQuery, n_results: int = 10,
+                           user_id: Optional[str] = None, page_size: int = 1000) -> List[Dict]:
+        """Serve sorted top-N queries from metadata without a similarity search
+        
+        Ranked from the analytics store's columns, selecting only the top
+        limit rows; the paged Chroma scan is kept for when the store is empty.
+        """
+        if not self.collection:
+            return []
+        
+        limit = parsed.limit or n_results
+        analytics_store = get_analytics_store()
+        cols = analytics_store.columns()
+        if len(cols["id"]):
+            with timed("metadata_scan"):
+                rows = AnswerEngine.matching_rows(analytics_store, cols, parsed, user_id)
+                sign = -1 if parsed.descending else 1
+                keys, dates = sign * cols[parsed.sort_by][rows], sign * cols["date"][rows]
+                if limit < len(rows):
+                    part = np.argpartition(keys, limit - 1)[:limit]
+                    rows, keys, dates = rows[part], keys[part], dates[part]
+                order = np.lexsort((dates, keys))[:limit]
+                return analytics_store.records(rows[order], cols)
+        
+        sort_key = AMOUNT_KEY if parsed.sort_by == "amount" else DATE_KEY
+        
+        def rows():
+            offset = 0
+            while True:
+                page = self.collection.get(
+                    where=parsed.build_where(user_id),
+                    where_document=parsed.build_where_document(),
+                    include=["metadatas"],
+                    limit=page_size,
+                    offset=offset
+                )
+                metadatas = page['metadatas'] if page else []
+                if not metadatas:
+                    return
+                yield from metadatas
+                offset += len(metadatas)
+        
+        select = heapq.nlargest if parsed.descending else heapq.nsmallest
+        with timed("metadata_scan"):
+            top = select(limit, rows(), key=lambda m: (m.get(sort_key, 0), m.get(DATE_KEY, 0)))
+        return [self._format_metadata(m) for m in top]
+    
+    def lexical_terms(self, query: str) -> Tuple[List[str], bool]:
+        """Indexed terms of a query and whether it is a pure lexical lookup"""
+        if not settings.LEXICAL_SEARCH_ENABLED:
+            return [], False
+        return get_lexical_index().analyze_query(query)
+    
+    def search_lexical(self, terms: List[str], parsed: ParsedQuery, n_results: int = 10,
+                       user_id: Optional[str] = None, batch_size: int = 256) -> List[Dict]:
+        """BM25 search over descriptions, applying the parsed filters to ranked hits"""
+        with timed("lexical_search"):
+            ids, _ = get_lexical_index().search(terms, user_id)
+        analytics_store = get_analytics_store()
+        cols = analytics_store.columns()
+        
+        transactions = []
+        with timed("lexical_fetch"):
+            # Structured filters as one vectorized mask; only surviving hits become dicts
+            allowed = analytics_store.mask(
+                user_id=user_id, category=parsed.category, txn_type=parsed.txn_type,
+                date_from=parsed.date_from, date_to=parsed.date_to,
+                amount_filters=parsed.amount_filters, cols=cols
+            )
+            for start in range(0, len(ids), batch_size):
+                rows = analytics_store.rows_by_id(ids[start:start + batch_size].tolist(), cols)
+                rows = rows[allowed[rows]] if len(rows) else rows
+                for txn in analytics_store.records(rows, cols):
+                    if parsed.matches(txn):
+                        transactions.append(txn)
+                        if len(transactions) >= n_results:
+                            return transactions
+        return transactions
+    
+    def search_hybrid(self, query_embedding: List[float], terms: List[str], parsed: ParsedQuery,
+                      n_results: int = 10, user_id: Optional[str] = None) -> List[Dict]:
+        """Vector search, fused with lexical hits by reciprocal rank when the query has indexed terms"""
+        if not terms:
+            return self.search_by_embedding(query_embedding, n_results, user_id, parsed)
+        
+        candidates = n_results * 2
+        vector_hits = self.search_by_embedding(query_embedding, candidates, user_id, parsed)
+        lexical_hits = self.search_lexical(terms, parsed, candidates, user_id)
+        return reciprocal_rank_fusion([vector_hits, lexical_hits], settings.RRF_K)[:n_results]
+    
+    def analyze_query(self, query: str) -> Tuple[ParsedQuery, List[str], bool]:
+        """Parsed filters, indexed terms and whether the query is a pure lexical lookup
+        
+        May load or rebuild the lexical index, so async callers run it in the thread pool.
+        """
+        parsed = self.parse_query(query)
+        if parsed.sort_by:
+            return parsed, [], False
+        terms, lexical_only = self.lexical_terms(query)
+        return parsed, terms, lexical_only
+    
+    def _search_uncached(self, query: str, n_results: int, user_id: Optional[str]) -> List[Dict]:
+        parsed, terms, lexical_only = self.analyze_query(query)
+        if parsed.sort_by:
+            return self.search_by_metadata(parsed, n_results, user_id)
+        
+        # Exact-token lookups (merchants, payment methods) skip the embedding model
+        if lexical_only:
+            return self.search_lexical(terms, parsed, n_results, user_id)
+        
+        query_embedding = self.get_query_embedding(query)
+        return self.search_hybrid(query_embedding, terms, parsed, n_results, user_id)
     
     def search(self, query: str, n_results: int = 10, user_id: Optional[str] = None) -> List[Dict]:
         """Search for relevant transactions"""
         if not self.collection:
             return []
         
-        # Generate query embedding
-        query_embedding = self.embedding_service.generate_embedding(query)
+        # Serve repeated queries from the result cache while the data is unchanged
+        cached = self.get_cached_results(query, n_results, user_id)
+        if cached is not None:
+            return cached
         
-        # Build where filter for user
-        where_filter = {"userId": user_id} if user_id else None
+        generation = self.generation.value
+        transactions = self._search_uncached(query, n_results, user_id)
+        self.cache_results(query, n_results, user_id, transactions, generation)
         
-        # Search
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where=where_filter
-        )
+        return transactions
+    
+    async def asearch(self, query: str, n_results: int = 10, user_id: Optional[str] = None) -> List[Dict]:
+        """Async search that runs encoding and Chroma calls off the event loop"""
+        if not self.collection:
+            return []
         
-        # Format results
-        transactions = []
-        if results and results['metadatas']:
-            for metadata in results['metadatas'][0]:
-                transactions.append(metadata)
+        cached = self.get_cached_results(query, n_results, user_id)
+        if cached is not None:
+            return cached
+        
+        generation = self.generation.value
+        parsed, terms, lexical_only = await stage_executor.run("analytics", self.analyze_query, query)
+        if parsed.sort_by:
+            transactions = await stage_executor.run(
+                "vector_store", self.search_by_metadata, parsed, n_results, user_id
+            )
+        elif lexical_only:
+            transactions = await stage_executor.run(
+                "analytics", self.search_lexical, terms, parsed, n_results, user_id
+            )
+        else:
+            query_embedding = await self.aget_query_embedding(query)
+            transactions = await stage_executor.run(
+                "vector_store", self.search_hybrid, query_embedding, terms, parsed, n_results, user_id
+            )
+        self.cache_results(query, n_results, user_id, transactions, generation)
         
         return transactions
     
-    def get_all_transactions(self, user_id: Optional[str] = None) -> List[Dict]:
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed many queries; cached vectors are reused and all misses share one model call"""
+        normalized = [self.normalize_query(query) for query in queries]
+        embeddings = [self.query_embedding_cache.get(text) for text in normalized]
+        for embedding in embeddings:
+            count_cache_lookup("query_embedding", embedding is not None)
+        
+        missing = list(dict.fromkeys(text for text, embedding in zip(normalized, embeddings) if embedding is None))
+        if missing:
+            with timed("embed_query"):
+                encoded = dict(zip(missing, self.embedding_service.generate_query_embeddings(missing)))
+            for text, embedding in encoded.items():
+                self.query_embedding_cache.put(text, embedding)
+            embeddings = [embedding if embedding is not None else encoded[text]
+                          for text, embedding in zip(normalized, embeddings)]
+        return embeddings
+    
+    def _plan_batch(self, queries: List[BatchQuery]) -> List[_PlannedQuery]:
+        """Serve cache hits and decide how each remaining query is searched"""
+        plans = []
+        for item in queries:
+            plan = _PlannedQuery(item)
+            plans.append(plan)
+            # The result cache key has no filters, so only plain queries use it
+            if not item.filters:
+                plan.results = self.get_cached_results(item.query, item.n_results, item.user_id)
+                if plan.results is not None:
+                    plan.cached = True
+                    continue
+            
+            plan.parsed = self.parse_query(item.query)
+            if item.filters:
+                plan.parsed = plan.parsed.with_filters(**item.filters)
+            if plan.parsed.sort_by:
+                plan.route = "metadata"
+                continue
+            plan.terms, lexical_only = self.lexical_terms(item.query)
+            plan.route = "lexical" if lexical_only else "vector"
+        return plans
+    
+    def _search_planned(self, plan: _PlannedQuery):
+        """Run a metadata or lexical plan on its own"""
+        item = plan.item
+        if plan.route == "metadata":
+            plan.results = self.search_by_metadata(plan.parsed, item.n_results, item.user_id)
+        else:
+            plan.results = self.search_lexical(plan.terms, plan.parsed, item.n_results, item.user_id)
+    
+    def _search_vector_groups(self, plans: List[_PlannedQuery]):
+        """One vector query per distinct filter, then per-query lexical fusion where needed"""
+        groups: Dict[Tuple, List[_PlannedQuery]] = {}
+        for plan in plans:
+            key = (
+                plan.item.user_id,
+                json.dumps(plan.parsed.build_where(plan.item.user_id), sort_keys=True),
+                json.dumps(plan.parsed.build_where_document(), sort_keys=True)
+            )
+            groups.setdefault(key, []).append(plan)
+        
+        for group in groups.values():
+            # Hybrid queries fuse twice as many vector candidates, as in search_hybrid
+            wanted = [plan.item.n_results * 2 if plan.terms else plan.item.n_results for plan in group]
+            hits = self.search_by_embeddings(
+                [plan.embedding for plan in group], max(wanted), group[0].item.user_id, group[0].parsed
+            )
+            for plan, found, candidates in zip(group, hits, wanted):
+                found = found[:candidates]
+                if plan.terms:
+                    lexical_hits = self.search_lexical(plan.terms, plan.parsed, candidates, plan.item.user_id)
+                    found = reciprocal_rank_fusion([found, lexical_hits], settings.RRF_K)
+                plan.results = found[:plan.item.n_results]
+    
+    def _cache_batch(self, plans: List[_PlannedQuery], generation: int):
+        for plan in plans:
+            if not plan.cached and not plan.item.filters:
+                self.cache_results(plan.item.query, plan.item.n_results, plan.item.user_id,
+                                   plan.results, generation)
+    
+    def search_batch(self, queries: List[BatchQuery]) -> List[List[Dict]]:
+        """Search many queries at once, returning results in the same order
+        
+        Queries that need the model are encoded in one call, and queries that
+        share a user and filters share one vector-store query. Sorted top-N and
+        lexical-only queries run as in search.
+        """
+        if not self.collection:
+            return [[] for _ in queries]
+        
+        generation = self.generation.value
+        plans = self._plan_batch(queries)
+        vector_plans = [plan for plan in plans if plan.route == "vector"]
+        if vector_plans:
+            embeddings = self.embed_queries([plan.item.query for plan in vector_plans])
+            for plan, embedding in zip(vector_plans, embeddings):
+                plan.embedding = embedding
+            self._search_vector_groups(vector_plans)
+        for plan in plans:
+            if plan.route in ("metadata", "lexical"):
+                self._search_planned(plan)
+        
+        self._cache_batch(plans, generation)
+        return [plan.results for plan in plans]
+    
+    async def asearch_batch(self, queries: List[BatchQuery]) -> List[List[Dict]]:
+        """Async search_batch; the batched encode and vector queries run alongside the other queries"""
+        if not self.collection:
+            return [[] for _ in queries]
+        
+        generation = self.generation.value
+        # Parsing every query and loading the lexical index must not block the event loop
+        plans = await stage_executor.run("analytics", self._plan_batch, queries)
+        vector_plans = [plan for plan in plans if plan.route == "vector"]
+        
+        async def search_vectors():
+            if not vector_plans:
+                return
+            embeddings = await stage_executor.run(
+                "embedding", self.embed_queries, [plan.item.query for plan in vector_plans]
+            )
+            for plan, embedding in zip(vector_plans, embeddings):
+                plan.embedding = embedding
+            await stage_executor.run("vector_store", self._search_vector_groups, vector_plans)
+        
+        await asyncio.gather(search_vectors(), *[
+            stage_executor.run("vector_store" if plan.route == "metadata" else "analytics", self._search_planned, plan)
+            for plan in plans if plan.route in ("metadata", "lexical")
+        ])
+        
+        self._cache_batch(plans, generation)
+        return [plan.results for plan in plans]
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss counters of the query caches"""
+        stats = {"query_embeddings": self.query_embedding_cache.stats()}
+        if self.result_cache is not None:
+            stats["results"] = self.result_cache.stats()
+        if self.query_batcher is not None:
+            stats["query_batching"] = self.query_batcher.stats()
+        return stats
+    
+    def get_all_transactions(self, user_id: Optional[str] = None, page_size: int = 1000) -> List[Dict]:
         """Get all transactions for a user"""
         if not self.collection:
             return []
         
         where_filter = {"userId": user_id} if user_id else None
         
-        results = self.collection.get(
-            where=where_filter,
-            limit=10000
-        )
+        # Page through the collection so large users are not truncated
+        transactions = []
+        offset = 0
+        while True:
+            results = self.collection.get(
+                where=where_filter,
+                include=["metadatas"],
+                limit=page_size,
+                offset=offset
+            )
+            metadatas = results['metadatas'] if results else []
+            if not metadatas:
+                break
+            transactions.extend(self._format_metadata(m) for m in metadatas)
+            offset += len(metadatas)
         
-        return results['metadatas'] if results else []
+        return transactions
+    
+    async def aget_all_transactions(self, user_id: Optional[str] = None) -> List[Dict]:
+        """Async variant of get_all_transactions that runs off the event loop"""
+        return await stage_executor.run("vector_store", self.get_all_transactions, user_id)
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build or sync the vector database")
+    parser.add_argument("--incremental", action="store_true", help="only embed new or changed rows")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted full build")
+    parser.add_argument("--workers", type=int, default=None, help="embedding processes (0 = one per core)")
+    args = parser.parse_args()
+    
     service = VectorSearchService()
-    service.initialize_database(settings.DATA_PATH)
\ No newline at end of file
+    service.initialize_database(
+        settings.DATA_PATH,
+        incremental=args.incremental,
+        resume=args.resume,
+        workers=args.workers
+    )
\ No newline at end of file
@@ -3,11 +3,17 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-import json
+from typing import Optional, Tuple
+import numpy as np
 import os
+import threading
+import time
+from contextlib import contextmanager
 from services.data_generator import FinancialDataGenerator
 from services.vector_search_service import VectorSearchService
 from services.summarizer_service import SummarizerService
+from services.analytics_store import AnalyticsStore, get_analytics_store
+from services.answer_engine import answer_engine
 from config.settings import settings
 
 # Page configuration
@@ -44,14 +50,109 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+TRANSACTION_COLUMNS = ['id', 'userId', 'date', 'description', 'amount', 'type', 'category', 'balance']
+
+# Process-wide resources: one embedding model, vector store client and Groq client
+# shared by every browser session, instead of one copy per session
+@st.cache_resource(show_spinner="Loading embedding model...")
+def get_vector_service() -> VectorSearchService:
+    return VectorSearchService()
+
+class RebuildGate:
+    """Lets sessions search concurrently, but never while the database is rebuilt
+    
+    A full rebuild deletes and recreates the shared collection, so it waits
+    for running searches to finish and holds new ones until it is done.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._searches = 0
+        self._rebuilding = False
+    
+    @contextmanager
+    def searching(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._rebuilding)
+            self._searches += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._searches -= 1
+                self._condition.notify_all()
+    
+    @contextmanager
+    def rebuilding(self):
+        """Yields False, without waiting, if another session is already rebuilding"""
+        with self._condition:
+            if self._rebuilding:
+                started = False
+            else:
+                started = self._rebuilding = True
+                self._condition.wait_for(lambda: self._searches == 0)
+        try:
+            yield started
+        finally:
+            if started:
+                with self._condition:
+                    self._rebuilding = False
+                    self._condition.notify_all()
+
+@st.cache_resource
+def get_rebuild_gate() -> RebuildGate:
+    return RebuildGate()
+
+@st.cache_resource
+def get_summarizer_service() -> Optional[SummarizerService]:
+    """Shared SummarizerService, or None without a usable GROQ_API_KEY"""
+    if not settings.GROQ_API_KEY:
+        return None
+    try:
+        return SummarizerService()
+    except Exception:
+        return None
+
+def _whole_numbers(values: np.ndarray) -> np.ndarray:
+    return values.astype(np.int64) if np.all(np.mod(values, 1) == 0) else values
+
+@st.cache_resource(max_entries=2)
+def load_transactions_frame(path: str, signature: Tuple[int, int]) -> pd.DataFrame:
+    """All transactions as a DataFrame, built once per (mtime, size) of the data file
+    
+    Columns come straight from the shared analytics store, which parses the
+    file once per process. The frame is shared by every session, not copied
+    per rerun, so callers must treat it as read-only.
+    """
+    store = get_analytics_store()
+    cols = store.columns()
+    return pd.DataFrame({
+        'id': cols['id'],
+        'userId': np.array(store.users.values, dtype=object)[cols['user']],
+        'date': np.datetime_as_string(cols['date'].astype('datetime64[D]')),
+        'description': cols['description'],
+        'amount': _whole_numbers(cols['amount']),
+        'type': np.array(store.types.values, dtype=object)[cols['type']],
+        'category': np.array(store.categories.values, dtype=object)[cols['category']],
+        'balance': _whole_numbers(cols['balance'])
+    }, columns=TRANSACTION_COLUMNS)
+
+@st.cache_resource(max_entries=64)
+def load_user_frame(path: str, signature: Tuple[int, int], user_id: Optional[str]) -> pd.DataFrame:
+    """One user's transactions (everyone's for None), newest first; shared and read-only"""
+    df = load_transactions_frame(path, signature)
+    if user_id is not None:
+        df = df[df['userId'] == user_id]
+    return df.sort_values('date', ascending=False, kind='stable')
+
 # Initialize session state
-if 'vector_service' not in st.session_state:
-    st.session_state.vector_service = None
-if 'summarizer_service' not in st.session_state:
-    st.session_state.summarizer_service = None
 if 'db_initialized' not in st.session_state:
     st.session_state.db_initialized = False
 
+vector_service = get_vector_service()
+rebuild_gate = get_rebuild_gate()
+summarizer_service = get_summarizer_service()
+
 # Sidebar
 with st.sidebar:
     st.image("https://img.icons8.com/color/96/000000/money-bag.png", width=80)
@@ -87,10 +188,14 @@ with st.sidebar:
         with st.spinner("Initializing vector database..."):
             try:
                 if os.path.exists(settings.DATA_PATH):
-                    st.session_state.vector_service = VectorSearchService()
-                    st.session_state.vector_service.initialize_database(settings.DATA_PATH)
-                    st.session_state.db_initialized = True
-                    st.success("✅ Database initialized!")
+                    with rebuild_gate.rebuilding() as started:
+                        if started:
+                            vector_service.initialize_database(settings.DATA_PATH)
+                    if started:
+                        st.session_state.db_initialized = True
+                        st.success("✅ Database initialized!")
+                    else:
+                        st.warning("⚠️ Another session is already initializing the database")
                 else:
                     st.error("⚠️ Please generate data first!")
             except Exception as e:
@@ -100,21 +205,15 @@ with st.sidebar:
     st.subheader("3️⃣ API Configuration")
     if settings.GROQ_API_KEY:
         st.success("✅ Groq API Key configured")
-        if st.session_state.summarizer_service is None:
-            try:
-                st.session_state.summarizer_service = SummarizerService()
-            except:
-                pass
     else:
         st.warning("⚠️ Set GROQ_API_KEY in .env")
     
     st.markdown("---")
     
     # User Selection
-    if os.path.exists(settings.DATA_PATH):
-        with open(settings.DATA_PATH, 'r') as f:
-            all_transactions = json.load(f)
-        users = list(set([t['userId'] for t in all_transactions]))
+    data_signature = AnalyticsStore.file_signature(settings.DATA_PATH)
+    if data_signature is not None:
+        users = sorted(load_user_frame(settings.DATA_PATH, data_signature, None)['userId'].unique())
         selected_user = st.selectbox("👤 Select User", ["All Users"] + users)
     else:
         selected_user = "All Users"
@@ -125,10 +224,6 @@ with st.sidebar:
 # Main content
 st.markdown('<div class="main-header">💰 AI-Powered Financial Assistant</div>', unsafe_allow_html=True)
 
-# Check if services are initialized
-if not st.session_state.vector_service:
-    st.session_state.vector_service = VectorSearchService()
-
 # Tab layout
 tab1, tab2, tab3, tab4 = st.tabs(["🔍 Search", "📊 Dashboard", "📝 All Transactions", "💡 Insights"])
 
@@ -162,57 +257,93 @@ with tab1:
         search_button = st.button("🚀 Search", use_container_width=True, type="primary")
     
     if search_button and query:
-        if st.session_state.db_initialized or st.session_state.vector_service.collection:
-            with st.spinner("Searching..."):
-                try:
-                    # Get user filter
-                    user_filter = None if selected_user == "All Users" else selected_user
+        if st.session_state.db_initialized or vector_service.collection:
+            try:
+                # Get user filter
+                user_filter = None if selected_user == "All Users" else selected_user
+                
+                # Totals, counts and top-N questions are answered exactly without the LLM
+                search_started = time.perf_counter()
+                local = None
+                if use_summary and settings.LOCAL_ANSWERS_ENABLED:
+                    local = answer_engine.answer(query, user_id=user_filter, limit=top_k)
+                
+                # Search
+                with st.spinner("Searching..."):
+                    if local:
+                        results = local.transactions
+                    else:
+                        with rebuild_gate.searching():
+                            results = vector_service.search(
+                                query=query,
+                                n_results=top_k,
+                                user_id=user_filter
+                            )
+                search_ms = (time.perf_counter() - search_started) * 1000
+                
+                if local and not results:
+                    st.markdown(f"**💬 Answer:** {local.text}")
+                elif results:
+                    st.success(f"Found {len(results)} relevant transactions")
                     
-                    # Search
-                    results = st.session_state.vector_service.search(
-                        query=query,
-                        n_results=top_k,
-                        user_id=user_filter
-                    )
+                    # Reserve space above the results; the summary streams in after they render
+                    summary_container = st.container()
                     
-                    if results:
-                        st.success(f"Found {len(results)} relevant transactions")
-                        
-                        # Generate summary
-                        if use_summary and st.session_state.summarizer_service:
-                            with st.spinner("Generating summary..."):
-                                summary = st.session_state.summarizer_service.summarize_transactions(
+                    # Display results
+                    st.markdown("### 📋 Transactions")
+                    for i, txn in enumerate(results, 1):
+                        with st.container():
+                            col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+                            
+                            with col1:
+                                st.markdown(f"**{txn['description']}**")
+                                st.caption(f"{txn['date']} • {txn['category']}")
+                            
+                            with col2:
+                                st.text(txn['userId'])
+                            
+                            with col3:
+                                color = "🔴" if txn['type'] == "Debit" else "🟢"
+                                st.markdown(f"{color} **₹{txn['amount']:,}**")
+                            
+                            with col4:
+                                st.caption(f"Balance: ₹{txn['balance']:,}")
+                            
+                            st.markdown("---")
+                    
+                    if local:
+                        with summary_container:
+                            st.markdown("**💬 Answer:**")
+                            st.text(local.text)
+                            st.caption(f"Answered locally ({local.intent}) in {search_ms:,.0f} ms")
+                    # Stream the summary token by token
+                    elif use_summary and summarizer_service:
+                        with summary_container:
+                            st.markdown("**💬 Summary:**")
+                            first_token = {}
+                            summary_started = time.perf_counter()
+                            
+                            def timed_tokens(tokens):
+                                for token in tokens:
+                                    first_token.setdefault("ms", (time.perf_counter() - summary_started) * 1000)
+                                    yield token
+                            
+                            st.write_stream(timed_tokens(
+                                summarizer_service.stream_summary(
                                     query=query,
-                                    transactions=results
+                                    transactions=results,
+                                    data_generation=vector_service.data_generation(user_filter)
                                 )
-                                st.info(f"**💬 Summary:**\n\n{summary}")
-                        
-                        # Display results
-                        st.markdown("### 📋 Transactions")
-                        for i, txn in enumerate(results, 1):
-                            with st.container():
-                                col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
-                                
-                                with col1:
-                                    st.markdown(f"**{txn['description']}**")
-                                    st.caption(f"{txn['date']} • {txn['category']}")
-                                
-                                with col2:
-                                    st.text(txn['userId'])
-                                
-                                with col3:
-                                    color = "🔴" if txn['type'] == "Debit" else "🟢"
-                                    st.markdown(f"{color} **₹{txn['amount']:,}**")
-                                
-                                with col4:
-                                    st.caption(f"Balance: ₹{txn['balance']:,}")
-                                
-                                st.markdown("---")
-                    else:
-                        st.warning("No transactions found for your query.")
-                
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+                            ))
+                            st.caption(
+                                f"Search {search_ms:,.0f} ms • first token {first_token.get('ms', 0):,.0f} ms • "
+                                f"summary {(time.perf_counter() - summary_started) * 1000:,.0f} ms"
+                            )
+                else:
+                    st.warning("No transactions found for your query.")
+            
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
         else:
             st.warning("⚠️ Please initialize the database first from the sidebar!")
 
@@ -221,25 +352,23 @@ with tab2:
     st.header("📊 Financial Dashboard")
     
     if os.path.exists(settings.DATA_PATH):
-        # Load data
-        with open(settings.DATA_PATH, 'r') as f:
-            transactions = json.load(f)
-        
-        # Filter by user
-        if selected_user != "All Users":
-            transactions = [t for t in transactions if t['userId'] == selected_user]
-        
-        df = pd.DataFrame(transactions)
-        df['date'] = pd.to_datetime(df['date'])
-        df['month'] = df['date'].dt.to_period('M').astype(str)
+        # Aggregates come from the shared columnar store instead of re-reading the JSON
+        store = get_analytics_store()
+        user_filter = None if selected_user == "All Users" else selected_user
         
         # Metrics
         col1, col2, col3, col4 = st.columns(4)
         
-        total_credit = df[df['type'] == 'Credit']['amount'].sum()
-        total_debit = df[df['type'] == 'Debit']['amount'].sum()
+        type_summary = pd.DataFrame(
+            store.aggregate(['type'], user_id=user_filter),
+            columns=['type', 'sum', 'count', 'min', 'max', 'mean']
+        ).rename(columns={'sum': 'amount'}).sort_values('type')
+        totals = type_summary.set_index('type')['amount']
+        total_credit = totals.get('Credit', 0)
+        total_debit = totals.get('Debit', 0)
         net_balance = total_credit - total_debit
-        avg_transaction = df['amount'].mean()
+        transaction_count = type_summary['count'].sum()
+        avg_transaction = (total_credit + total_debit) / transaction_count if transaction_count else 0
         
         with col1:
             st.metric("💰 Total Income", f"₹{total_credit:,.0f}")
@@ -258,7 +387,11 @@ with tab2:
         
         with col1:
             # Spending by Category
-            category_spending = df[df['type'] == 'Debit'].groupby('category')['amount'].sum().reset_index()
+            category_aggregates = pd.DataFrame(
+                store.aggregate(['category'], user_id=user_filter, txn_type='Debit'),
+                columns=['category', 'sum', 'count', 'min', 'max', 'mean']
+            )
+            category_spending = category_aggregates.rename(columns={'sum': 'amount'})[['category', 'amount']]
             category_spending = category_spending.sort_values('amount', ascending=False)
             
             fig_category = px.pie(
@@ -274,8 +407,6 @@ with tab2:
         
         with col2:
             # Credit vs Debit
-            type_summary = df.groupby('type')['amount'].sum().reset_index()
-            
             fig_type = go.Figure(data=[
                 go.Bar(
                     x=type_summary['type'],
@@ -294,7 +425,10 @@ with tab2:
             st.plotly_chart(fig_type, use_container_width=True)
         
         # Monthly Trend
-        monthly_data = df.groupby(['month', 'type'])['amount'].sum().reset_index()
+        monthly_data = pd.DataFrame(
+            store.aggregate(['month', 'type'], user_id=user_filter),
+            columns=['month', 'type', 'sum', 'count', 'min', 'max', 'mean']
+        ).rename(columns={'sum': 'amount'}).sort_values('month')
         
         fig_trend = px.line(
             monthly_data,
@@ -317,7 +451,10 @@ with tab2:
         
         with col1:
             st.subheader("🏆 Top 10 Expenses")
-            top_expenses = df[df['type'] == 'Debit'].nlargest(10, 'amount')[['date', 'description', 'amount', 'category']]
+            top_expenses = pd.DataFrame(
+                store.top_n(10, user_id=user_filter, txn_type='Debit'),
+                columns=['id', 'userId', 'date', 'description', 'amount', 'type', 'category', 'balance']
+            )[['date', 'description', 'amount', 'category']]
             st.dataframe(
                 top_expenses.style.format({'amount': '₹{:,.0f}'}),
                 hide_index=True,
@@ -326,9 +463,7 @@ with tab2:
         
         with col2:
             st.subheader("💎 Category-wise Spending")
-            category_detail = df[df['type'] == 'Debit'].groupby('category').agg({
-                'amount': ['sum', 'mean', 'count']
-            }).round(0)
+            category_detail = category_aggregates.set_index('category')[['sum', 'mean', 'count']].round(0)
             category_detail.columns = ['Total', 'Average', 'Count']
             category_detail = category_detail.sort_values('Total', ascending=False)
             st.dataframe(
@@ -343,15 +478,10 @@ with tab2:
 with tab3:
     st.header("📝 All Transactions")
     
-    if os.path.exists(settings.DATA_PATH):
-        with open(settings.DATA_PATH, 'r') as f:
-            transactions = json.load(f)
-        
-        # Filter by user
-        if selected_user != "All Users":
-            transactions = [t for t in transactions if t['userId'] == selected_user]
-        
-        df = pd.DataFrame(transactions)
+    if data_signature is not None:
+        # Cached per user and file version; filters below only select rows
+        user_filter = None if selected_user == "All Users" else selected_user
+        df = load_user_frame(settings.DATA_PATH, data_signature, user_filter)
         
         # Filters
         col1, col2, col3, col4 = st.columns(4)
@@ -372,7 +502,7 @@ with tab3:
             (df['category'].isin(filter_category)) &
             (df['amount'] >= min_amount) &
             (df['amount'] <= max_amount)
-        ].sort_values('date', ascending=False)
+        ]
         
         st.info(f"Showing {len(filtered_df)} of {len(df)} transactions")
         
@@ -403,55 +533,45 @@ with tab3:
 with tab4:
     st.header("💡 AI-Powered Insights")
     
-    if os.path.exists(settings.DATA_PATH) and st.session_state.summarizer_service:
+    if os.path.exists(settings.DATA_PATH) and summarizer_service:
         if st.button("🔮 Generate Insights", type="primary", use_container_width=True):
             with st.spinner("Analyzing your financial data..."):
                 try:
                     # Get user filter
                     user_filter = None if selected_user == "All Users" else selected_user
                     
-                    # Get transactions
-                    if st.session_state.vector_service and st.session_state.vector_service.collection:
-                        transactions = st.session_state.vector_service.get_all_transactions(user_id=user_filter)
+                    # Get statistics from the columnar store
+                    stats = get_analytics_store().spending_stats(user_id=user_filter)
+                    
+                    if stats['transaction_count']:
+                        insights = summarizer_service.get_spending_insights(
+                            stats=stats,
+                            data_generation=vector_service.data_generation(user_filter)
+                        )
                         
-                        if transactions:
-                            insights = st.session_state.summarizer_service.get_spending_insights(transactions)
-                            
-                            st.success("✨ Insights Generated!")
-                            st.markdown("### 📊 Your Financial Analysis")
-                            st.info(insights)
-                            
-                            # Additional stats
-                            df = pd.DataFrame(transactions)
-                            
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                st.markdown("#### 📈 Quick Stats")
-                                total_transactions = len(df)
-                                debit_count = len(df[df['type'] == 'Debit'])
-                                credit_count = len(df[df['type'] == 'Credit'])
-                                
-                                st.metric("Total Transactions", total_transactions)
-                                st.metric("Debit Transactions", debit_count)
-                                st.metric("Credit Transactions", credit_count)
-                            
-                            with col2:
-                                st.markdown("#### 💰 Spending Overview")
-                                avg_debit = df[df['type'] == 'Debit']['amount'].mean()
-                                max_debit = df[df['type'] == 'Debit']['amount'].max()
-                                
-                                st.metric("Average Expense", f"₹{avg_debit:,.0f}")
-                                st.metric("Highest Expense", f"₹{max_debit:,.0f}")
-                        else:
-                            st.warning("No transactions found.")
+                        st.success("✨ Insights Generated!")
+                        st.markdown("### 📊 Your Financial Analysis")
+                        st.info(insights)
+                        
+                        col1, col2 = st.columns(2)
+                        
+                        with col1:
+                            st.markdown("#### 📈 Quick Stats")
+                            st.metric("Total Transactions", stats['transaction_count'])
+                            st.metric("Debit Transactions", stats['debit_count'])
+                            st.metric("Credit Transactions", stats['credit_count'])
+                        
+                        with col2:
+                            st.markdown("#### 💰 Spending Overview")
+                            st.metric("Average Expense", f"₹{stats['average_debit']:,.0f}")
+                            st.metric("Highest Expense", f"₹{stats['max_debit']:,.0f}")
                     else:
-                        st.warning("Please initialize the database first!")
+                        st.warning("No transactions found.")
                 
                 except Exception as e:
                     st.error(f"Error generating insights: {str(e)}")
     else:
-        if not st.session_state.summarizer_service:
+        if not summarizer_service:
             st.warning("⚠️ Groq API key not configured. Please set GROQ_API_KEY in your .env file.")
         else:
             st.info("📂 Please generate transaction data and initialize the database first.")